@@ -0,0 +1,182 @@
+# benchmarks/db_load.py
+"""
+Нагрузочный тест запросов DatabaseManager на локальной PostgreSQL.
+
+Наполняет базу из config.ini задачами, заметками и напоминаниями (словарь и
+распределения - из script.py), затем замеряет все пути чтения: get_tasks
+для каждого фильтра и сортировки, первую страницу get_tasks_page, search_tasks,
+get_tags_with_counts и get_due_reminders. Результаты записываются в JSON.
+
+Добавленные строки в конце удаляются (кроме запуска с --keep).
+
+    python benchmarks/db_load.py --tasks 100000 --output results.json
+"""
+
+import argparse
+import datetime
+import json
+import os
+import random
+import statistics
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import psycopg2.extras
+from database import DatabaseManager, TASK_SORT_KEYS
+from script import generate_task, generate_note, TAGS
+
+FILTERS = ('all', 'active', 'completed', 'important', 'tag', 'date')
+SEARCH_QUERIES = ("отчет", "позвонить маме", "проект", "презентац", "несуществующее слово")
+# Доля задач с напоминаниями и число напоминаний у такой задачи
+REMINDER_RATIO = 0.3
+MAX_REMINDERS_PER_TASK = 3
+SEED_BATCH_SIZE = 5000
+
+
+def seed(db, rng, tasks, notes, reminder_ratio):
+    """
+    Добавляет тестовые строки; возвращает их id по таблицам ({'tasks': [...], 'notes': [...]}),
+    чтобы cleanup удалил только их, а не строки, добавленные тем временем другими клиентами.
+    """
+    seeded = {'tasks': [], 'notes': []}
+
+    def report(table, total):
+        return lambda done: print(f"\r{table}: {done}/{total}", end="", file=sys.stderr, flush=True)
+
+    today = datetime.date.today()
+    db.import_tasks((generate_task(rng, today) for _ in range(tasks)), batch_size=SEED_BATCH_SIZE,
+                    progress=report("Задачи", tasks), ids=seeded['tasks'])
+    db.import_notes((generate_note(rng) for _ in range(notes)), batch_size=SEED_BATCH_SIZE,
+                    progress=report("Заметки", notes), ids=seeded['notes'])
+    print(file=sys.stderr)
+
+    now = datetime.datetime.now().astimezone()
+    with db.bulk_changes('reminders') as cursor:
+        values = [(task_id, now + datetime.timedelta(hours=rng.randint(-72, 24 * 30)))
+                  for task_id in seeded['tasks'] if rng.random() < reminder_ratio
+                  for _ in range(rng.randint(1, MAX_REMINDERS_PER_TASK))]
+        psycopg2.extras.execute_values(cursor, "INSERT INTO reminders (task_id, reminder_datetime) VALUES %s",
+                                       values, page_size=SEED_BATCH_SIZE)
+        for table in ('tasks', 'task_tags', 'notes', 'reminders'):
+            cursor.execute(f"ANALYZE {table}")
+    return seeded
+
+
+def cleanup(db, seeded):
+    # Напоминания и связи с тегами удаляются каскадно вместе с задачами
+    with db.bulk_changes('tasks', 'notes', 'reminders') as cursor:
+        cursor.execute("DELETE FROM tasks WHERE id = ANY(%s)", (seeded['tasks'],))
+        cursor.execute("DELETE FROM notes WHERE id = ANY(%s)", (seeded['notes'],))
+
+
+def measure(function, repeat):
+    timings, rows = [], 0
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = function()
+        timings.append((time.perf_counter() - started) * 1000)
+        rows = len(result)
+    timings.sort()
+    return {
+        'rows': rows,
+        'min_ms': round(timings[0], 3),
+        'median_ms': round(statistics.median(timings), 3),
+        'p95_ms': round(timings[min(len(timings) - 1, int(len(timings) * 0.95))], 3),
+        'max_ms': round(timings[-1], 3),
+    }
+
+
+def query_paths(db):
+    """(название, функция) для каждого пути чтения."""
+    filter_values = {'tag': TAGS[0], 'date': datetime.date.today()}
+    paths = []
+    for filter_by in FILTERS:
+        value = filter_values.get(filter_by)
+        for sort_by in TASK_SORT_KEYS:
+            paths.append((f"get_tasks/{filter_by}/{sort_by}",
+                          lambda f=filter_by, v=value, s=sort_by: db.get_tasks(f, v, s)))
+            paths.append((f"get_tasks_page/{filter_by}/{sort_by}",
+                          lambda f=filter_by, v=value, s=sort_by: db.get_tasks_page(f, v, s)))
+    for query in SEARCH_QUERIES:
+        paths.append((f"search_tasks/{query}", lambda q=query: db.search_tasks(q)))
+    paths.append(("get_tags_with_counts", db.get_tags_with_counts))
+    paths.append(("get_due_reminders", lambda: db.get_due_reminders(datetime.datetime.now().astimezone())))
+    return paths
+
+
+def environment(db):
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT,
+                                capture_output=True, text=True).stdout.strip() or None
+    except OSError:
+        commit = None
+    with db._cursor() as cursor:
+        cursor.execute("SHOW server_version")
+        server_version = cursor.fetchone()['server_version']
+        cursor.execute("SELECT (SELECT COUNT(*) FROM tasks) AS tasks, (SELECT COUNT(*) FROM notes) AS notes, "
+                       "(SELECT COUNT(*) FROM reminders) AS reminders")
+        counts = dict(cursor.fetchone())
+    return {'git_commit': commit, 'server_version': server_version, 'schema_version': db.schema_version,
+            'table_rows': counts}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--tasks", type=int, default=10000, help="сколько задач добавить (по умолчанию 10000)")
+    parser.add_argument("--notes", type=int, default=None, help="сколько заметок добавить (по умолчанию tasks / 10)")
+    parser.add_argument("--reminder-ratio", type=float, default=REMINDER_RATIO,
+                        help=f"доля задач с напоминаниями (по умолчанию {REMINDER_RATIO})")
+    parser.add_argument("--repeat", type=int, default=5, help="повторов каждого запроса (по умолчанию 5)")
+    parser.add_argument("--seed", type=int, default=1, help="начальное значение генератора случайных чисел")
+    parser.add_argument("--skip-seed", action="store_true", help="не наполнять базу, замерить текущие данные")
+    parser.add_argument("--keep", action="store_true", help="не удалять добавленные строки")
+    parser.add_argument("--output", default=None,
+                        help="файл результатов JSON (по умолчанию benchmarks/results/db_load-<время>.json)")
+    args = parser.parse_args()
+    notes = args.tasks // 10 if args.notes is None else args.notes
+
+    started_at = datetime.datetime.now().astimezone()
+    db = DatabaseManager()
+    seeded, seed_seconds = None, None
+    try:
+        if not args.skip_seed:
+            seed_started = time.perf_counter()
+            seeded = seed(db, random.Random(args.seed), args.tasks, notes, args.reminder_ratio)
+            seed_seconds = time.perf_counter() - seed_started
+            print(f"Наполнение: {args.tasks} задач, {notes} заметок за {seed_seconds:.1f} с", file=sys.stderr)
+
+        results = []
+        for name, function in query_paths(db):
+            function()  # прогрев: план запроса и страницы таблиц в кэше сервера
+            row = {'query': name, **measure(function, args.repeat)}
+            results.append(row)
+            print(f"{name:<48} {row['median_ms']:>10.2f} мс (p95 {row['p95_ms']:.2f}) строк: {row['rows']}")
+
+        report = {
+            'benchmark': 'db_load',
+            'timestamp': started_at.isoformat(),
+            'parameters': {'tasks': 0 if args.skip_seed else args.tasks, 'notes': 0 if args.skip_seed else notes,
+                           'reminder_ratio': args.reminder_ratio, 'repeat': args.repeat, 'seed': args.seed},
+            'seed_seconds': seed_seconds and round(seed_seconds, 2),
+            'environment': environment(db),
+            'results': results,
+        }
+    finally:
+        if seeded is not None and not args.keep:
+            cleanup(db, seeded)
+        db.close()
+
+    output = args.output or os.path.join(ROOT, "benchmarks", "results",
+                                         f"db_load-{started_at.strftime('%Y%m%d-%H%M%S')}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, 'w', encoding='utf-8') as f:
+        json.dump(report, f, ensure_ascii=False, indent=2, default=str)
+    print(f"Результаты записаны в {output}", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
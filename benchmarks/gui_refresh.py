@@ -0,0 +1,210 @@
+# benchmarks/gui_refresh.py
+"""
+Время основных обновлений окна MainWindow на большом числе задач: загрузка
+и сверка списка задач, список тегов, список заметок, открытие заметки
+в редакторе и смена темы. Окно работает без экрана (QT_QPA_PLATFORM=offscreen)
+с базой из config.ini, которая наполняется так же, как в db_load.py.
+
+Для каждой операции записываются время до завершения всех фоновых запросов
+и отрисовок, число виджетов приложения и пиковый объем памяти процесса (RSS).
+Код возврата 1, если превышен хотя бы один бюджет (BUDGETS или --budgets).
+
+    python benchmarks/gui_refresh.py --tasks 50000 --output gui.json
+"""
+
+import argparse
+import datetime
+import json
+import os
+import random
+import resource
+import statistics
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+# Файлы стилей и настроек main.py ищет в текущем каталоге
+os.chdir(ROOT)
+
+from PyQt6.QtCore import Qt
+from PyQt6.QtWidgets import QApplication
+from main import MainWindow, apply_stylesheet, load_theme_setting, save_theme_setting
+from db_load import seed, cleanup, environment
+
+THEMES = ("style.qss", "dark_style.qss")
+IDLE_TIMEOUT = 60.0
+# Бюджеты операций: медиана времени в мс и число виджетов после операции.
+# Пиковый RSS (МБ) проверяется один раз для всего прогона.
+BUDGETS = {
+    'refresh_task_list': {'median_ms': 500, 'widgets': 400},
+    'refresh_task_list (сверка)': {'median_ms': 300, 'widgets': 400},
+    'refresh_tags_list': {'median_ms': 200, 'widgets': 400},
+    'refresh_notes_list': {'median_ms': 1500, 'widgets': 400},
+    'refresh_notes_list (сверка)': {'median_ms': 500, 'widgets': 400},
+    'open_note_in_editor': {'median_ms': 500, 'widgets': 400},
+    'смена темы': {'median_ms': 1500, 'widgets': 400},
+}
+MAX_RSS_MB = 1024
+
+
+def peak_rss_mb():
+    # ru_maxrss - в килобайтах в Linux и в байтах в macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return round(peak / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+
+def wait_idle(app, window, timeout=IDLE_TIMEOUT):
+    """Обрабатывает события, пока не закончатся фоновые запросы и отрисовка предпросмотра."""
+    executor, preview = window.db_executor, window.preview_engine
+    deadline = time.perf_counter() + timeout
+    while True:
+        app.processEvents()
+        if (not executor._jobs and executor.thread_pool.activeThreadCount() == 0 and
+                not preview._busy and not preview.timer.isActive()):
+            app.processEvents()
+            return
+        if time.perf_counter() > deadline:
+            raise TimeoutError("окно не завершило обновление за отведенное время")
+        time.sleep(0.0005)
+
+
+def operations(app, window, themes):
+    """(название, подготовка, операция); подготовка не входит в замер."""
+    def nothing():
+        pass
+
+    def show_tasks():
+        window.on_main_nav_clicked(window.main_nav_list.item(0))
+        wait_idle(app, window)
+
+    def clear_notes():
+        window.notes_list_widget.clear()
+
+    def open_first_note():
+        window.open_note_in_editor(window.notes_list_widget.item(0))
+
+    def close_editor():
+        window.close_note_editor()
+        window.note_repository.discard(window.notes_list_widget.item(0).data(Qt.ItemDataRole.UserRole))
+
+    def switch_theme():
+        theme = next(themes)
+        save_theme_setting(theme)
+        apply_stylesheet(app, theme)
+        window.theme_has_changed()
+
+    return [
+        ('refresh_task_list', show_tasks, lambda: window.refresh_task_list(animated=True)),
+        ('refresh_task_list (сверка)', nothing, window.refresh_task_list),
+        ('refresh_tags_list', nothing, window.refresh_tags_list),
+        ('refresh_notes_list', clear_notes, window.refresh_notes_list),
+        ('refresh_notes_list (сверка)', nothing, window.refresh_notes_list),
+        ('open_note_in_editor', close_editor, open_first_note),
+        ('смена темы', show_tasks, switch_theme),
+    ]
+
+
+def run(app, window, repeat):
+    original_theme = load_theme_setting()
+    themes = iter(THEMES * repeat * 2)
+    results = []
+    try:
+        for name, prepare, operation in operations(app, window, themes):
+            timings = []
+            for _ in range(repeat):
+                prepare()
+                wait_idle(app, window)
+                started = time.perf_counter()
+                operation()
+                wait_idle(app, window)
+                timings.append((time.perf_counter() - started) * 1000)
+            timings.sort()
+            results.append({
+                'operation': name,
+                'median_ms': round(statistics.median(timings), 2),
+                'max_ms': round(timings[-1], 2),
+                'widgets': len(app.allWidgets()),
+                'peak_rss_mb': peak_rss_mb(),
+            })
+    finally:
+        if load_theme_setting() != original_theme:
+            save_theme_setting(original_theme)
+    return results
+
+
+def check_budgets(results, budgets, max_rss_mb):
+    failures = []
+    for row in results:
+        budget = budgets.get(row['operation'], {})
+        for field in ('median_ms', 'widgets'):
+            if field in budget and row[field] > budget[field]:
+                failures.append(f"{row['operation']}: {field} = {row[field]} > {budget[field]}")
+    peak = max((row['peak_rss_mb'] for row in results), default=0)
+    if peak > max_rss_mb:
+        failures.append(f"пиковый RSS = {peak} МБ > {max_rss_mb} МБ")
+    return failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--tasks", type=int, default=10000, help="сколько задач добавить (по умолчанию 10000)")
+    parser.add_argument("--notes", type=int, default=None, help="сколько заметок добавить (по умолчанию tasks / 10)")
+    parser.add_argument("--repeat", type=int, default=5, help="повторов каждой операции (по умолчанию 5)")
+    parser.add_argument("--seed", type=int, default=1, help="начальное значение генератора случайных чисел")
+    parser.add_argument("--skip-seed", action="store_true", help="не наполнять базу, замерить текущие данные")
+    parser.add_argument("--budgets", default=None,
+                        help="JSON-файл с бюджетами в формате BUDGETS и необязательным ключом max_rss_mb")
+    parser.add_argument("--output", default=None, help="файл результатов JSON (по умолчанию - только вывод на экран)")
+    args = parser.parse_args()
+    notes = args.tasks // 10 if args.notes is None else args.notes
+
+    budgets, max_rss_mb = dict(BUDGETS), MAX_RSS_MB
+    if args.budgets:
+        with open(args.budgets, encoding='utf-8') as f:
+            overrides = json.load(f)
+        max_rss_mb = overrides.pop('max_rss_mb', max_rss_mb)
+        budgets.update(overrides)
+
+    app = QApplication.instance() or QApplication(sys.argv)
+    apply_stylesheet(app, load_theme_setting())
+    started_at = datetime.datetime.now().astimezone()
+    seeded = None
+    window = MainWindow()
+    try:
+        if not args.skip_seed:
+            seeded = seed(window.db, random.Random(args.seed), args.tasks, notes, 0)
+        window.show()
+        wait_idle(app, window)
+        results = run(app, window, args.repeat)
+        env = environment(window.db)
+    finally:
+        if seeded is not None:
+            cleanup(window.db, seeded)
+        window.close()
+
+    failures = check_budgets(results, budgets, max_rss_mb)
+    for row in results:
+        print(f"{row['operation']:<30} {row['median_ms']:>9.1f} мс (макс. {row['max_ms']:.1f})  "
+              f"виджетов: {row['widgets']:<5} RSS: {row['peak_rss_mb']} МБ")
+    for failure in failures:
+        print(f"Превышен бюджет: {failure}")
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump({
+                'benchmark': 'gui_refresh',
+                'timestamp': started_at.isoformat(),
+                'parameters': {'tasks': 0 if args.skip_seed else args.tasks, 'notes': 0 if args.skip_seed else notes,
+                               'repeat': args.repeat, 'seed': args.seed},
+                'environment': env,
+                'budgets': {**budgets, 'max_rss_mb': max_rss_mb},
+                'results': results,
+                'failures': failures,
+            }, f, ensure_ascii=False, indent=2, default=str)
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
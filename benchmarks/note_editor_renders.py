@@ -0,0 +1,79 @@
+# benchmarks/note_editor_renders.py
+"""
+Проверка: одно нажатие клавиши в редакторе заметок вызывает ровно одну
+отрисовку предпросмотра Markdown, сколько бы заметок ни открывалось до этого.
+
+Запуск из корня проекта (база данных не нужна):
+    python benchmarks/note_editor_renders.py
+Код возврата 1, если число отрисовок на нажатие отличается от 1.
+"""
+
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+from PyQt6.QtGui import QTextCursor
+from PyQt6.QtTest import QTest
+from PyQt6.QtWidgets import QApplication, QLineEdit, QTextBrowser, QTextEdit
+from markdown_preview import MarkdownPreview
+from note_editor import NoteEditor
+
+OPENED_NOTES = 20
+KEYSTROKES = 50
+RENDER_TIMEOUT = 5.0
+
+
+class _NoDatabase:
+    """Исполнитель запросов для новой (несохраненной) заметки: к базе она не обращается."""
+    db = None
+
+
+def wait_for(app, condition, timeout=RENDER_TIMEOUT):
+    deadline = time.perf_counter() + timeout
+    while not condition():
+        if time.perf_counter() > deadline:
+            return False
+        app.processEvents()
+        time.sleep(0.001)
+    return True
+
+
+def main():
+    app = QApplication.instance() or QApplication(sys.argv)
+    title_edit, content_edit, browser = QLineEdit(), QTextEdit(), QTextBrowser()
+    preview = MarkdownPreview(content_edit, browser)
+    editor = NoteEditor(title_edit, content_edit, preview, _NoDatabase(), None)
+    renders = []
+    preview.rendered.connect(lambda *args: renders.append(time.perf_counter()))
+
+    for number in range(OPENED_NOTES):
+        editor.open(None, {'title': f"Заметка {number}", 'content': f"# Заметка {number}\n\nТекст"})
+        wait_for(app, lambda: not preview._busy and not preview.timer.isActive())
+    content_edit.moveCursor(QTextCursor.MoveOperation.End)
+
+    renders.clear()
+    latencies = []
+    for _ in range(KEYSTROKES):
+        expected = len(renders) + 1
+        started = time.perf_counter()
+        QTest.keyClick(content_edit, "a")
+        if not wait_for(app, lambda: len(renders) >= expected):
+            break
+        latencies.append(renders[-1] - started)
+        # Лишние отрисовки пришли бы в течение еще одного интервала задержки
+        QTest.qWait(preview.RENDER_DELAY_MS + 20)
+
+    per_keystroke = len(renders) / KEYSTROKES
+    latencies.sort()
+    median = latencies[len(latencies) // 2] * 1000 if latencies else float('nan')
+    print(f"Открыто заметок: {OPENED_NOTES}, нажатий: {KEYSTROKES}, отрисовок: {len(renders)} "
+          f"({per_keystroke:.2f} на нажатие), медиана задержки: {median:.1f} мс")
+    preview.shutdown()
+    return 0 if len(renders) == KEYSTROKES else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
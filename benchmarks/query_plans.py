@@ -0,0 +1,118 @@
+# benchmarks/query_plans.py
+"""
+Сравнивает планы основных запросов списка задач и напоминаний с индексами
+и без них (enable_indexscan/enable_bitmapscan = off).
+
+Тестовые задачи добавляются во временной транзакции, которая в конце
+откатывается, поэтому база из config.ini не изменяется.
+
+    python benchmarks/query_plans.py --tasks 100000
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import psycopg2.extras
+from database import DatabaseManager, TASK_SORT_KEYS, TASK_PAGE_SIZE, TASK_LIST_COLUMNS
+
+DISABLE_INDEXES = ("SET LOCAL enable_indexscan = off", "SET LOCAL enable_indexonlyscan = off",
+                   "SET LOCAL enable_bitmapscan = off")
+ENABLE_INDEXES = ("SET LOCAL enable_indexscan = on", "SET LOCAL enable_indexonlyscan = on",
+                  "SET LOCAL enable_bitmapscan = on")
+
+
+def seed(cursor, count):
+    cursor.execute('''
+        INSERT INTO tasks (title, details, tags, due_date, status, priority, created_at)
+        SELECT 'Задача ' || i, 'Описание задачи ' || i, '',
+               CASE WHEN i %% 5 = 0 THEN NULL ELSE current_date + (i %% 365 - 180) END,
+               (ARRAY['К выполнению', 'В процессе', 'Отложено', 'Завершено'])[i %% 4 + 1],
+               (i / 3) %% 4, now() - make_interval(mins => i)
+        FROM generate_series(1, %s) AS i
+    ''', (count,))
+    cursor.execute('''
+        INSERT INTO reminders (task_id, reminder_datetime)
+        SELECT id, now() + make_interval(hours => id % 2000 - 20) FROM tasks WHERE id % 3 = 0
+    ''')
+    cursor.execute("ANALYZE tasks")
+    cursor.execute("ANALYZE reminders")
+
+
+def explain(cursor, settings, query, params):
+    for statement in settings:
+        cursor.execute(statement)
+    cursor.execute("EXPLAIN (ANALYZE, FORMAT JSON) " + query, params)
+    plan = cursor.fetchone()['QUERY PLAN'][0]
+    node = plan['Plan']
+    while node['Node Type'] == 'Limit':
+        node = node['Plans'][0]
+    return {'node': node['Node Type'], 'index': node.get('Index Name'), 'ms': plan['Execution Time']}
+
+
+def query_shapes(db, cursor):
+    shapes = []
+    for sort_by in TASK_SORT_KEYS:
+        for filter_by in ('active', 'completed', 'important'):
+            shapes.append((f"{filter_by}/{sort_by}",
+                           db._tasks_page_query(filter_by, None, sort_by, None, None, None, TASK_PAGE_SIZE, TASK_LIST_COLUMNS)))
+        # Страница из середины списка: keyset-условие должно использовать индекс, а не фильтр
+        query, params = db._tasks_page_query('active', None, sort_by, None, None, None, 1, TASK_LIST_COLUMNS)
+        cursor.execute(query.replace("LIMIT %s", "OFFSET %s LIMIT 1"), params[:-1] + [100 * TASK_PAGE_SIZE])
+        middle = cursor.fetchone()
+        if middle is not None:
+            shapes.append((f"active/{sort_by} (страница 100)",
+                           db._tasks_page_query('active', None, sort_by, None, None, middle, TASK_PAGE_SIZE, TASK_LIST_COLUMNS)))
+    cursor.execute("SELECT current_date AS today, current_date + 30 AS month")
+    dates = cursor.fetchone()
+    shapes.append(("date/priority", db._tasks_page_query('date', dates['today'], 'priority', None, None, None,
+                                                         TASK_PAGE_SIZE, TASK_LIST_COLUMNS)))
+    shapes.append(("range/priority", db._tasks_page_query('all', None, 'priority', dates['today'], dates['month'], None,
+                                                          TASK_PAGE_SIZE, TASK_LIST_COLUMNS)))
+    shapes.append(("due reminders", (
+        "SELECT r.id as reminder_id, r.reminder_datetime, t.id as task_id, t.title FROM reminders r "
+        "JOIN tasks t ON r.task_id = t.id WHERE r.reminder_datetime <= now() "
+        "AND t.status != 'Завершено'", [])))
+    return shapes
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--tasks", type=int, default=100000, help="сколько тестовых задач добавить (по умолчанию 100000)")
+    parser.add_argument("--json", action="store_true", help="вывести результаты в формате JSON")
+    args = parser.parse_args()
+
+    db = DatabaseManager()
+    conn = db.pool.getconn()
+    results = []
+    try:
+        with conn.cursor(cursor_factory=psycopg2.extras.RealDictCursor) as cursor:
+            started = time.perf_counter()
+            seed(cursor, args.tasks)
+            if not args.json:
+                print(f"Добавлено {args.tasks} задач за {time.perf_counter() - started:.1f} с\n")
+            for name, (query, params) in query_shapes(db, cursor):
+                without = explain(cursor, DISABLE_INDEXES, query, params)
+                with_indexes = explain(cursor, ENABLE_INDEXES, query, params)
+                results.append({'query': name, 'without_indexes': without, 'with_indexes': with_indexes})
+    finally:
+        conn.rollback()
+        db.pool.putconn(conn)
+        db.close()
+
+    if args.json:
+        print(json.dumps(results, ensure_ascii=False, indent=2))
+        return
+    print(f"{'Запрос':<38} {'без индексов':>14} {'с индексами':>14}  план")
+    for row in results:
+        plan = row['with_indexes']
+        print(f"{row['query']:<38} {row['without_indexes']['ms']:>11.2f} мс {plan['ms']:>11.2f} мс  "
+              f"{plan['node']}{' ' + plan['index'] if plan['index'] else ''}")
+
+
+if __name__ == "__main__":
+    main()
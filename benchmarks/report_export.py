@@ -0,0 +1,98 @@
+# benchmarks/report_export.py
+"""
+Время сохранения отчета Excel (write_task_report по stream_tasks, как в
+MainWindow.save_report_as_excel) и пиковый объем памяти процесса (RSS).
+База из config.ini наполняется так же, как в db_load.py; добавленные
+строки в конце удаляются.
+
+    python benchmarks/report_export.py --tasks 50000 --output report.json
+"""
+
+import argparse
+import datetime
+import json
+import os
+import random
+import resource
+import statistics
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+from database import DatabaseManager
+from main import REPORT_COLUMNS
+from report_writer import write_task_report
+from db_load import seed, cleanup, environment
+
+
+def peak_rss_mb():
+    # ru_maxrss - в килобайтах в Linux и в байтах в macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return round(peak / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+
+def save_report(db, path):
+    summary = db.get_report_summary()
+    return write_task_report(path, summary, db.stream_tasks(columns=REPORT_COLUMNS))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--tasks", type=int, default=50000, help="сколько задач добавить (по умолчанию 50000)")
+    parser.add_argument("--repeat", type=int, default=3, help="повторов сохранения (по умолчанию 3)")
+    parser.add_argument("--seed", type=int, default=1, help="начальное значение генератора случайных чисел")
+    parser.add_argument("--skip-seed", action="store_true", help="не наполнять базу, замерить текущие данные")
+    parser.add_argument("--output", default=None, help="файл результатов JSON (по умолчанию - только вывод на экран)")
+    args = parser.parse_args()
+
+    started_at = datetime.datetime.now().astimezone()
+    db = DatabaseManager()
+    seeded = None
+    timings, rows, size = [], 0, 0
+    try:
+        if not args.skip_seed:
+            seeded = seed(db, random.Random(args.seed), args.tasks, 0, 0)
+        rss_before = peak_rss_mb()
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "report.xlsx")
+            for _ in range(args.repeat):
+                started = time.perf_counter()
+                rows = save_report(db, path)
+                timings.append((time.perf_counter() - started) * 1000)
+                size = os.path.getsize(path)
+        env = environment(db)
+    finally:
+        if seeded is not None:
+            cleanup(db, seeded)
+        db.close()
+
+    timings.sort()
+    result = {
+        'rows': rows,
+        'file_bytes': size,
+        'median_ms': round(statistics.median(timings), 2),
+        'max_ms': round(timings[-1], 2),
+        'peak_rss_mb_before': rss_before,
+        'peak_rss_mb': peak_rss_mb(),
+    }
+    print(f"Отчет: {rows} задач, {size / 1024 / 1024:.1f} МБ, {result['median_ms']:.0f} мс "
+          f"(макс. {result['max_ms']:.0f}), пиковый RSS {result['peak_rss_mb']} МБ "
+          f"(до сохранения {rss_before} МБ)")
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump({
+                'benchmark': 'report_export',
+                'timestamp': started_at.isoformat(),
+                'parameters': {'tasks': 0 if args.skip_seed else args.tasks, 'repeat': args.repeat, 'seed': args.seed},
+                'environment': env,
+                'result': result,
+            }, f, ensure_ascii=False, indent=2, default=str)
+
+
+if __name__ == "__main__":
+    main()
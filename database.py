@@ -2,16 +2,60 @@
 
 import psycopg2
 import psycopg2.extras # для RealDictCursor
+import psycopg2.pool
 import datetime
-from collections import Counter
+import itertools
+import json
+import re
+import select
+import threading
+import weakref
+from collections import Counter, OrderedDict
+from contextlib import contextmanager
 import configparser
 import os
+from migrations import apply_migrations, CHANGES_CHANNEL, BULK_CHANGES_SETTING
+from slow_queries import open_slow_query_log
 
 # --- Константы ---
 PRIORITIES = {0: "Нет", 1: "Низкий", 2: "Средний", 3: "Высокий"}
 STATUSES = ["К выполнению", "В процессе", "Отложено", "Завершено"]
 WELCOME_NOTE_TITLE = "Добро пожаловать в Denkwürfel!"
 
+# Размер пула соединений. Одно соединение остается за потоком интерфейса,
+# остальные используют фоновые потоки (см. db_worker.DatabaseExecutor).
+POOL_MIN_CONNECTIONS = 1
+POOL_MAX_CONNECTIONS = 4
+
+# Колонки, которые нужны списку задач. Длинное поле details загружается отдельно;
+# по updated_at список узнает измененные строки.
+TASK_LIST_COLUMNS = ("id", "title", "tags", "due_date", "status", "priority", "created_at", "updated_at")
+TASK_PAGE_SIZE = 200
+# Колонки списка заметок; текст заметки загружает NoteRepository
+NOTE_LIST_COLUMNS = ("id", "title", "updated_at")
+# Все колонки строки для карточки задачи и редактора заметки (без служебных search_vector и sync_xid)
+TASK_COLUMNS = ("id", "title", "details", "tags", "due_date", "status", "priority", "created_at", "updated_at", "version")
+NOTE_COLUMNS = ("id", "title", "content", "created_at", "updated_at", "version")
+# Массовый импорт: строк в одном INSERT; экспорт: строк за одно обращение к серверному курсору
+IMPORT_BATCH_SIZE = 1000
+EXPORT_FETCH_SIZE = 2000
+# Подготовленных операторов (PREPARE) на одно соединение; давно не использованные удаляются
+MAX_PREPARED_STATEMENTS = 100
+# Сколько хранятся записи об удаленных строках для синхронизации локальных кэшей
+DELETED_ROWS_RETENTION = datetime.timedelta(days=30)
+QUERIES_SECTION = 'queries'
+
+# Ключи сортировки для постраничной выборки: (колонка, направление, допускает ли NULL).
+# id в конце делает порядок однозначным; NULL в колонках ASC идут последними.
+TASK_SORT_KEYS = {
+    'priority': (('priority', 'DESC', False), ('due_date', 'ASC', True), ('created_at', 'DESC', False), ('id', 'DESC', False)),
+    'due_date': (('due_date', 'ASC', True), ('priority', 'DESC', False), ('created_at', 'DESC', False), ('id', 'DESC', False)),
+    'creation_date': (('created_at', 'DESC', False), ('id', 'DESC', False)),
+    'alphabetical': (('title', 'ASC', False), ('id', 'ASC', False)),
+}
+# Результаты поиска упорядочены по релевантности
+SEARCH_SORT_KEY = (('rank', 'DESC', False), ('id', 'DESC', False))
+
 def read_db_config(filename='config.ini', section='postgresql'):
     if not os.path.exists(filename):
         raise Exception(f"Файл конфигурации {filename} не найден!")
@@ -29,54 +73,267 @@ def read_db_config(filename='config.ini', section='postgresql'):
         
     return db
 
+def read_prepared_statements_setting(filename='config.ini'):
+    """
+    Использовать ли подготовленные операторы (раздел [queries], prepared_statements).
+    Их нужно выключить при подключении через пулер в режиме транзакций (pgbouncer):
+    оператор существует только в одном серверном соединении.
+    """
+    parser = configparser.ConfigParser()
+    parser.read(filename)
+    return parser.getboolean(QUERIES_SECTION, 'prepared_statements', fallback=True)
+
+def _numbered_placeholders(query):
+    """Запрос с параметрами %s в виде $1, $2, ... для PREPARE."""
+    numbers = itertools.count(1)
+    return re.sub(r'%%|%s', lambda match: '%' if match.group() == '%%' else f"${next(numbers)}", query)
+
+def _batches(rows, size):
+    rows = iter(rows)
+    while batch := list(itertools.islice(rows, size)):
+        yield batch
+
+# Лексема в текстовом виде tsquery: 'отчет':*
+_TSQUERY_LEXEME = re.compile(r"'((?:[^']|'')*)'")
+
+def search_terms(query_str):
+    """Слова поискового запроса в нижнем регистре, без знаков синтаксиса tsquery."""
+    return re.findall(r'\w+', query_str.lower())
+
+class ChangeListener:
+    """
+    Отдельное соединение, подписанное (LISTEN) на канал изменений CHANGES_CHANNEL.
+    wait() блокирует вызывающий поток до прихода уведомлений или истечения таймаута.
+    Уведомления от соединений из ignore_pids (свои изменения клиента) пропускаются.
+    """
+    def __init__(self, params, ignore_pids=()):
+        self.ignore_pids = ignore_pids
+        self.conn = psycopg2.connect(**params)
+        self.conn.autocommit = True
+        with self.conn.cursor() as cursor:
+            cursor.execute(f"LISTEN {CHANGES_CHANNEL}")
+
+    def wait(self, timeout):
+        """Список изменений вида {'table', 'op', 'id', 'pid'[, 'task_id']}; пустой по таймауту."""
+        if self.conn.notifies:
+            ready = True
+        else:
+            ready = select.select([self.conn], [], [], timeout)[0]
+        if ready:
+            self.conn.poll()
+        changes = []
+        for notify in self.conn.notifies:
+            change = json.loads(notify.payload)
+            if change['pid'] not in self.ignore_pids:
+                changes.append(change)
+        self.conn.notifies.clear()
+        return changes
+
+    def close(self):
+        self.conn.close()
+
+class TaskBatch:
+    """
+    Набор изменений задач (unit of work). Изменения накапливаются в памяти и
+    применяются DatabaseManager.apply_task_batch в одной транзакции: одним
+    запросом на группу задач, а не на каждую задачу.
+    """
+    # Поля, которые можно менять пакетом, и их типы в VALUES
+    FIELDS = {'title': 'text', 'details': 'text', 'tags': 'text', 'due_date': 'date',
+              'status': 'text', 'priority': 'integer'}
+
+    def __init__(self):
+        self.updates = {}
+        self.added_tags = {}
+        self.removed_tags = {}
+        self.deleted = set()
+
+    def update(self, task_ids, **fields):
+        """Одинаковые значения полей для задач task_ids."""
+        unknown = set(fields) - set(self.FIELDS)
+        if unknown:
+            raise ValueError(f"Поля нельзя изменить пакетом: {', '.join(sorted(unknown))}")
+        for task_id in task_ids:
+            self.updates.setdefault(task_id, {}).update(fields)
+        return self
+
+    def add_tags(self, task_ids, tags):
+        for tag in _tag_names(tags):
+            self.added_tags.setdefault(tag, set()).update(task_ids)
+        return self
+
+    def remove_tags(self, task_ids, tags):
+        for tag in _tag_names(tags):
+            self.removed_tags.setdefault(tag, set()).update(task_ids)
+        return self
+
+    def delete(self, task_ids):
+        self.deleted.update(task_ids)
+        return self
+
+    def task_ids(self):
+        """Все задачи, которых касается пакет."""
+        ids = set(self.updates) | self.deleted
+        for task_ids in (*self.added_tags.values(), *self.removed_tags.values()):
+            ids |= task_ids
+        return ids
+
+    def edit_tags(self, task_id, tags):
+        """Строка тегов задачи task_id после добавления и удаления тегов пакета."""
+        names = [tag for tag in _tag_names(tags or "") if task_id not in self.removed_tags.get(tag, ())]
+        names += [tag for tag, task_ids in self.added_tags.items() if task_id in task_ids and tag not in names]
+        return ','.join(names)
+
+    def __bool__(self):
+        return bool(self.updates or self.added_tags or self.removed_tags or self.deleted)
+
+def _tag_names(tags_string):
+    return list(dict.fromkeys(tag.strip() for tag in tags_string.split(',') if tag.strip()))
+
 class DatabaseManager:
     def __init__(self):
         try:
             params = read_db_config()
-            self.conn = psycopg2.connect(**params)
-            self.cursor = self.conn.cursor(cursor_factory=psycopg2.extras.RealDictCursor)
+            self._params = params
+            self.pool = psycopg2.pool.ThreadedConnectionPool(POOL_MIN_CONNECTIONS, POOL_MAX_CONNECTIONS, **params)
+            self._local = threading.local()
+            # pid серверных процессов соединений пула: по ним ChangeListener отличает свои изменения
+            self._backend_pids = set()
+            self._active_connections = {}
+            self._active_lock = threading.Lock()
+            self._stream_ids = itertools.count(1)
+            # Журнал медленных запросов (None, если выключен в config.ini)
+            self.slow_query_log = open_slow_query_log()
+            self._cursor_factory = (self.slow_query_log.cursor_factory if self.slow_query_log
+                                    else psycopg2.extras.RealDictCursor)
+            # Соединение -> {текст запроса: имя подготовленного оператора} в порядке использования
+            self.use_prepared_statements = read_prepared_statements_setting()
+            self._prepared = weakref.WeakKeyDictionary()
+            self._prepared_lock = threading.Lock()
+            self._statement_ids = itertools.count(1)
             self._create_tables()
             self._ensure_welcome_note_exists()
         except Exception as e:
             print(f"Ошибка подключения к PostgreSQL: {e}")
             raise e
 
+    @contextmanager
+    def _cursor(self):
+        """Курсор соединения из пула. Вложенные вызовы в одном потоке используют одну транзакцию."""
+        cursor = getattr(self._local, 'cursor', None)
+        if cursor is not None:
+            yield cursor
+            return
+        conn = self.pool.getconn()
+        self._backend_pids.add(conn.get_backend_pid())
+        thread_id = threading.get_ident()
+        with self._active_lock:
+            self._active_connections[thread_id] = conn
+        try:
+            with conn.cursor(cursor_factory=self._cursor_factory) as cursor:
+                self._local.cursor = cursor
+                try:
+                    yield cursor
+                    conn.commit()
+                except BaseException:
+                    if not conn.closed:
+                        conn.rollback()
+                    raise
+                finally:
+                    self._local.cursor = None
+        finally:
+            with self._active_lock:
+                self._active_connections.pop(thread_id, None)
+            self.pool.putconn(conn, close=bool(conn.closed))
+
+    @contextmanager
+    def transaction(self):
+        """Объединяет вызовы методов внутри блока в одну транзакцию."""
+        with self._cursor():
+            yield
+
+    @contextmanager
+    def bulk_changes(self, *tables):
+        """
+        Транзакция массового изменения таблиц tables: триггеры не уведомляют о каждой
+        строке, а после блока другие клиенты получают одно уведомление RESYNC.
+        """
+        with self._cursor() as cursor:
+            cursor.execute("SELECT set_config(%s, 'on', true)", (BULK_CHANGES_SETTING,))
+            yield cursor
+            for table in tables:
+                cursor.execute(
+                    "SELECT pg_notify(%s, json_build_object('table', %s, 'op', 'RESYNC', 'id', NULL, 'pid', pg_backend_pid())::text)",
+                    (CHANGES_CHANNEL, table)
+                )
+
+    def listen_changes(self):
+        """Новое соединение-слушатель уведомлений об изменениях, сделанных другими клиентами."""
+        return ChangeListener(self._params, self._backend_pids)
+
+    def cancel_query(self, thread_id):
+        """Прерывает запрос, который выполняется в указанном потоке (если он есть)."""
+        with self._active_lock:
+            conn = self._active_connections.get(thread_id)
+            if conn is not None and not conn.closed:
+                conn.cancel()
+
+    def _execute(self, cursor, query, params=()):
+        """
+        Выполняет запрос частого вида как подготовленный оператор соединения курсора:
+        PREPARE при первом выполнении запроса с таким текстом (текст определяется фильтром,
+        сортировкой, наличием диапазона дат и колонками), затем только EXECUTE - сервер
+        не разбирает и не планирует запрос заново.
+        """
+        if not self.use_prepared_statements:
+            cursor.execute(query, params)
+            return
+        with self._prepared_lock:
+            statements = self._prepared.setdefault(cursor.connection, OrderedDict())
+        name = statements.get(query)
+        if name is None:
+            name = f"denk_{next(self._statement_ids)}"
+            cursor.execute(f"PREPARE {name} AS {_numbered_placeholders(query)}")
+            # Оператор остается в соединении и после отката транзакции
+            statements[query] = name
+            if len(statements) > MAX_PREPARED_STATEMENTS:
+                _, oldest = statements.popitem(last=False)
+                cursor.execute(f"DEALLOCATE {oldest}")
+        else:
+            statements.move_to_end(query)
+        if params:
+            cursor.execute(f"EXECUTE {name} ({', '.join(['%s'] * len(params))})", params)
+        else:
+            cursor.execute(f"EXECUTE {name}")
+
     def _create_tables(self):
-        self.cursor.execute('''
-            CREATE TABLE IF NOT EXISTS tasks (
-                id SERIAL PRIMARY KEY,
-                title TEXT NOT NULL,
-                details TEXT,
-                tags TEXT,
-                due_date TEXT,
-                status VARCHAR(20) DEFAULT 'К выполнению' NOT NULL,
-                priority INTEGER DEFAULT 0 NOT NULL,
-                created_at TEXT NOT NULL
-            )
-        ''')
-        self.cursor.execute('''
-            CREATE TABLE IF NOT EXISTS reminders (
-                id SERIAL PRIMARY KEY,
-                task_id INTEGER NOT NULL,
-                reminder_datetime TEXT NOT NULL,
-                FOREIGN KEY (task_id) REFERENCES tasks(id) ON DELETE CASCADE
-            )
-        ''')
-        self.cursor.execute('''
-            CREATE TABLE IF NOT EXISTS notes (
-                id SERIAL PRIMARY KEY,
-                title TEXT NOT NULL,
-                content TEXT,
-                created_at TEXT NOT NULL,
-                updated_at TEXT NOT NULL
-            )
-        ''')
-        self.conn.commit()
+        self.schema_version = apply_migrations(self._cursor)
+        with self._cursor() as cursor:
+            self._ensure_trigram_indexes(cursor)
+        # Один раз при подключении, чтобы выборка изменений (get_changes_since) оставалась только чтением
+        self.prune_deleted_rows()
+
+    def _ensure_trigram_indexes(self, cursor):
+        """Триграммный индекс для поиска с опечатками, если на сервере доступен pg_trgm."""
+        # pg_trgm может быть не установлен на сервере или недоступен пользователю
+        cursor.execute("SAVEPOINT create_pg_trgm")
+        try:
+            cursor.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+            cursor.execute("RELEASE SAVEPOINT create_pg_trgm")
+        except psycopg2.Error:
+            cursor.execute("ROLLBACK TO SAVEPOINT create_pg_trgm")
+        cursor.execute("SELECT EXISTS (SELECT 1 FROM pg_extension WHERE extname = 'pg_trgm') AS available")
+        self.trigram_available = cursor.fetchone()['available']
+        if self.trigram_available:
+            cursor.execute("CREATE INDEX IF NOT EXISTS tasks_title_trgm_idx ON tasks USING GIN (title gin_trgm_ops)")
+            cursor.execute("CREATE INDEX IF NOT EXISTS notes_title_trgm_idx ON notes USING GIN (title gin_trgm_ops)")
 
     def _ensure_welcome_note_exists(self):
         """Проверяет наличие приветственной заметки и создает ее, если она отсутствует."""
-        self.cursor.execute("SELECT id FROM notes WHERE title = %s", (WELCOME_NOTE_TITLE,))
-        if self.cursor.fetchone() is None:
+        with self._cursor() as cursor:
+            cursor.execute("SELECT id FROM notes WHERE title = %s", (WELCOME_NOTE_TITLE,))
+            exists = cursor.fetchone() is not None
+        if not exists:
             welcome_content = """
 # Добро пожаловать в Denkwürfel!
 
@@ -107,21 +364,66 @@ class DatabaseManager:
     def _clean_tags(self, tags_string: str) -> str:
         return ','.join(tag.strip() for tag in tags_string.split(',') if tag.strip())
 
-    def add_task(self, title, details="", tags="", due_date=None, priority=0, status="К выполнению"):
-        now = datetime.datetime.now().isoformat()
-        if isinstance(due_date, datetime.date):
-            due_date = due_date.isoformat()
-        cleaned_tags = self._clean_tags(tags)
-        self.cursor.execute(
-            'INSERT INTO tasks (title, details, tags, due_date, priority, status, created_at) VALUES (%s, %s, %s, %s, %s, %s, %s) RETURNING id',
-            (title, details, cleaned_tags, due_date, priority, status, now)
+    def _set_task_tags(self, cursor, task_id, cleaned_tags):
+        names = list(dict.fromkeys(cleaned_tags.split(','))) if cleaned_tags else []
+        cursor.execute(
+            "DELETE FROM task_tags WHERE task_id = %s AND tag_id NOT IN (SELECT id FROM tags WHERE name = ANY(%s::text[]))",
+            (task_id, names)
         )
-        new_id = self.cursor.fetchone()['id']
-        self.conn.commit()
-        return new_id
+        if names:
+            cursor.execute("INSERT INTO tags (name) SELECT unnest(%s::text[]) ON CONFLICT (name) DO NOTHING", (names,))
+            cursor.execute(
+                "INSERT INTO task_tags (task_id, tag_id) SELECT %s, id FROM tags WHERE name = ANY(%s::text[]) ON CONFLICT DO NOTHING",
+                (task_id, names)
+            )
 
-    def get_tasks(self, filter_by='all', value=None, sort_by='priority', start_date=None, end_date=None):
-        query = "SELECT * FROM tasks"
+    @staticmethod
+    def _order_by(sort_key):
+        parts = []
+        for column, direction, nullable in sort_key:
+            parts.append(f"{column} {direction}" + (" NULLS LAST" if nullable else ""))
+        return " ORDER BY " + ", ".join(parts)
+
+    @staticmethod
+    def _keyset_condition(sort_key, after):
+        """Условие "строка идет после after" для ключа сортировки (keyset-пагинация)."""
+        clauses, params = [], []
+        for i, (column, direction, nullable) in enumerate(sort_key):
+            if after[column] is None:
+                # При NULLS LAST после NULL могут идти только строки с тем же NULL
+                continue
+            parts, part_params = [], []
+            for prev_column, _, _ in sort_key[:i]:
+                if after[prev_column] is None:
+                    parts.append(f"{prev_column} IS NULL")
+                else:
+                    parts.append(f"{prev_column} = %s")
+                    part_params.append(after[prev_column])
+            beyond = f"{column} {'<' if direction == 'DESC' else '>'} %s"
+            if nullable:
+                beyond = f"({beyond} OR {column} IS NULL)"
+            parts.append(beyond)
+            part_params.append(after[column])
+            clauses.append("(" + " AND ".join(parts) + ")")
+            params.extend(part_params)
+        if not clauses:
+            return "FALSE", params
+        condition = "(" + " OR ".join(clauses) + ")"
+        column, direction, nullable = sort_key[0]
+        if not nullable:
+            # Избыточная граница по первой колонке: по ней индекс сортировки
+            # начинает просмотр сразу с нужного места, а не фильтрует предыдущие страницы
+            condition = f"{column} {'<=' if direction == 'DESC' else '>='} %s AND {condition}"
+            params.insert(0, after[column])
+        return condition, params
+
+    @staticmethod
+    def _select_list(columns, sort_key):
+        selected = list(columns)
+        selected += [column for column, _, _ in sort_key if column not in selected]
+        return ", ".join(selected)
+
+    def _task_conditions(self, filter_by, value, start_date, end_date):
         params = []
         conditions = []
 
@@ -134,8 +436,8 @@ class DatabaseManager:
         
         if value is not None:
             if filter_by == 'tag':
-                conditions.append("(tags = %s OR tags LIKE %s OR tags LIKE %s OR tags LIKE %s)")
-                params.extend([value, f'{value},%', f'%,{value},%', f'%,{value}'])
+                conditions.append("id IN (SELECT task_tags.task_id FROM task_tags JOIN tags ON tags.id = task_tags.tag_id WHERE tags.name = %s)")
+                params.append(value)
                 conditions.append("status != 'Завершено'")
             elif filter_by == 'date':
                 conditions.append("due_date = %s")
@@ -144,94 +446,490 @@ class DatabaseManager:
         if start_date and end_date:
             conditions.append("due_date BETWEEN %s AND %s")
             params.extend([start_date, end_date])
+        return conditions, params
 
+    def add_task(self, title, details="", tags="", due_date=None, priority=0, status="К выполнению"):
+        now = datetime.datetime.now().astimezone()
+        cleaned_tags = self._clean_tags(tags)
+        with self._cursor() as cursor:
+            cursor.execute(
+                'INSERT INTO tasks (title, details, tags, due_date, priority, status, created_at) VALUES (%s, %s, %s, %s, %s, %s, %s) RETURNING id',
+                (title, details, cleaned_tags, due_date, priority, status, now)
+            )
+            new_id = cursor.fetchone()['id']
+            self._set_task_tags(cursor, new_id, cleaned_tags)
+            return new_id
+
+    def get_tasks(self, filter_by='all', value=None, sort_by='priority', start_date=None, end_date=None):
+        # Колонки перечислены явно: подготовленный оператор с * ломается, когда миграция добавляет колонку
+        query = f"SELECT {', '.join(TASK_COLUMNS)} FROM tasks"
+        conditions, params = self._task_conditions(filter_by, value, start_date, end_date)
         if conditions:
             query += " WHERE " + " AND ".join(conditions)
-            
-        sort_clauses = {
-            'priority': " ORDER BY priority DESC, due_date ASC NULLS LAST, created_at DESC",
-            'due_date': " ORDER BY due_date ASC NULLS LAST, priority DESC, created_at DESC",
-            'creation_date': " ORDER BY created_at DESC",
-            'alphabetical': " ORDER BY title ASC"
-        }
-        query += sort_clauses.get(sort_by, sort_clauses['priority'])
+        query += self._order_by(TASK_SORT_KEYS.get(sort_by, TASK_SORT_KEYS['priority']))
         
-        self.cursor.execute(query, params)
-        return self.cursor.fetchall()
+        with self._cursor() as cursor:
+            self._execute(cursor, query, params)
+            return cursor.fetchall()
+
+    def get_tasks_page(self, filter_by='all', value=None, sort_by='priority', start_date=None, end_date=None,
+                       after=None, limit=TASK_PAGE_SIZE, columns=TASK_LIST_COLUMNS):
+        """Возвращает следующую страницу задач после строки after (последней строки предыдущей страницы)."""
+        query, params = self._tasks_page_query(filter_by, value, sort_by, start_date, end_date, after, limit, columns)
+        with self._cursor() as cursor:
+            self._execute(cursor, query, params)
+            return cursor.fetchall()
+
+    def _tasks_page_query(self, filter_by, value, sort_by, start_date, end_date, after, limit, columns):
+        sort_key = TASK_SORT_KEYS.get(sort_by, TASK_SORT_KEYS['priority'])
+        conditions, params = self._task_conditions(filter_by, value, start_date, end_date)
+        if after is not None:
+            keyset, keyset_params = self._keyset_condition(sort_key, after)
+            conditions.append(keyset)
+            params.extend(keyset_params)
+        query = f"SELECT {self._select_list(columns, sort_key)} FROM tasks"
+        if conditions:
+            query += " WHERE " + " AND ".join(conditions)
+        query += self._order_by(sort_key) + " LIMIT %s"
+        return query, params + [limit]
+
+    def iter_tasks(self, filter_by='all', value=None, sort_by='priority', start_date=None, end_date=None,
+                   columns=TASK_LIST_COLUMNS, page_size=TASK_PAGE_SIZE):
+        """Перебирает задачи постранично, не загружая всю выборку в память."""
+        after = None
+        while True:
+            page = self.get_tasks_page(filter_by, value, sort_by, start_date, end_date,
+                                       after=after, limit=page_size, columns=columns)
+            yield from page
+            if len(page) < page_size:
+                return
+            after = page[-1]
+
+    def stream_tasks(self, filter_by='all', value=None, sort_by='priority', start_date=None, end_date=None,
+                     columns=TASK_LIST_COLUMNS, fetch_size=EXPORT_FETCH_SIZE):
+        """Все задачи выборки одним запросом через серверный курсор (для экспорта и отчетов)."""
+        sort_key = TASK_SORT_KEYS.get(sort_by, TASK_SORT_KEYS['priority'])
+        conditions, params = self._task_conditions(filter_by, value, start_date, end_date)
+        query = f"SELECT {', '.join(columns)} FROM tasks"
+        if conditions:
+            query += " WHERE " + " AND ".join(conditions)
+        return self._stream(query + self._order_by(sort_key), params, fetch_size)
+
+    def stream_notes(self, columns=("id", "title", "content", "created_at", "updated_at"), fetch_size=EXPORT_FETCH_SIZE):
+        return self._stream(f"SELECT {', '.join(columns)} FROM notes ORDER BY id", [], fetch_size)
+
+    def _stream(self, query, params, fetch_size):
+        """
+        Строки запроса из именованного (серверного) курсора: в памяти клиента не больше
+        fetch_size строк. Генератор держит транзакцию открытой, пока его не дочитают или не закроют.
+        """
+        with self._cursor() as cursor:
+            name = f"stream_{next(self._stream_ids)}"
+            with cursor.connection.cursor(name, cursor_factory=psycopg2.extras.RealDictCursor) as server_cursor:
+                server_cursor.itersize = fetch_size
+                server_cursor.execute(query, params)
+                yield from server_cursor
+
+    def get_tasks_by_ids(self, task_ids, filter_by='all', value=None, columns=TASK_LIST_COLUMNS):
+        """Строки задач из task_ids, подходящие под фильтр (для точечного обновления списка)."""
+        conditions, params = self._task_conditions(filter_by, value, None, None)
+        conditions.append("id = ANY(%s)")
+        params.append(list(task_ids))
+        query = f"SELECT {', '.join(columns)} FROM tasks WHERE " + " AND ".join(conditions)
+        with self._cursor() as cursor:
+            self._execute(cursor, query, params)
+            return cursor.fetchall()
+
+    def get_task_details(self, task_id):
+        with self._cursor() as cursor:
+            cursor.execute("SELECT details FROM tasks WHERE id = %s", (task_id,))
+            row = cursor.fetchone()
+        return row['details'] if row else None
 
     def get_task_by_id(self, task_id):
-        self.cursor.execute("SELECT * FROM tasks WHERE id = %s", (task_id,)); return self.cursor.fetchone()
+        with self._cursor() as cursor:
+            self._execute(cursor, f"SELECT {', '.join(TASK_COLUMNS)} FROM tasks WHERE id = %s", (task_id,))
+            return cursor.fetchone()
 
     def update_task_status(self, task_id, status):
-        self.cursor.execute("UPDATE tasks SET status = %s WHERE id = %s", (status, task_id)); self.conn.commit()
+        with self._cursor() as cursor:
+            cursor.execute("UPDATE tasks SET status = %s WHERE id = %s", (status, task_id))
 
-    def update_task(self, task_id, data: dict):
+    def update_task(self, task_id, data: dict, expected_version=None):
+        """
+        Обновляет поля задачи. С expected_version строка меняется, только если ее
+        версия не изменилась; возвращает, была ли строка обновлена.
+        """
         if 'tags' in data:
             data['tags'] = self._clean_tags(data['tags'])
         fields_to_update = [f"{key} = %s" for key in data]
         if not fields_to_update:
-            return
+            return False
         query = f"UPDATE tasks SET {', '.join(fields_to_update)} WHERE id = %s"
         params = list(data.values()) + [task_id]
-        self.cursor.execute(query, params)
-        self.conn.commit()
+        if expected_version is not None:
+            query += " AND version = %s"
+            params.append(expected_version)
+        with self._cursor() as cursor:
+            cursor.execute(query, params)
+            if cursor.rowcount == 0:
+                return False
+            if 'tags' in data:
+                self._set_task_tags(cursor, task_id, data['tags'])
+            return True
+    def delete_tasks(self, task_ids):
+        with self._cursor() as cursor:
+            cursor.execute("DELETE FROM tasks WHERE id = ANY(%s)", (list(task_ids),))
+
+    def apply_task_batch(self, batch):
+        """Применяет изменения TaskBatch в одной транзакции."""
+        with self._cursor() as cursor:
+            if batch.deleted:
+                self.delete_tasks(batch.deleted)
+            # Задачи с одинаковым набором измененных полей обновляются одним UPDATE ... FROM (VALUES ...)
+            groups = {}
+            for task_id, fields in batch.updates.items():
+                if task_id not in batch.deleted:
+                    groups.setdefault(tuple(sorted(fields)), []).append((task_id, fields))
+            retagged = set()
+            for columns, rows in groups.items():
+                values = [(task_id, *(','.join(_tag_names(fields[column])) if column == 'tags' else fields[column]
+                                      for column in columns)) for task_id, fields in rows]
+                template = "(%s, " + ", ".join(f"%s::{TaskBatch.FIELDS[column]}" for column in columns) + ")"
+                psycopg2.extras.execute_values(
+                    cursor,
+                    f"UPDATE tasks SET {', '.join(f'{column} = v.{column}' for column in columns)} "
+                    f"FROM (VALUES %s) AS v(id, {', '.join(columns)}) WHERE tasks.id = v.id",
+                    values, template=template, page_size=len(values)
+                )
+                if 'tags' in columns:
+                    retagged.update(task_id for task_id, _ in rows)
+            for tag, task_ids in batch.added_tags.items():
+                cursor.execute('''
+                    UPDATE tasks SET tags = CASE WHEN coalesce(tags, '') = '' THEN %s ELSE tags || ',' || %s END
+                    WHERE id = ANY(%s) AND NOT %s = ANY(string_to_array(coalesce(tags, ''), ','))
+                ''', (tag, tag, list(task_ids), tag))
+                retagged |= task_ids
+            for tag, task_ids in batch.removed_tags.items():
+                cursor.execute(
+                    "UPDATE tasks SET tags = array_to_string(array_remove(string_to_array(tags, ','), %s), ',') "
+                    "WHERE id = ANY(%s) AND %s = ANY(string_to_array(tags, ','))",
+                    (tag, list(task_ids), tag)
+                )
+                retagged |= task_ids
+            if retagged - batch.deleted:
+                self._sync_task_tags(cursor, list(retagged - batch.deleted))
+
+    def _sync_task_tags(self, cursor, task_ids):
+        """Приводит task_tags задач task_ids в соответствие с их строковым полем tags."""
+        cursor.execute('''
+            DELETE FROM task_tags USING tasks
+            WHERE task_tags.task_id = tasks.id AND tasks.id = ANY(%s)
+              AND task_tags.tag_id NOT IN (SELECT tags.id FROM tags WHERE tags.name = ANY(string_to_array(tasks.tags, ',')))
+        ''', (task_ids,))
+        self._link_task_tags(cursor, task_ids)
     
+    @staticmethod
+    def _tsquery_sql(terms):
+        """
+        tsquery, в котором каждое слово ищется по префиксу и со стеммингом, и без него.
+        Стоп-слова (пустой запрос в конфигурации russian) пропускаются.
+        """
+        term_sql = ("(CASE WHEN numnode(to_tsquery('russian', %s)) = 0 THEN ''::tsquery "
+                    "ELSE to_tsquery('russian', %s) || to_tsquery('simple', %s) END)")
+        return " && ".join([term_sql] * len(terms)), [f"{term}:*" for term in terms for _ in range(3)]
+
+    def _search_page(self, table, select_sql, conditions, query_str, after, limit):
+        terms = search_terms(query_str)
+        if not terms:
+            return []
+        mode = after['search_mode'] if after is not None else 'fts'
+        rows = []
+        if mode == 'fts':
+            # rank приводится к float8, чтобы значение, вернувшееся клиенту, точно совпало при сравнении в keyset
+            tsquery, params = self._tsquery_sql(terms)
+            inner = (f"SELECT {select_sql}, ts_rank({table}.search_vector, q)::float8 AS rank, 'fts' AS search_mode "
+                     f"FROM {table}, ({'SELECT ' + tsquery} AS q) AS query WHERE {table}.search_vector @@ q")
+            rows = self._run_search_query(inner, conditions, params, after, limit)
+        if mode == 'trgm' or (not rows and after is None and self.trigram_available):
+            # Запасной вариант для опечаток: похожесть слов названия (pg_trgm)
+            phrase = " ".join(terms)
+            inner = (f"SELECT {select_sql}, word_similarity(%s, {table}.title)::float8 AS rank, 'trgm' AS search_mode "
+                     f"FROM {table} WHERE %s <%% {table}.title")
+            rows = self._run_search_query(inner, conditions, [phrase, phrase], after, limit)
+        return rows
+
+    def _run_search_query(self, inner, conditions, params, after, limit):
+        query = inner + "".join(f" AND {condition}" for condition in conditions)
+        query = f"SELECT * FROM ({query}) AS found"
+        params = list(params)
+        if after is not None:
+            keyset, keyset_params = self._keyset_condition(SEARCH_SORT_KEY, after)
+            query += f" WHERE {keyset}"
+            params.extend(keyset_params)
+        query += self._order_by(SEARCH_SORT_KEY) + " LIMIT %s"
+        with self._cursor() as cursor:
+            cursor.execute(query, params + [limit])
+            return cursor.fetchall()
+
     def search_tasks(self, query_str):
-        search_pattern = f"%{query_str}%"
-        query = "SELECT * FROM tasks WHERE (title LIKE %s OR details LIKE %s OR tags LIKE %s) AND status != 'Завершено' ORDER BY priority DESC, due_date ASC NULLS LAST, created_at DESC"
-        self.cursor.execute(query, (search_pattern, search_pattern, search_pattern))
-        return self.cursor.fetchall()
-    
+        return self.search_tasks_page(query_str, limit=None, columns=("*",))
+
+    def search_tasks_page(self, query_str, after=None, limit=TASK_PAGE_SIZE, columns=TASK_LIST_COLUMNS, with_lexemes=False):
+        """
+        Поиск по названию, тегам и деталям незавершенных задач с ранжированием по ts_rank.
+        Каждое слово ищется по префиксу, поэтому поиск работает во время набора.
+        Если полнотекстовый поиск ничего не нашел, используется триграммный (опечатки).
+        with_lexemes добавляет к строкам лексемы search_vector для уточнения результатов на клиенте.
+        """
+        select_sql = ", ".join(f"tasks.{column}" for column in columns)
+        if with_lexemes:
+            select_sql += ", tsvector_to_array(tasks.search_vector) AS lexemes"
+        return self._search_page("tasks", select_sql, ["tasks.status != 'Завершено'"], query_str, after, limit)
+
+    def search_query_lexemes(self, query_str):
+        """
+        Префиксы лексем, которые ищет _tsquery_sql для каждого слова запроса (со стеммингом
+        и без него); пустой кортеж - стоп-слово, оно пропускается. None, если слово
+        разбирается в несколько лексем и не описывается набором префиксов.
+        """
+        terms = search_terms(query_str)
+        if not terms:
+            return []
+        with self._cursor() as cursor:
+            self._execute(cursor, "SELECT to_tsquery('russian', t.term)::text AS russian, "
+                                  "to_tsquery('simple', t.term)::text AS simple "
+                                  "FROM unnest(%s::text[]) WITH ORDINALITY AS t(term, n) ORDER BY t.n",
+                          ([f"{term}:*" for term in terms],))
+            rows = cursor.fetchall()
+        lexemes = []
+        for row in rows:
+            russian, simple = _TSQUERY_LEXEME.findall(row['russian']), _TSQUERY_LEXEME.findall(row['simple'])
+            if len(russian) > 1 or len(simple) > 1:
+                return None
+            lexemes.append(tuple(lexeme.replace("''", "'") for lexeme in russian + simple) if russian else ())
+        return lexemes
+
+    def search_notes(self, query_str, after=None, limit=TASK_PAGE_SIZE):
+        """Поиск по заголовкам и содержимому заметок."""
+        return self._search_page("notes", "notes.id, notes.title, notes.updated_at", [], query_str, after, limit)
+
     def get_tags_with_counts(self):
-        self.cursor.execute("SELECT tags FROM tasks WHERE status != 'Завершено' AND tags IS NOT NULL AND tags != ''")
-        all_tags = [tag.strip() for row in self.cursor.fetchall() for tag in row['tags'].split(',') if tag.strip()]
-        return Counter(all_tags)
+        with self._cursor() as cursor:
+            self._execute(cursor, "SELECT name, active_count FROM tags WHERE active_count > 0")
+            return Counter({row['name']: row['active_count'] for row in cursor.fetchall()})
+
+    def get_report_summary(self, filter_by='all', value=None, start_date=None, end_date=None):
+        """
+        Сводка для отчета по задачам выборки: всего, завершено, процент завершения,
+        число задач по приоритетам и по тегам. Считается на сервере одним запросом;
+        пустой словарь, если задач нет.
+        """
+        conditions, params = self._task_conditions(filter_by, value, start_date, end_date)
+        where = " WHERE " + " AND ".join(conditions) if conditions else ""
+        with self._cursor() as cursor:
+            cursor.execute(f'''
+                WITH selected AS MATERIALIZED (SELECT id, status, priority FROM tasks{where})
+                SELECT 'priority' AS kind, priority::text AS key, count(*) AS count,
+                       count(*) FILTER (WHERE status = 'Завершено') AS completed
+                FROM selected GROUP BY priority
+                UNION ALL
+                SELECT 'tag', tags.name, count(*), NULL
+                FROM selected JOIN task_tags ON task_tags.task_id = selected.id JOIN tags ON tags.id = task_tags.tag_id
+                GROUP BY tags.name
+            ''', params)
+            rows = cursor.fetchall()
+        priority_rows = {int(row['key']): row for row in rows if row['kind'] == 'priority'}
+        tag_counts = Counter({row['key']: row['count'] for row in rows if row['kind'] == 'tag'})
+        return self._summary_stats(priority_rows, tag_counts)
+
+    @staticmethod
+    def _summary_stats(priority_rows, tag_counts):
+        """priority_rows: приоритет -> строка со счетчиками count и completed."""
+        total = sum(row['count'] for row in priority_rows.values())
+        if total == 0:
+            return {}
+        completed = sum(row['completed'] for row in priority_rows.values())
+        return {
+            "total": total,
+            "completed": completed,
+            "percentage": completed / total * 100,
+            "priorities": Counter({priority: row['count'] for priority, row in priority_rows.items()}),
+            "tags": tag_counts,
+        }
 
     def add_reminder(self, task_id, reminder_datetime):
-        self.cursor.execute("INSERT INTO reminders (task_id, reminder_datetime) VALUES (%s, %s)", (task_id, reminder_datetime))
-        self.conn.commit()
+        with self._cursor() as cursor:
+            cursor.execute("INSERT INTO reminders (task_id, reminder_datetime) VALUES (%s, %s)", (task_id, reminder_datetime))
     def get_reminders_for_task(self, task_id):
-        self.cursor.execute("SELECT * FROM reminders WHERE task_id = %s ORDER BY reminder_datetime ASC", (task_id,))
-        return self.cursor.fetchall()
+        with self._cursor() as cursor:
+            cursor.execute("SELECT * FROM reminders WHERE task_id = %s ORDER BY reminder_datetime ASC", (task_id,))
+            return cursor.fetchall()
     def delete_reminder(self, reminder_id):
-        self.cursor.execute("DELETE FROM reminders WHERE id = %s", (reminder_id,))
-        self.conn.commit()
+        with self._cursor() as cursor:
+            cursor.execute("DELETE FROM reminders WHERE id = %s", (reminder_id,))
+    def delete_reminders(self, reminder_ids):
+        with self._cursor() as cursor:
+            cursor.execute("DELETE FROM reminders WHERE id = ANY(%s)", (list(reminder_ids),))
     def replace_all_reminders_for_task(self, task_id, datetimes_list):
-        self.cursor.execute("DELETE FROM reminders WHERE task_id = %s", (task_id,))
-        if datetimes_list:
+        """Заменяет напоминания задачи и возвращает новые строки (id, reminder_datetime)."""
+        with self._cursor() as cursor:
+            cursor.execute("DELETE FROM reminders WHERE task_id = %s", (task_id,))
+            if not datetimes_list:
+                return []
             data_to_insert = [(task_id, dt) for dt in datetimes_list]
-            self.cursor.executemany("INSERT INTO reminders (task_id, reminder_datetime) VALUES (%s, %s)", data_to_insert)
-        self.conn.commit()
-    def get_due_reminders(self, current_datetime_iso):
-        query = "SELECT r.id as reminder_id, r.reminder_datetime, t.id as task_id, t.title FROM reminders r JOIN tasks t ON r.task_id = t.id WHERE r.reminder_datetime <= %s AND t.status != 'Завершено'"
-        self.cursor.execute(query, (current_datetime_iso,))
-        return self.cursor.fetchall()
+            return psycopg2.extras.execute_values(
+                cursor, "INSERT INTO reminders (task_id, reminder_datetime) VALUES %s RETURNING id, reminder_datetime",
+                data_to_insert, fetch=True
+            )
+    def get_due_reminders(self, until):
+        """Напоминания незавершенных задач со временем не позже until (включая просроченные), по времени."""
+        query = ("SELECT r.id as reminder_id, r.reminder_datetime, t.id as task_id, t.title FROM reminders r "
+                 "JOIN tasks t ON r.task_id = t.id WHERE r.reminder_datetime <= %s AND t.status != 'Завершено' "
+                 "ORDER BY r.reminder_datetime")
+        with self._cursor() as cursor:
+            self._execute(cursor, query, (until,))
+            return cursor.fetchall()
 
     def get_all_notes(self):
-        self.cursor.execute("SELECT id, title, updated_at FROM notes ORDER BY updated_at DESC")
-        return self.cursor.fetchall()
+        with self._cursor() as cursor:
+            cursor.execute("SELECT id, title, updated_at FROM notes ORDER BY updated_at DESC")
+            return cursor.fetchall()
+    def get_notes_by_ids(self, note_ids, columns=NOTE_LIST_COLUMNS):
+        with self._cursor() as cursor:
+            cursor.execute(f"SELECT {', '.join(columns)} FROM notes WHERE id = ANY(%s)", (list(note_ids),))
+            return cursor.fetchall()
+    def get_note_versions(self):
+        """Словарь id -> updated_at всех заметок: по нему список заметок находит измененные."""
+        with self._cursor() as cursor:
+            cursor.execute("SELECT id, updated_at FROM notes")
+            return {row['id']: row['updated_at'] for row in cursor.fetchall()}
     def get_note_by_id(self, note_id):
-        self.cursor.execute("SELECT * FROM notes WHERE id = %s", (note_id,))
-        return self.cursor.fetchone()
+        with self._cursor() as cursor:
+            self._execute(cursor, f"SELECT {', '.join(NOTE_COLUMNS)} FROM notes WHERE id = %s", (note_id,))
+            return cursor.fetchone()
     def add_note(self, title, content=""):
-        now = datetime.datetime.now().isoformat()
-        self.cursor.execute(
-            "INSERT INTO notes (title, content, created_at, updated_at) VALUES (%s, %s, %s, %s) RETURNING id",
-            (title, content, now, now)
-        )
-        new_id = self.cursor.fetchone()['id']
-        self.conn.commit()
-        return new_id
-    def update_note(self, note_id, title, content):
-        now = datetime.datetime.now().isoformat()
-        self.cursor.execute(
-            "UPDATE notes SET title = %s, content = %s, updated_at = %s WHERE id = %s",
-            (title, content, now, note_id)
-        )
-        self.conn.commit()
+        now = datetime.datetime.now().astimezone()
+        with self._cursor() as cursor:
+            cursor.execute(
+                "INSERT INTO notes (title, content, created_at, updated_at) VALUES (%s, %s, %s, %s) RETURNING id",
+                (title, content, now, now)
+            )
+            return cursor.fetchone()['id']
+    def update_note(self, note_id, title, content, expected_version=None):
+        now = datetime.datetime.now().astimezone()
+        query = "UPDATE notes SET title = %s, content = %s, updated_at = %s WHERE id = %s"
+        params = [title, content, now, note_id]
+        if expected_version is not None:
+            query += " AND version = %s"
+            params.append(expected_version)
+        with self._cursor() as cursor:
+            cursor.execute(query, params)
+            return cursor.rowcount > 0
     def delete_note(self, note_id):
-        self.cursor.execute("DELETE FROM notes WHERE id = %s", (note_id,))
-        self.conn.commit()
+        with self._cursor() as cursor:
+            cursor.execute("DELETE FROM notes WHERE id = %s", (note_id,))
+
+    def import_tasks(self, rows, batch_size=IMPORT_BATCH_SIZE, progress=None, ids=None):
+        """
+        Добавляет задачи пачками по batch_size строк в одной транзакции.
+        rows - итератор словарей с полями title, details, tags, due_date, status, priority
+        и created_at (None - текущее время). progress(число строк) вызывается после каждой пачки;
+        исключение из него откатывает импорт. В список ids, если он задан, дописываются
+        id добавленных задач. Возвращает число добавленных задач.
+        """
+        now = datetime.datetime.now().astimezone()
+        imported = 0
+        with self.bulk_changes('tasks') as cursor:
+            for batch in _batches(rows, batch_size):
+                values = [(row['title'], row['details'], self._clean_tags(row['tags']), row['due_date'],
+                           row['status'], row['priority'], row['created_at'] or now) for row in batch]
+                inserted = psycopg2.extras.execute_values(
+                    cursor,
+                    "INSERT INTO tasks (title, details, tags, due_date, status, priority, created_at) VALUES %s RETURNING id",
+                    values, page_size=len(values), fetch=True
+                )
+                self._link_task_tags(cursor, [row['id'] for row in inserted])
+                if ids is not None:
+                    ids.extend(row['id'] for row in inserted)
+                imported += len(batch)
+                if progress:
+                    progress(imported)
+        return imported
+
+    def _link_task_tags(self, cursor, task_ids):
+        """Недостающие связи task_tags задач task_ids по их строковому полю tags (уже очищенному)."""
+        cursor.execute('''
+            INSERT INTO tags (name)
+            SELECT DISTINCT tag FROM tasks, unnest(string_to_array(tasks.tags, ',')) AS tag
+            WHERE tasks.id = ANY(%s)
+            ON CONFLICT (name) DO NOTHING
+        ''', (task_ids,))
+        cursor.execute('''
+            INSERT INTO task_tags (task_id, tag_id)
+            SELECT DISTINCT tasks.id, tags.id
+            FROM tasks, unnest(string_to_array(tasks.tags, ',')) AS tag
+            JOIN tags ON tags.name = tag
+            WHERE tasks.id = ANY(%s)
+            ON CONFLICT DO NOTHING
+        ''', (task_ids,))
+
+    def import_notes(self, rows, batch_size=IMPORT_BATCH_SIZE, progress=None, ids=None):
+        """Как import_tasks, для заметок: словари с полями title, content, created_at и updated_at."""
+        now = datetime.datetime.now().astimezone()
+        imported = 0
+        with self.bulk_changes('notes') as cursor:
+            for batch in _batches(rows, batch_size):
+                values = [(row['title'], row['content'], row['created_at'] or now,
+                           row['updated_at'] or row['created_at'] or now) for row in batch]
+                inserted = psycopg2.extras.execute_values(
+                    cursor, "INSERT INTO notes (title, content, created_at, updated_at) VALUES %s RETURNING id",
+                    values, page_size=len(values), fetch=True
+                )
+                if ids is not None:
+                    ids.extend(row['id'] for row in inserted)
+                imported += len(batch)
+                if progress:
+                    progress(imported)
+        return imported
+
+    def prune_deleted_rows(self, retention=DELETED_ROWS_RETENTION):
+        """Удаляет записи deleted_rows старше retention и сдвигает за них sync_horizon."""
+        with self._cursor() as cursor:
+            cursor.execute("WITH pruned AS (DELETE FROM deleted_rows WHERE deleted_at < now() - %s RETURNING sync_xid) "
+                           "UPDATE sync_horizon SET pruned_xid = greatest(pruned_xid, (SELECT max(sync_xid) FROM pruned)) "
+                           "WHERE EXISTS (SELECT 1 FROM pruned)", (retention,))
+
+    def get_changes_since(self, since=None):
+        """
+        Строки tasks, notes и reminders, измененные после курсора since, и id удаленных строк.
+        Без since возвращает все строки. Новый курсор - xmin снимка чтения: транзакции
+        младше него могли еще не завершиться, поэтому их строки попадут и в следующую выборку.
+        Если записи об удалениях после since уже удалены (prune_deleted_rows), тоже
+        возвращаются все строки; full в результате означает полную выборку.
+        """
+        with self._cursor() as cursor:
+            cursor.execute("SET TRANSACTION ISOLATION LEVEL REPEATABLE READ")
+            cursor.execute("SELECT pg_snapshot_xmin(pg_current_snapshot())::text AS cursor")
+            changes = {'cursor': cursor.fetchone()['cursor'], 'deleted': []}
+            if since is not None:
+                cursor.execute("SELECT %s::xid8 <= pruned_xid AS stale FROM sync_horizon", (since,))
+                if cursor.fetchone()['stale']:
+                    since = None
+            changes['full'] = since is None
+            condition, params = ("", []) if since is None else (" WHERE sync_xid >= %s::xid8", [since])
+            columns = {
+                'tasks': "id, title, details, tags, due_date, status, priority, created_at, updated_at, version",
+                'notes': "id, title, content, created_at, updated_at, version",
+                'reminders': "id, task_id, reminder_datetime, version",
+            }
+            for table, select_sql in columns.items():
+                cursor.execute(f"SELECT {select_sql} FROM {table}{condition}", params)
+                changes[table] = cursor.fetchall()
+            if since is not None:
+                cursor.execute("SELECT table_name, row_id FROM deleted_rows" + condition, params)
+                changes['deleted'] = cursor.fetchall()
+        return changes
 
     def close(self):
-        self.conn.close()
\ No newline at end of file
+        self.pool.closeall()
\ No newline at end of file
@@ -0,0 +1,165 @@
+# db_worker.py
+
+import itertools
+import threading
+import psycopg2
+from PyQt6.QtCore import QObject, QThread, QThreadPool, pyqtSignal
+from psycopg2.extensions import QueryCanceledError
+from database import POOL_MAX_CONNECTIONS
+
+
+class _Job:
+    __slots__ = ("key", "on_result", "on_error", "thread_id", "cancelled")
+
+    def __init__(self, key, on_result, on_error):
+        self.key = key
+        self.on_result = on_result
+        self.on_error = on_error
+        self.thread_id = None
+        self.cancelled = False
+
+
+class DatabaseExecutor(QObject):
+    """
+    Выполняет вызовы DatabaseManager в пуле потоков и возвращает результаты
+    в поток интерфейса через сигналы.
+
+    Задание, отправленное с ключом (key), отменяет предыдущее задание с тем же
+    ключом: его результат отбрасывается, а выполняющийся запрос прерывается
+    на сервере.
+    """
+    job_finished = pyqtSignal(int, object)
+    job_failed = pyqtSignal(int, object)
+
+    def __init__(self, db, parent=None):
+        super().__init__(parent)
+        self.db = db
+        self.thread_pool = QThreadPool(self)
+        # Одно соединение пула остается за потоком интерфейса
+        self.thread_pool.setMaxThreadCount(max(1, POOL_MAX_CONNECTIONS - 1))
+        self._job_ids = itertools.count(1)
+        self._jobs = {}
+        self._jobs_by_key = {}
+        self._lock = threading.Lock()
+        self.job_finished.connect(self._on_job_finished)
+        self.job_failed.connect(self._on_job_failed)
+
+    def submit(self, fn, *args, key=None, on_result=None, on_error=None, **kwargs):
+        if key is not None:
+            self.cancel(key)
+        job_id = next(self._job_ids)
+        job = _Job(key, on_result, on_error)
+        with self._lock:
+            self._jobs[job_id] = job
+            if key is not None:
+                self._jobs_by_key[key] = job_id
+        self.thread_pool.start(lambda: self._run(job_id, job, fn, args, kwargs))
+        return job_id
+
+    def cancel(self, key):
+        with self._lock:
+            job_id = self._jobs_by_key.pop(key, None)
+            job = self._jobs.get(job_id)
+            if job is None:
+                return
+            job.cancelled = True
+            if job.thread_id is not None:
+                self.db.cancel_query(job.thread_id)
+
+    def shutdown(self, timeout_ms=3000):
+        with self._lock:
+            keys = list(self._jobs_by_key)
+        for key in keys:
+            self.cancel(key)
+        self.thread_pool.clear()
+        self.thread_pool.waitForDone(timeout_ms)
+
+    def _run(self, job_id, job, fn, args, kwargs):
+        with self._lock:
+            if job.cancelled:
+                self._jobs.pop(job_id, None)
+                return
+            job.thread_id = threading.get_ident()
+        try:
+            result = fn(*args, **kwargs)
+        except Exception as e:
+            self.job_failed.emit(job_id, e)
+        else:
+            self.job_finished.emit(job_id, result)
+        finally:
+            with self._lock:
+                job.thread_id = None
+
+    def _take_job(self, job_id):
+        with self._lock:
+            job = self._jobs.pop(job_id, None)
+            if job is not None and job.key is not None and self._jobs_by_key.get(job.key) == job_id:
+                del self._jobs_by_key[job.key]
+        return job
+
+    def _on_job_finished(self, job_id, result):
+        job = self._take_job(job_id)
+        if job is None or job.cancelled:
+            return
+        if job.on_result:
+            job.on_result(result)
+
+    def _on_job_failed(self, job_id, error):
+        job = self._take_job(job_id)
+        if job is None or job.cancelled or isinstance(error, QueryCanceledError):
+            return
+        if job.on_error:
+            job.on_error(error)
+        else:
+            print(f"Ошибка запроса к базе данных: {error}")
+
+
+class ChangeFeed(QThread):
+    """
+    Фоновый поток, который слушает уведомления об изменениях других клиентов
+    (DatabaseManager.listen_changes) и передает их в поток интерфейса пачками.
+    После потери соединения переподключается и отправляет reconnected: за время
+    разрыва уведомления могли быть потеряны.
+    """
+    changes_received = pyqtSignal(list)
+    reconnected = pyqtSignal()
+
+    WAIT_SECONDS = 0.5
+    # Уведомления, пришедшие вслед за первым, собираются в одну пачку
+    COALESCE_MS = 50
+    RECONNECT_DELAY_MS = 5000
+
+    def __init__(self, db, parent=None):
+        super().__init__(parent)
+        self.db = db
+
+    def run(self):
+        listener = None
+        connected_before = False
+        while not self.isInterruptionRequested():
+            try:
+                if listener is None:
+                    listener = self.db.listen_changes()
+                    if connected_before:
+                        self.reconnected.emit()
+                    connected_before = True
+                changes = listener.wait(self.WAIT_SECONDS)
+                if changes:
+                    self.msleep(self.COALESCE_MS)
+                    changes += listener.wait(0)
+                    self.changes_received.emit(changes)
+            except (psycopg2.Error, OSError) as e:
+                print(f"Потеряно соединение для уведомлений об изменениях: {e}")
+                if listener is not None:
+                    listener.close()
+                    listener = None
+                for _ in range(self.RECONNECT_DELAY_MS // 100):
+                    if self.isInterruptionRequested():
+                        break
+                    self.msleep(100)
+        if listener is not None:
+            listener.close()
+
+    def stop(self):
+        self.requestInterruption()
+        self.wait()
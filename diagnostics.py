@@ -0,0 +1,212 @@
+# diagnostics.py
+"""
+Замеры времени запросов к базе данных, обработчиков окна и отрисовки
+Markdown. Методы объектов оборачиваются через Instrumentation.instrument();
+для каждой операции накапливаются гистограмма времени, число строк и
+примерный объем полученных данных, а последние вызовы хранятся для
+выгрузки в формате Chrome trace (chrome://tracing, Perfetto).
+"""
+
+import functools
+import inspect
+import json
+import os
+import threading
+import time
+from collections import deque
+
+# Верхние границы интервалов гистограммы, мс; последний интервал открыт
+HISTOGRAM_BOUNDS_MS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000)
+# Объем результата оценивается по первым строкам
+SIZE_SAMPLE_ROWS = 20
+
+
+def _value_size(value):
+    if value is None:
+        return 0
+    if isinstance(value, str):
+        return len(value.encode())
+    if isinstance(value, (bytes, bytearray, memoryview)):
+        return len(value)
+    if isinstance(value, (list, tuple)):
+        return sum(_value_size(item) for item in value)
+    return 8
+
+
+def _row_size(row):
+    if isinstance(row, dict):
+        return sum(_value_size(value) for value in row.values())
+    return _value_size(row)
+
+
+def result_size(result):
+    """(число строк, примерный объем в байтах) результата; для скалярных значений строк нет."""
+    if isinstance(result, (str, bytes)):
+        return None, _value_size(result)
+    if isinstance(result, dict):
+        rows = list(result.items())
+    elif isinstance(result, (list, tuple)):
+        rows = result
+    else:
+        return None, None
+    if not rows:
+        return 0, 0
+    sample = rows[:SIZE_SAMPLE_ROWS]
+    return len(rows), round(sum(_row_size(row) for row in sample) * len(rows) / len(sample))
+
+
+def _positional_limit(fn):
+    """Сколько позиционных аргументов принимает fn; None - любое число."""
+    try:
+        parameters = inspect.signature(fn).parameters.values()
+    except (TypeError, ValueError):
+        return None
+    if any(p.kind == p.VAR_POSITIONAL for p in parameters):
+        return None
+    return sum(p.kind in (p.POSITIONAL_ONLY, p.POSITIONAL_OR_KEYWORD) for p in parameters)
+
+
+class OperationStats:
+    __slots__ = ("category", "name", "calls", "errors", "total_ms", "max_ms", "rows", "bytes", "histogram")
+
+    def __init__(self, category, name):
+        self.category = category
+        self.name = name
+        self.calls = 0
+        self.errors = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+        self.rows = 0
+        self.bytes = 0
+        self.histogram = [0] * (len(HISTOGRAM_BOUNDS_MS) + 1)
+
+    def add(self, duration_ms, rows, size, failed):
+        self.calls += 1
+        self.errors += failed
+        self.total_ms += duration_ms
+        self.max_ms = max(self.max_ms, duration_ms)
+        self.rows += rows or 0
+        self.bytes += size or 0
+        bucket = 0
+        while bucket < len(HISTOGRAM_BOUNDS_MS) and duration_ms > HISTOGRAM_BOUNDS_MS[bucket]:
+            bucket += 1
+        self.histogram[bucket] += 1
+
+    def percentile(self, fraction):
+        """Оценка процентиля: верхняя граница интервала гистограммы, в который он попадает."""
+        threshold = fraction * self.calls
+        seen = 0
+        for bucket, count in enumerate(self.histogram):
+            seen += count
+            if count and seen >= threshold:
+                return HISTOGRAM_BOUNDS_MS[bucket] if bucket < len(HISTOGRAM_BOUNDS_MS) else self.max_ms
+        return 0.0
+
+    def as_dict(self):
+        return {
+            'category': self.category,
+            'name': self.name,
+            'calls': self.calls,
+            'errors': self.errors,
+            'total_ms': round(self.total_ms, 3),
+            'mean_ms': round(self.total_ms / self.calls, 3) if self.calls else 0.0,
+            'p50_ms': self.percentile(0.5),
+            'p95_ms': self.percentile(0.95),
+            'max_ms': round(self.max_ms, 3),
+            'rows': self.rows,
+            'bytes': self.bytes,
+            'histogram': dict(zip([f"<={bound}" for bound in HISTOGRAM_BOUNDS_MS] + [f">{HISTOGRAM_BOUNDS_MS[-1]}"],
+                                  self.histogram)),
+        }
+
+
+class Instrumentation:
+    """Статистика вызовов по операциям и последние MAX_SPANS вызовов. Потокобезопасен."""
+    MAX_SPANS = 20000
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._stats = {}
+        self._spans = deque(maxlen=self.MAX_SPANS)
+        self._thread_names = {}
+        self._origin_ns = time.perf_counter_ns()
+
+    def instrument(self, obj, category, names=None, drop_extra_args=False):
+        """
+        Заменяет методы names объекта obj (по умолчанию все открытые методы) замерами.
+        Генераторы и контекстные менеджеры не оборачиваются: их время - время чтения
+        результата, а не вызова. drop_extra_args - для слотов Qt, см. wrap().
+        """
+        if names is None:
+            names = [name for name in dir(type(obj)) if not name.startswith('_')]
+        prefix = type(obj).__name__
+        for name in names:
+            method = getattr(obj, name, None)
+            if not callable(method) or inspect.isclass(method) or inspect.isgeneratorfunction(inspect.unwrap(method)):
+                continue
+            setattr(obj, name, self.wrap(category, f"{prefix}.{name}", method, drop_extra_args))
+
+    def wrap(self, category, name, fn, drop_extra_args=False):
+        # Слот Qt получает все аргументы сигнала, даже если fn их не принимает: с drop_extra_args
+        # лишние отбрасываются, как это делает PyQt. Остальные вызовы передаются без изменений
+        limit = _positional_limit(fn) if drop_extra_args else None
+
+        @functools.wraps(fn)
+        def measured(*args, **kwargs):
+            if limit is not None:
+                args = args[:limit]
+            started = time.perf_counter_ns()
+            failed = True
+            result = None
+            try:
+                result = fn(*args, **kwargs)
+                failed = False
+                return result
+            finally:
+                self.record(category, name, started, time.perf_counter_ns() - started, result, failed)
+        return measured
+
+    def record(self, category, name, started_ns, duration_ns, result=None, failed=False):
+        rows, size = result_size(result)
+        duration_ms = duration_ns / 1e6
+        thread = threading.current_thread()
+        with self._lock:
+            stats = self._stats.get((category, name))
+            if stats is None:
+                stats = self._stats[(category, name)] = OperationStats(category, name)
+            stats.add(duration_ms, rows, size, failed)
+            self._thread_names.setdefault(thread.ident, thread.name)
+            self._spans.append((category, name, started_ns, duration_ns, thread.ident, rows, size, failed))
+
+    def summary(self):
+        """Статистика операций, начиная с самых долгих по суммарному времени."""
+        with self._lock:
+            rows = [stats.as_dict() for stats in self._stats.values()]
+        return sorted(rows, key=lambda row: row['total_ms'], reverse=True)
+
+    def reset(self):
+        with self._lock:
+            self._stats.clear()
+            self._spans.clear()
+
+    def export_json(self, file_path):
+        with open(file_path, 'w', encoding='utf-8') as f:
+            json.dump({'histogram_bounds_ms': HISTOGRAM_BOUNDS_MS, 'operations': self.summary()},
+                      f, ensure_ascii=False, indent=2)
+
+    def export_chrome_trace(self, file_path):
+        """Последние вызовы в формате Trace Event (события "X" с длительностью, время в мкс)."""
+        pid = os.getpid()
+        with self._lock:
+            spans = list(self._spans)
+            thread_names = dict(self._thread_names)
+        events = [{'name': 'thread_name', 'ph': 'M', 'pid': pid, 'tid': tid, 'args': {'name': thread_name}}
+                  for tid, thread_name in thread_names.items()]
+        for category, name, started_ns, duration_ns, tid, rows, size, failed in spans:
+            args = {'rows': rows, 'bytes': size}
+            if failed:
+                args['error'] = True
+            events.append({'name': name, 'cat': category, 'ph': 'X', 'pid': pid, 'tid': tid,
+                           'ts': (started_ns - self._origin_ns) / 1000, 'dur': duration_ns / 1000, 'args': args})
+        with open(file_path, 'w', encoding='utf-8') as f:
+            json.dump({'traceEvents': events, 'displayTimeUnit': 'ms'}, f, ensure_ascii=False)
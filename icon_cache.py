@@ -0,0 +1,63 @@
+# icon_cache.py
+
+import os
+from PyQt6.QtCore import QSize
+from PyQt6.QtGui import QColor, QIcon, QPainter, QPixmap
+
+ICON_FILES = {
+    "tasks": "icons/completed.svg",
+    "notes": "icons/personal.svg",
+    "important": "icons/important.svg",
+    "all": "icons/tag.svg",
+    "completed": "icons/completed.svg",
+    "tag": "icons/tag.svg",
+    "settings": "icons/settings.svg",
+}
+
+
+class IconCache:
+    """
+    Иконки интерфейса, перекрашенные в цвет темы. Каждое сочетание (иконка, размер,
+    цвет, тема) растеризуется из SVG один раз; строки списков и повторное
+    переключение темы берут готовые QPixmap и QIcon из кэша.
+    """
+
+    def __init__(self, files=ICON_FILES):
+        self.files = files
+        self._sources = {}
+        self._pixmaps = {}
+        self._icons = {}
+
+    def pixmap(self, name, size, color, theme):
+        key = (name, size, QColor(color).rgba(), theme)
+        if key not in self._pixmaps:
+            self._pixmaps[key] = self._render(name, size, QColor(color))
+        return self._pixmaps[key]
+
+    def icon(self, name, color, theme, size=16):
+        key = (name, size, QColor(color).rgba(), theme)
+        if key not in self._icons:
+            pixmap = self.pixmap(name, size, color, theme)
+            self._icons[key] = QIcon(pixmap) if not pixmap.isNull() else QIcon()
+        return self._icons[key]
+
+    def icons(self, color, theme, size=16):
+        return {name: self.icon(name, color, theme, size) for name in self.files}
+
+    def clear(self):
+        self._pixmaps.clear()
+        self._icons.clear()
+
+    def _render(self, name, size, color):
+        if name not in self._sources:
+            path = self.files.get(name, "")
+            self._sources[name] = QIcon(path) if os.path.exists(path) else QIcon()
+        source = self._sources[name]
+        if source.isNull():
+            return QPixmap()
+        pixmap = source.pixmap(QSize(size, size))
+        painter = QPainter(pixmap)
+        painter.setCompositionMode(QPainter.CompositionMode.CompositionMode_SourceIn)
+        painter.fillRect(pixmap.rect(), color)
+        painter.end()
+        return pixmap
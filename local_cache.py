@@ -0,0 +1,723 @@
+# local_cache.py
+
+import configparser
+import datetime
+import json
+import queue
+import sqlite3
+import threading
+from collections import Counter
+from contextlib import contextmanager
+import psycopg2
+from database import (DatabaseManager, TaskBatch, TASK_COLUMNS, NOTE_COLUMNS, TASK_LIST_COLUMNS, NOTE_LIST_COLUMNS,
+                      TASK_PAGE_SIZE, SEARCH_SORT_KEY, search_terms)
+
+CACHE_SECTION = 'cache'
+DEFAULT_CACHE_PATH = 'denkwurfel_cache.sqlite3'
+DEFAULT_SYNC_INTERVAL = 30
+# При большем числе измененных строк вместо событий по строкам отправляется RESYNC
+RESYNC_EVENT_LIMIT = 500
+
+REMINDER_COLUMNS = ("id", "task_id", "reminder_datetime", "version")
+SYNCED_TABLES = {'tasks': TASK_COLUMNS, 'notes': NOTE_COLUMNS, 'reminders': REMINDER_COLUMNS}
+# Поля задачи, которые отправляются на сервер
+TASK_FIELDS = ("title", "details", "tags", "due_date", "priority", "status")
+
+# Время хранится в UTC, чтобы строки в кэше сортировались так же, как значения timestamptz
+sqlite3.register_adapter(datetime.datetime, lambda value: value.astimezone(datetime.timezone.utc).isoformat())
+sqlite3.register_adapter(datetime.date, lambda value: value.isoformat())
+sqlite3.register_converter("TIMESTAMPTZ", lambda value: datetime.datetime.fromisoformat(value.decode()))
+sqlite3.register_converter("DATE", lambda value: datetime.date.fromisoformat(value.decode()))
+
+
+def _dict_row(cursor, row):
+    return {column[0]: value for column, value in zip(cursor.description, row)}
+
+
+def _sql(query):
+    return query.replace("%s", "?")
+
+
+def open_database(filename='config.ini'):
+    """DatabaseManager или, если в разделе [cache] файла конфигурации включен кэш, CachedDatabase."""
+    parser = configparser.ConfigParser()
+    parser.read(filename)
+    if parser.getboolean(CACHE_SECTION, 'enabled', fallback=False):
+        return CachedDatabase(parser.get(CACHE_SECTION, 'path', fallback=DEFAULT_CACHE_PATH),
+                              parser.getint(CACHE_SECTION, 'sync_interval', fallback=DEFAULT_SYNC_INTERVAL))
+    return DatabaseManager()
+
+
+class CachedChangeListener:
+    """
+    Замена ChangeListener для CachedDatabase: уведомления сервера запускают
+    синхронизацию, а наружу отдаются изменения, уже примененные к кэшу.
+    Без связи с сервером просто ждет изменений кэша.
+    """
+    def __init__(self, cache):
+        self.cache = cache
+        self.remote_listener = None
+
+    def wait(self, timeout):
+        if self.remote_listener is None and self.cache.online:
+            try:
+                self.remote_listener = self.cache.remote.listen_changes()
+            except psycopg2.Error:
+                pass
+        if self.remote_listener is None:
+            return self.cache.take_events(timeout)
+        try:
+            if self.remote_listener.wait(timeout):
+                self.cache.request_sync()
+        except psycopg2.Error:
+            self.remote_listener.close()
+            self.remote_listener = None
+        return self.cache.take_events(0)
+
+    def close(self):
+        if self.remote_listener is not None:
+            self.remote_listener.close()
+
+
+class CachedDatabase:
+    """
+    Локальная копия tasks, notes и reminders в SQLite с тем же интерфейсом, что
+    у DatabaseManager. Чтение идет из кэша, изменения записываются в кэш и в
+    очередь outbox. Фоновый поток отправляет очередь на сервер и забирает
+    изменения других клиентов (get_changes_since), поэтому приложение работает
+    и без связи с сервером.
+
+    Изменение строки, которая на сервере успела измениться (версия не совпала),
+    считается конфликтом: остается серверная версия, локальная сохраняется в
+    таблице conflicts. Новые строки получают в кэше отрицательные id, которые
+    заменяются серверными после отправки.
+
+    Остальные методы DatabaseManager (например, для отчетов) выполняются на сервере.
+    """
+
+    def __init__(self, path=DEFAULT_CACHE_PATH, sync_interval=DEFAULT_SYNC_INTERVAL):
+        self.path = path
+        self.sync_interval = sync_interval
+        self.remote = None
+        self.online = False
+        self._local = threading.local()
+        self._connections = []
+        self._connections_lock = threading.Lock()
+        self._events = queue.Queue()
+        self._sync_lock = threading.Lock()
+        self._sync_requested = threading.Event()
+        self._stopping = threading.Event()
+        with self._cursor(write=True) as cursor:
+            self._create_tables(cursor)
+        # Подключение к серверу и первая синхронизация идут в фоне и не задерживают запуск
+        self._sync_thread = threading.Thread(target=self._sync_loop, name="cache-sync", daemon=True)
+        self._sync_thread.start()
+
+    def __getattr__(self, name):
+        remote = self.__dict__.get('remote')
+        if remote is None:
+            raise psycopg2.OperationalError(f"Нет соединения с сервером ({name})")
+        return getattr(remote, name)
+
+    @contextmanager
+    def _cursor(self, write=False):
+        """Курсор соединения SQLite текущего потока; вложенные вызовы используют одну транзакцию."""
+        cursor = getattr(self._local, 'cursor', None)
+        if cursor is not None:
+            yield cursor
+            return
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None, check_same_thread=False,
+                                   detect_types=sqlite3.PARSE_DECLTYPES)
+            conn.row_factory = _dict_row
+            conn.create_function("casefold", 1, lambda text: text.casefold() if text else "", deterministic=True)
+            conn.execute("PRAGMA journal_mode = WAL")
+            self._local.conn = conn
+            with self._connections_lock:
+                self._connections.append(conn)
+        cursor = conn.cursor()
+        # Запись берет блокировку сразу: в режиме WAL повышение блокировки чтения может не удаться
+        cursor.execute("BEGIN IMMEDIATE" if write else "BEGIN")
+        self._local.cursor = cursor
+        try:
+            yield cursor
+            conn.commit()
+        except BaseException:
+            conn.rollback()
+            raise
+        finally:
+            self._local.cursor = None
+            cursor.close()
+
+    @contextmanager
+    def transaction(self):
+        with self._cursor(write=True):
+            yield
+
+    def _create_tables(self, cursor):
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS tasks (
+                id INTEGER PRIMARY KEY,
+                title TEXT NOT NULL,
+                details TEXT,
+                tags TEXT,
+                due_date DATE,
+                status TEXT NOT NULL,
+                priority INTEGER NOT NULL,
+                created_at TIMESTAMPTZ NOT NULL,
+                updated_at TIMESTAMPTZ,
+                version INTEGER DEFAULT 0 NOT NULL
+            )
+        ''')
+        cursor.execute("CREATE INDEX IF NOT EXISTS tasks_status_priority_idx ON tasks (status, priority)")
+        cursor.execute("CREATE INDEX IF NOT EXISTS tasks_due_date_idx ON tasks (due_date)")
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS notes (
+                id INTEGER PRIMARY KEY,
+                title TEXT NOT NULL,
+                content TEXT,
+                created_at TIMESTAMPTZ NOT NULL,
+                updated_at TIMESTAMPTZ NOT NULL,
+                version INTEGER DEFAULT 0 NOT NULL
+            )
+        ''')
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS reminders (
+                id INTEGER PRIMARY KEY,
+                task_id INTEGER NOT NULL,
+                reminder_datetime TIMESTAMPTZ NOT NULL,
+                version INTEGER DEFAULT 0 NOT NULL
+            )
+        ''')
+        cursor.execute("CREATE INDEX IF NOT EXISTS reminders_task_id_idx ON reminders (task_id)")
+        cursor.execute("CREATE INDEX IF NOT EXISTS reminders_datetime_idx ON reminders (reminder_datetime)")
+        # op: 'upsert' и 'delete' для строк, 'replace' - напоминания задачи row_id целиком
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS outbox (
+                seq INTEGER PRIMARY KEY AUTOINCREMENT,
+                table_name TEXT NOT NULL,
+                row_id INTEGER NOT NULL,
+                op TEXT NOT NULL,
+                UNIQUE (table_name, row_id, op)
+            )
+        ''')
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS conflicts (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                table_name TEXT NOT NULL,
+                row_id INTEGER NOT NULL,
+                local_data TEXT,
+                error TEXT,
+                detected_at TIMESTAMPTZ NOT NULL
+            )
+        ''')
+        cursor.execute("CREATE TABLE IF NOT EXISTS sync_state (key TEXT PRIMARY KEY, value TEXT)")
+
+    # --- Очередь изменений и события ---
+
+    @staticmethod
+    def _queue(cursor, table_name, row_id, op):
+        # REPLACE дает операции новый seq: если она уже отправляется, изменение не потеряется
+        cursor.execute("INSERT OR REPLACE INTO outbox (table_name, row_id, op) VALUES (?, ?, ?)",
+                       (table_name, row_id, op))
+
+    @staticmethod
+    def _new_local_id(cursor, table_name):
+        cursor.execute(f"SELECT min(0, coalesce(min(id), 0)) - 1 AS id FROM {table_name}")
+        return cursor.fetchone()['id']
+
+    def request_sync(self):
+        self._sync_requested.set()
+
+    def take_events(self, timeout):
+        """Изменения кэша после синхронизации в формате уведомлений ChangeListener."""
+        events = []
+        try:
+            events.append(self._events.get(timeout=timeout) if timeout else self._events.get_nowait())
+            while True:
+                events.append(self._events.get_nowait())
+        except queue.Empty:
+            pass
+        return events
+
+    def listen_changes(self):
+        return CachedChangeListener(self)
+
+    def cancel_query(self, thread_id):
+        if self.remote is not None:
+            self.remote.cancel_query(thread_id)
+
+    # --- Чтение ---
+
+    _order_by = staticmethod(DatabaseManager._order_by)
+    _keyset_condition = staticmethod(DatabaseManager._keyset_condition)
+    _select_list = staticmethod(DatabaseManager._select_list)
+    _tasks_page_query = DatabaseManager._tasks_page_query
+    iter_tasks = DatabaseManager.iter_tasks
+
+    def _task_conditions(self, filter_by, value, start_date, end_date):
+        if filter_by == 'tag' and value is not None:
+            conditions, params = DatabaseManager._task_conditions(self, 'all', None, start_date, end_date)
+            conditions += ["instr(',' || tags || ',', %s) > 0", "status != 'Завершено'"]
+            params.append(f",{value},")
+            return conditions, params
+        return DatabaseManager._task_conditions(self, filter_by, value, start_date, end_date)
+
+    def _fetchall(self, query, params=()):
+        with self._cursor() as cursor:
+            cursor.execute(_sql(query), params)
+            return cursor.fetchall()
+
+    def get_tasks(self, filter_by='all', value=None, sort_by='priority', start_date=None, end_date=None):
+        return list(self.iter_tasks(filter_by, value, sort_by, start_date, end_date, columns=TASK_COLUMNS))
+
+    def get_tasks_page(self, filter_by='all', value=None, sort_by='priority', start_date=None, end_date=None,
+                       after=None, limit=TASK_PAGE_SIZE, columns=TASK_LIST_COLUMNS):
+        return self._fetchall(*self._tasks_page_query(filter_by, value, sort_by, start_date, end_date,
+                                                      after, limit, columns))
+
+    def get_tasks_by_ids(self, task_ids, filter_by='all', value=None, columns=TASK_LIST_COLUMNS):
+        task_ids = list(task_ids)
+        conditions, params = self._task_conditions(filter_by, value, None, None)
+        conditions.append(f"id IN ({', '.join(['%s'] * len(task_ids))})")
+        return self._fetchall(f"SELECT {', '.join(columns)} FROM tasks WHERE " + " AND ".join(conditions),
+                              params + task_ids)
+
+    def get_task_details(self, task_id):
+        rows = self._fetchall("SELECT details FROM tasks WHERE id = %s", (task_id,))
+        return rows[0]['details'] if rows else None
+
+    def get_task_by_id(self, task_id):
+        rows = self._fetchall(f"SELECT {', '.join(TASK_COLUMNS)} FROM tasks WHERE id = %s", (task_id,))
+        return rows[0] if rows else None
+
+    def get_tags_with_counts(self):
+        tag_counts = Counter()
+        for row in self._fetchall("SELECT tags FROM tasks WHERE status != 'Завершено' AND tags != ''"):
+            tag_counts.update(set(row['tags'].split(',')))
+        return tag_counts
+
+    def stream_tasks(self, filter_by='all', value=None, sort_by='priority', start_date=None, end_date=None,
+                     columns=TASK_LIST_COLUMNS, fetch_size=TASK_PAGE_SIZE):
+        # Кэш локальный, поэтому серверный курсор не нужен: хватает постраничного чтения
+        return self.iter_tasks(filter_by, value, sort_by, start_date, end_date, columns=columns, page_size=fetch_size)
+
+    def get_report_summary(self, filter_by='all', value=None, start_date=None, end_date=None):
+        stats = self._remote_search('get_report_summary', filter_by, value, start_date, end_date)
+        if stats is not None:
+            return stats
+        conditions, params = self._task_conditions(filter_by, value, start_date, end_date)
+        where = " WHERE " + " AND ".join(conditions) if conditions else ""
+        rows = self._fetchall(f"SELECT priority, count(*) AS count, count(*) FILTER (WHERE status = 'Завершено') AS completed "
+                              f"FROM tasks{where} GROUP BY priority", params)
+        tag_counts = Counter()
+        for row in self._fetchall(f"SELECT tags FROM tasks{where}", params):
+            if row['tags']:
+                tag_counts.update(set(row['tags'].split(',')))
+        return DatabaseManager._summary_stats({row['priority']: row for row in rows}, tag_counts)
+
+    def get_reminders_for_task(self, task_id):
+        return self._fetchall("SELECT * FROM reminders WHERE task_id = %s ORDER BY reminder_datetime ASC", (task_id,))
+
+    def get_due_reminders(self, until):
+        return self._fetchall(
+            "SELECT r.id as reminder_id, r.reminder_datetime, t.id as task_id, t.title FROM reminders r "
+            "JOIN tasks t ON r.task_id = t.id WHERE r.reminder_datetime <= %s AND t.status != 'Завершено' "
+            "ORDER BY r.reminder_datetime", (until,))
+
+    def get_all_notes(self):
+        return self._fetchall("SELECT id, title, updated_at FROM notes ORDER BY updated_at DESC")
+
+    def get_notes_by_ids(self, note_ids, columns=NOTE_LIST_COLUMNS):
+        note_ids = list(note_ids)
+        return self._fetchall(f"SELECT {', '.join(columns)} FROM notes WHERE id IN ({', '.join(['%s'] * len(note_ids))})",
+                              note_ids)
+
+    def get_note_versions(self):
+        return {row['id']: row['updated_at'] for row in self._fetchall("SELECT id, updated_at FROM notes")}
+
+    def get_note_by_id(self, note_id):
+        rows = self._fetchall(f"SELECT {', '.join(NOTE_COLUMNS)} FROM notes WHERE id = %s", (note_id,))
+        return rows[0] if rows else None
+
+    def _remote_search(self, method, *args, **kwargs):
+        if self.online:
+            try:
+                return getattr(self.remote, method)(*args, **kwargs)
+            except psycopg2.OperationalError:
+                self.online = False
+                self.request_sync()
+        return None
+
+    def _local_search(self, table, select_sql, text_sql, conditions, query_str, after, limit):
+        """Поиск по подстрокам без учета регистра, пока нет связи с сервером."""
+        terms = search_terms(query_str)
+        if not terms:
+            return []
+        conditions = conditions + [f"instr(casefold({text_sql}), %s) > 0"] * len(terms)
+        query = (f"SELECT * FROM (SELECT {select_sql}, 0.0 AS rank, 'local' AS search_mode FROM {table} "
+                 f"WHERE {' AND '.join(conditions)}) AS found")
+        params = list(terms)
+        if after is not None:
+            keyset, keyset_params = self._keyset_condition(SEARCH_SORT_KEY, after)
+            query += f" WHERE {keyset}"
+            params += keyset_params
+        query += self._order_by(SEARCH_SORT_KEY) + " LIMIT %s"
+        return self._fetchall(query, params + [-1 if limit is None else limit])
+
+    def search_tasks(self, query_str):
+        return self.search_tasks_page(query_str, limit=None, columns=("*",))
+
+    def search_tasks_page(self, query_str, after=None, limit=TASK_PAGE_SIZE, columns=TASK_LIST_COLUMNS, with_lexemes=False):
+        if after is None or after['search_mode'] != 'local':
+            rows = self._remote_search('search_tasks_page', query_str, after=after, limit=limit,
+                                       columns=columns, with_lexemes=with_lexemes)
+            if rows is not None:
+                return rows
+        return self._local_search("tasks", ", ".join(columns),
+                                  "title || ' ' || coalesce(tags, '') || ' ' || coalesce(details, '')",
+                                  ["status != 'Завершено'"], query_str, after, limit)
+
+    def search_query_lexemes(self, query_str):
+        # Без связи с сервером стемминга нет: результаты не уточняются на клиенте
+        return self._remote_search('search_query_lexemes', query_str)
+
+    def search_notes(self, query_str, after=None, limit=TASK_PAGE_SIZE):
+        if after is None or after['search_mode'] != 'local':
+            rows = self._remote_search('search_notes', query_str, after=after, limit=limit)
+            if rows is not None:
+                return rows
+        return self._local_search("notes", "id, title, updated_at", "title || ' ' || coalesce(content, '')",
+                                  [], query_str, after, limit)
+
+    # --- Изменения ---
+
+    def add_task(self, title, details="", tags="", due_date=None, priority=0, status="К выполнению"):
+        now = datetime.datetime.now().astimezone()
+        with self._cursor(write=True) as cursor:
+            task_id = self._new_local_id(cursor, "tasks")
+            cursor.execute(
+                "INSERT INTO tasks (id, title, details, tags, due_date, priority, status, created_at, updated_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (task_id, title, details, DatabaseManager._clean_tags(self, tags), due_date, priority, status, now, now)
+            )
+            self._queue(cursor, "tasks", task_id, "upsert")
+        self.request_sync()
+        return task_id
+
+    def update_task(self, task_id, data: dict):
+        data = {key: value for key, value in data.items() if key in TASK_FIELDS}
+        if 'tags' in data:
+            data['tags'] = DatabaseManager._clean_tags(self, data['tags'])
+        if not data:
+            return False
+        with self._cursor(write=True) as cursor:
+            cursor.execute(f"UPDATE tasks SET {', '.join(f'{key} = ?' for key in data)}, updated_at = ? WHERE id = ?",
+                           list(data.values()) + [datetime.datetime.now().astimezone(), task_id])
+            if cursor.rowcount == 0:
+                return False
+            self._queue(cursor, "tasks", task_id, "upsert")
+        self.request_sync()
+        return True
+
+    def update_task_status(self, task_id, status):
+        self.update_task(task_id, {'status': status})
+
+    def delete_tasks(self, task_ids):
+        self.apply_task_batch(TaskBatch().delete(task_ids))
+
+    def apply_task_batch(self, batch):
+        now = datetime.datetime.now().astimezone()
+        with self._cursor(write=True) as cursor:
+            for task_id in batch.deleted:
+                cursor.execute("DELETE FROM tasks WHERE id = ?", (task_id,))
+                cursor.execute("DELETE FROM reminders WHERE task_id = ?", (task_id,))
+                cursor.execute("DELETE FROM outbox WHERE (table_name = 'tasks' OR op = 'replace') AND row_id = ?", (task_id,))
+                if task_id > 0:
+                    self._queue(cursor, "tasks", task_id, "delete")
+            for task_id in batch.task_ids() - batch.deleted:
+                data = dict(batch.updates.get(task_id, {}))
+                if batch.added_tags or batch.removed_tags:
+                    cursor.execute("SELECT tags FROM tasks WHERE id = ?", (task_id,))
+                    row = cursor.fetchone()
+                    if row is None:
+                        continue
+                    data['tags'] = batch.edit_tags(task_id, data.get('tags', row['tags']))
+                elif 'tags' in data:
+                    data['tags'] = batch.edit_tags(task_id, data['tags'])
+                cursor.execute(f"UPDATE tasks SET {', '.join(f'{key} = ?' for key in data)}, updated_at = ? WHERE id = ?",
+                               list(data.values()) + [now, task_id])
+                if cursor.rowcount:
+                    self._queue(cursor, "tasks", task_id, "upsert")
+        self.request_sync()
+
+    def add_reminder(self, task_id, reminder_datetime):
+        with self._cursor(write=True):
+            datetimes = [row['reminder_datetime'] for row in self.get_reminders_for_task(task_id)]
+            self.replace_all_reminders_for_task(task_id, datetimes + [reminder_datetime])
+
+    def replace_all_reminders_for_task(self, task_id, datetimes_list):
+        rows = []
+        with self._cursor(write=True) as cursor:
+            cursor.execute("DELETE FROM reminders WHERE task_id = ?", (task_id,))
+            for reminder_datetime in datetimes_list:
+                reminder_id = self._new_local_id(cursor, "reminders")
+                cursor.execute("INSERT INTO reminders (id, task_id, reminder_datetime) VALUES (?, ?, ?)",
+                               (reminder_id, task_id, reminder_datetime))
+                rows.append({'id': reminder_id, 'reminder_datetime': reminder_datetime})
+            self._queue(cursor, "reminders", task_id, "replace")
+        self.request_sync()
+        return rows
+
+    def delete_reminders(self, reminder_ids):
+        reminder_ids = list(reminder_ids)
+        with self._cursor(write=True) as cursor:
+            for reminder_id in reminder_ids:
+                cursor.execute("DELETE FROM reminders WHERE id = ?", (reminder_id,))
+                # Напоминания с отрицательным id еще не отправлены и будут отправлены без удаленного
+                if reminder_id > 0:
+                    self._queue(cursor, "reminders", reminder_id, "delete")
+        self.request_sync()
+
+    def delete_reminder(self, reminder_id):
+        self.delete_reminders([reminder_id])
+
+    def add_note(self, title, content=""):
+        now = datetime.datetime.now().astimezone()
+        with self._cursor(write=True) as cursor:
+            note_id = self._new_local_id(cursor, "notes")
+            cursor.execute("INSERT INTO notes (id, title, content, created_at, updated_at) VALUES (?, ?, ?, ?, ?)",
+                           (note_id, title, content, now, now))
+            self._queue(cursor, "notes", note_id, "upsert")
+        self.request_sync()
+        return note_id
+
+    def update_note(self, note_id, title, content):
+        with self._cursor(write=True) as cursor:
+            cursor.execute("UPDATE notes SET title = ?, content = ?, updated_at = ? WHERE id = ?",
+                           (title, content, datetime.datetime.now().astimezone(), note_id))
+            if cursor.rowcount == 0:
+                return False
+            self._queue(cursor, "notes", note_id, "upsert")
+        self.request_sync()
+        return True
+
+    def delete_note(self, note_id):
+        with self._cursor(write=True) as cursor:
+            cursor.execute("DELETE FROM notes WHERE id = ?", (note_id,))
+            cursor.execute("DELETE FROM outbox WHERE table_name = 'notes' AND row_id = ?", (note_id,))
+            if note_id > 0:
+                self._queue(cursor, "notes", note_id, "delete")
+        self.request_sync()
+
+    def import_tasks(self, rows, **kwargs):
+        # Массовый импорт идет сразу на сервер, в кэш строки попадут при синхронизации
+        imported = self._remote().import_tasks(rows, **kwargs)
+        self.request_sync()
+        return imported
+
+    def import_notes(self, rows, **kwargs):
+        imported = self._remote().import_notes(rows, **kwargs)
+        self.request_sync()
+        return imported
+
+    def _remote(self):
+        if self.remote is None:
+            raise psycopg2.OperationalError("Нет соединения с сервером")
+        return self.remote
+
+    # --- Синхронизация ---
+
+    def _sync_loop(self):
+        while not self._stopping.is_set():
+            try:
+                if self.remote is None:
+                    self.remote = DatabaseManager()
+                self.sync()
+                self.online = True
+            except Exception as e:
+                if self.online:
+                    print(f"Нет связи с сервером, работа продолжается с локальным кэшем: {e}")
+                self.online = False
+            self._sync_requested.wait(self.sync_interval)
+            self._sync_requested.clear()
+
+    def sync(self):
+        """Отправляет очередь outbox на сервер, затем забирает изменения с сервера."""
+        with self._sync_lock:
+            self._check_server()
+            while not self._stopping.is_set():
+                with self._cursor() as cursor:
+                    # Напоминания новой задачи отправляются после нее, когда у задачи уже есть серверный id
+                    cursor.execute("SELECT * FROM outbox ORDER BY op = 'replace' AND row_id < 0, seq LIMIT 1")
+                    operation = cursor.fetchone()
+                if operation is None:
+                    break
+                self._push(operation)
+            self._pull()
+
+    def _state(self, cursor, key):
+        cursor.execute("SELECT value FROM sync_state WHERE key = ?", (key,))
+        row = cursor.fetchone()
+        return row['value'] if row else None
+
+    def _check_server(self):
+        """Кэш другого сервера или базы сбрасывается целиком."""
+        params = self.remote._params
+        server = f"{params.get('host')}:{params.get('port')}/{params.get('dbname')}"
+        with self._cursor(write=True) as cursor:
+            if self._state(cursor, 'server') == server:
+                return
+            for table in ('tasks', 'notes', 'reminders', 'outbox', 'sync_state'):
+                cursor.execute(f"DELETE FROM {table}")
+            cursor.execute("INSERT INTO sync_state (key, value) VALUES ('server', ?)", (server,))
+
+    def _push(self, operation):
+        table_name, row_id, op = operation['table_name'], operation['row_id'], operation['op']
+        events = []
+        row = None
+        with self._cursor() as cursor:
+            if op == 'replace':
+                cursor.execute("SELECT reminder_datetime FROM reminders WHERE task_id = ? ORDER BY reminder_datetime",
+                               (row_id,))
+                datetimes = [reminder['reminder_datetime'] for reminder in cursor.fetchall()]
+            else:
+                cursor.execute(f"SELECT * FROM {table_name} WHERE id = ?", (row_id,))
+                row = cursor.fetchone()
+        try:
+            if op == 'delete':
+                if table_name == 'notes':
+                    self.remote.delete_note(row_id)
+                elif table_name == 'tasks':
+                    self.remote.delete_tasks([row_id])
+                else:
+                    self.remote.delete_reminders([row_id])
+            elif op == 'replace' and row_id < 0:
+                # Задачу так и не удалось отправить (конфликт), напоминания отправлять некуда
+                pass
+            elif op == 'replace':
+                server_rows = self.remote.replace_all_reminders_for_task(row_id, datetimes)
+                with self._cursor(write=True) as cursor:
+                    cursor.execute("DELETE FROM reminders WHERE task_id = ?", (row_id,))
+                    cursor.executemany("INSERT INTO reminders (id, task_id, reminder_datetime, version) VALUES (?, ?, ?, 1)",
+                                       [(reminder['id'], row_id, reminder['reminder_datetime']) for reminder in server_rows])
+                events.append({'table': 'reminders', 'op': 'UPDATE', 'id': row_id, 'task_id': row_id})
+            elif row is None:
+                pass
+            elif row_id < 0:
+                if table_name == 'tasks':
+                    new_id = self.remote.add_task(**{field: row[field] for field in TASK_FIELDS})
+                else:
+                    new_id = self.remote.add_note(row['title'], row['content'])
+                events += self._replace_local_id(table_name, row_id, new_id)
+            else:
+                if table_name == 'tasks':
+                    updated = self.remote.update_task(row_id, {field: row[field] for field in TASK_FIELDS},
+                                                      expected_version=row['version'])
+                else:
+                    updated = self.remote.update_note(row_id, row['title'], row['content'],
+                                                      expected_version=row['version'])
+                if updated:
+                    with self._cursor(write=True) as cursor:
+                        cursor.execute(f"UPDATE {table_name} SET version = version + 1 WHERE id = ?", (row_id,))
+                else:
+                    # Курсор синхронизации уже прошел строку сервера: она загружается отдельно
+                    events.append(self._restore_server_row(table_name, row_id))
+                    events.append(self._record_conflict(table_name, row_id, row, "Строка изменена на сервере"))
+        except (psycopg2.IntegrityError, psycopg2.DataError) as e:
+            # Например, задачу напоминаний удалили на сервере: операцию повторять бесполезно
+            events.append(self._record_conflict(table_name, row_id, row, str(e)))
+        with self._cursor(write=True) as cursor:
+            cursor.execute("DELETE FROM outbox WHERE seq = ?", (operation['seq'],))
+        for event in events:
+            self._events.put(event)
+
+    def _restore_server_row(self, table_name, row_id):
+        """Заменяет отклоненное локальное изменение строкой сервера; удаляет строку, если на сервере ее нет."""
+        if table_name == 'tasks':
+            server_row = self.remote.get_task_by_id(row_id)
+        else:
+            server_row = self.remote.get_note_by_id(row_id)
+        columns = SYNCED_TABLES[table_name]
+        with self._cursor(write=True) as cursor:
+            if server_row is None:
+                cursor.execute(f"DELETE FROM {table_name} WHERE id = ?", (row_id,))
+                return {'table': table_name, 'op': 'DELETE', 'id': row_id}
+            cursor.execute(f"INSERT OR REPLACE INTO {table_name} ({', '.join(columns)}) "
+                           f"VALUES ({', '.join('?' * len(columns))})", [server_row[column] for column in columns])
+        return {'table': table_name, 'op': 'UPDATE', 'id': row_id}
+
+    def _replace_local_id(self, table_name, local_id, new_id):
+        with self._cursor(write=True) as cursor:
+            cursor.execute(f"UPDATE {table_name} SET id = ?, version = 1 WHERE id = ?", (new_id, local_id))
+            cursor.execute("UPDATE outbox SET row_id = ? WHERE table_name = ? AND row_id = ?", (new_id, table_name, local_id))
+            if table_name == 'tasks':
+                cursor.execute("UPDATE reminders SET task_id = ? WHERE task_id = ?", (new_id, local_id))
+                cursor.execute("UPDATE outbox SET row_id = ? WHERE table_name = 'reminders' AND op = 'replace' AND row_id = ?",
+                               (new_id, local_id))
+        return [{'table': table_name, 'op': 'DELETE', 'id': local_id, 'new_id': new_id},
+                {'table': table_name, 'op': 'INSERT', 'id': new_id}]
+
+    def _record_conflict(self, table_name, row_id, row, error):
+        with self._cursor(write=True) as cursor:
+            cursor.execute(
+                "INSERT INTO conflicts (table_name, row_id, local_data, error, detected_at) VALUES (?, ?, ?, ?, ?)",
+                (table_name, row_id, json.dumps(row, ensure_ascii=False, default=str) if row else None, error,
+                 datetime.datetime.now().astimezone())
+            )
+        return {'table': table_name, 'op': 'CONFLICT', 'id': row_id}
+
+    def _pull(self):
+        with self._cursor() as cursor:
+            since = self._state(cursor, 'cursor')
+        changes = self.remote.get_changes_since(since)
+        events = []
+        with self._cursor(write=True) as cursor:
+            # Строки с неотправленными изменениями не перезаписываются
+            cursor.execute("SELECT table_name, row_id, op FROM outbox")
+            pending = {(row['table_name'], row['row_id']) for row in cursor.fetchall()}
+            pending_reminder_tasks = {row_id for table_name, row_id in pending if table_name == 'reminders'}
+            if changes['full']:
+                for table_name in SYNCED_TABLES:
+                    cursor.execute(f"DELETE FROM {table_name} WHERE id > 0 AND id NOT IN "
+                                   f"(SELECT row_id FROM outbox WHERE table_name = ?)", (table_name,))
+            for table_name, columns in SYNCED_TABLES.items():
+                for row in changes[table_name]:
+                    if (table_name, row['id']) in pending or (table_name == 'reminders' and row['task_id'] in pending_reminder_tasks):
+                        continue
+                    values = [row[column] for column in columns]
+                    if not changes['full']:
+                        cursor.execute(f"SELECT {', '.join(columns)} FROM {table_name} WHERE id = ?", (row['id'],))
+                        local_row = cursor.fetchone()
+                        if local_row is not None and [local_row[column] for column in columns] == values:
+                            continue
+                    cursor.execute(f"INSERT OR REPLACE INTO {table_name} ({', '.join(columns)}) "
+                                   f"VALUES ({', '.join('?' * len(columns))})", values)
+                    event = {'table': table_name, 'op': 'UPDATE', 'id': row['id']}
+                    if table_name == 'reminders':
+                        event['task_id'] = row['task_id']
+                    events.append(event)
+            for deleted in changes['deleted']:
+                if (deleted['table_name'], deleted['row_id']) in pending:
+                    continue
+                cursor.execute(f"DELETE FROM {deleted['table_name']} WHERE id = ?", (deleted['row_id'],))
+                if cursor.rowcount:
+                    events.append({'table': deleted['table_name'], 'op': 'DELETE', 'id': deleted['row_id']})
+            cursor.execute("INSERT OR REPLACE INTO sync_state (key, value) VALUES ('cursor', ?)", (changes['cursor'],))
+        if changes['full'] or len(events) > RESYNC_EVENT_LIMIT:
+            # После полной загрузки или массовых изменений проще перечитать все представления
+            events = [{'table': None, 'op': 'RESYNC', 'id': None}]
+        for event in events:
+            self._events.put(event)
+
+    def close(self):
+        self._stopping.set()
+        self._sync_requested.set()
+        self._sync_thread.join(timeout=5)
+        if self.remote is not None:
+            self.remote.close()
+        with self._connections_lock:
+            for conn in self._connections:
+                conn.close()
+            self._connections.clear()
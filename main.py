@@ -1,67 +1,50 @@
 # main.py
 
+import bisect
 import sys
 import os
 import time
 import datetime
-from collections import Counter
 from PyQt6.QtWidgets import (
     QApplication, QMainWindow, QWidget, QHBoxLayout, QVBoxLayout, QLabel,
     QLineEdit, QPushButton, QListWidget, QListWidgetItem, QCalendarWidget,
-    QScrollArea, QCheckBox, QToolTip, QDialog, QFormLayout, QTextEdit,
+    QCheckBox, QToolTip, QDialog, QFormLayout, QTextEdit,
     QDateEdit, QDialogButtonBox, QMenu, QFrame, QMessageBox, QDateTimeEdit,
-    QFileDialog, QSizePolicy, QStackedWidget, QComboBox, QTextBrowser
+    QFileDialog, QSizePolicy, QStackedWidget, QComboBox, QTextBrowser,
+    QListView, QStyledItemDelegate, QStyle, QProgressDialog, QInputDialog,
+    QTableWidget, QTableWidgetItem, QHeaderView
 )
 from PyQt6.QtGui import (
-    QIcon, QFont, QPalette, QColor, QPainter, QCursor, QTextCursor
+    QIcon, QFont, QFontMetrics, QPalette, QColor, QPainter, QCursor, QTextCursor, QShortcut, QKeySequence
 )
 from PyQt6.QtCore import (
-    Qt, QSize, pyqtSignal, QDate, QPropertyAnimation, QEasingCurve, QDateTime,
-    QParallelAnimationGroup, QAbstractAnimation, QPoint, QTimer
+    Qt, QObject, QSize, pyqtSignal, QDate, QDateTime, QPoint, QTimer, QRect, QRectF,
+    QAbstractListModel, QModelIndex, QItemSelectionModel
 )
-from database import DatabaseManager, PRIORITIES, STATUSES, WELCOME_NOTE_TITLE
-
-try:
-    import openpyxl
-    from openpyxl.styles import Font, Alignment
-    from openpyxl.utils import get_column_letter
-    OPENPYXL_AVAILABLE = True
-except ImportError:
-    OPENPYXL_AVAILABLE = False
-
-try:
-    import markdown
-    MARKDOWN_AVAILABLE = True
-except ImportError:
-    MARKDOWN_AVAILABLE = False
+from database import TaskBatch, PRIORITIES, STATUSES, WELCOME_NOTE_TITLE, TASK_LIST_COLUMNS, TASK_SORT_KEYS, search_terms
+from db_worker import DatabaseExecutor, ChangeFeed
+from local_cache import open_database
+from reminders import ReminderScheduler
+from note_repository import NoteRepository
+from markdown_preview import MarkdownPreview
+from note_editor import NoteEditor
+from row_animations import RowAnimationScheduler, read_animation_config
+from icon_cache import IconCache
+from diagnostics import Instrumentation
+from transfer import FILE_FILTER, TransferCancelled, import_file, export_file
+from report_writer import write_task_report
 
 # --- ВСПОМОГАТЕЛЬНЫЕ ФУНКЦИИ ---
 CONFIG_FILE = "settings.conf"
-
-def clear_layout(layout):
-    if layout:
-        while layout.count():
-            item = layout.takeAt(0)
-            widget = item.widget()
-            if widget:
-                widget.deleteLater()
-            else:
-                clear_layout(item.layout())
-
-def load_icon(icon_path):
-    if os.path.exists(icon_path):
-        return QIcon(icon_path)
-    return QIcon()
-
-def colorize_icon(icon: QIcon, color: QColor) -> QIcon:
-    if icon.isNull():
-        return icon
-    pixmap = icon.pixmap(QSize(16, 16))
-    painter = QPainter(pixmap)
-    painter.setCompositionMode(QPainter.CompositionMode.CompositionMode_SourceIn)
-    painter.fillRect(pixmap.rect(), color)
-    painter.end()
-    return QIcon(pixmap)
+REPORT_COLUMNS = TASK_LIST_COLUMNS + ("details",)
+# Обработчики окна, время которых показывает окно диагностики
+INSTRUMENTED_HANDLERS = (
+    "refresh_all_views", "refresh_task_list", "refresh_tags_list", "refresh_completed_list", "refresh_notes_list",
+    "refresh_notes_rows", "populate_tags_list", "populate_completed_list", "apply_note_versions",
+    "populate_notes_list", "patch_notes_list", "on_search_text_changed", "show_search_results",
+    "apply_database_changes", "open_note_in_editor", "show_note_in_editor", "theme_has_changed",
+    "save_report_as_excel",
+)
 
 def apply_stylesheet(app, theme_file):
     try:
@@ -318,16 +301,17 @@ class EditTaskDialog(QDialog):
         self.title_edit.setText(task_data.get('title', ''))
         self.details_edit.setText(task_data.get('details', ''))
         self.tags_edit.setText(task_data.get('tags', ''))
-        if due_date_str := task_data.get('due_date'):
-            self.due_date_edit.setDate(QDate.fromString(due_date_str, "yyyy-MM-dd"))
+        if due_date := task_data.get('due_date'):
+            self.due_date_edit.setDate(QDate(due_date))
             
         self.priority_combo.setCurrentIndex(task_data.get('priority', 0))
         self.status_combo.setCurrentText(task_data.get('status', 'К выполнению'))
         
         for reminder in reminders:
-            dt = QDateTime.fromString(reminder['reminder_datetime'], Qt.DateFormat.ISODate)
+            # В список попадает местное время без пояса, как и у значений из reminder_datetime_edit
+            dt = QDateTime(reminder['reminder_datetime'].astimezone().replace(tzinfo=None))
             item = QListWidgetItem(dt.toString("dd MMMM yy 'в' HH:mm"))
-            item.setData(Qt.ItemDataRole.UserRole, reminder['reminder_datetime'])
+            item.setData(Qt.ItemDataRole.UserRole, dt.toString(Qt.DateFormat.ISODate))
             self.reminders_list.addItem(item)
             
     def add_reminder_to_list(self):
@@ -354,7 +338,105 @@ class EditTaskDialog(QDialog):
         }
         
     def get_reminders_data(self):
-        return [self.reminders_list.item(i).data(Qt.ItemDataRole.UserRole) for i in range(self.reminders_list.count())]
+        return [datetime.datetime.fromisoformat(self.reminders_list.item(i).data(Qt.ItemDataRole.UserRole)).astimezone()
+                for i in range(self.reminders_list.count())]
+
+class DueDateDialog(QDialog):
+    def __init__(self, task_count, parent=None):
+        super().__init__(parent)
+        self.setWindowTitle("Срок выполнения")
+        self.layout = QVBoxLayout(self)
+        form_layout = QFormLayout()
+        self.due_date_edit = QDateEdit(self, calendarPopup=True, date=QDate.currentDate())
+        self.no_date_check = QCheckBox("Без срока")
+        self.no_date_check.toggled.connect(lambda checked: self.due_date_edit.setEnabled(not checked))
+        form_layout.addRow(QLabel(f"Выбрано задач: {task_count}"))
+        form_layout.addRow("Срок выполнения:", self.due_date_edit)
+        form_layout.addRow(self.no_date_check)
+
+        button_box = QDialogButtonBox(QDialogButtonBox.StandardButton.Ok | QDialogButtonBox.StandardButton.Cancel)
+        button_box.accepted.connect(self.accept)
+        button_box.rejected.connect(self.reject)
+        self.layout.addLayout(form_layout)
+        self.layout.addWidget(button_box)
+
+    def get_due_date(self):
+        return None if self.no_date_check.isChecked() else self.due_date_edit.date().toPyDate()
+
+class DiagnosticsDialog(QDialog):
+    CATEGORY_NAMES = {'db': "База данных", 'ui': "Интерфейс", 'markdown': "Markdown"}
+    COLUMNS = ("Источник", "Операция", "Вызовов", "Ошибок", "Среднее, мс", "p50, мс", "p95, мс", "Макс., мс",
+               "Всего, мс", "Строк", "Данных, КБ")
+
+    def __init__(self, instrumentation, parent=None):
+        super().__init__(parent)
+        self.instrumentation = instrumentation
+        self.setWindowTitle("Диагностика")
+        self.resize(900, 500)
+        layout = QVBoxLayout(self)
+        hint = QLabel("Время запросов к базе данных, обработчиков окна и отрисовки Markdown с момента запуска "
+                      "(p50 и p95 - оценка по гистограмме).")
+        hint.setWordWrap(True)
+        self.table = QTableWidget(0, len(self.COLUMNS))
+        self.table.setHorizontalHeaderLabels(self.COLUMNS)
+        self.table.setEditTriggers(QTableWidget.EditTrigger.NoEditTriggers)
+        self.table.verticalHeader().hide()
+        self.table.horizontalHeader().setSectionResizeMode(1, QHeaderView.ResizeMode.Stretch)
+
+        buttons_layout = QHBoxLayout()
+        refresh_button = QPushButton("Обновить")
+        refresh_button.clicked.connect(self.refresh)
+        reset_button = QPushButton("Сбросить")
+        reset_button.clicked.connect(self.reset)
+        json_button = QPushButton("Экспорт JSON...")
+        json_button.clicked.connect(lambda: self.export(trace=False))
+        trace_button = QPushButton("Экспорт Chrome trace...")
+        trace_button.clicked.connect(lambda: self.export(trace=True))
+        close_button = QPushButton("Закрыть")
+        close_button.clicked.connect(self.accept)
+        for button in (refresh_button, reset_button, json_button, trace_button):
+            buttons_layout.addWidget(button)
+        buttons_layout.addStretch()
+        buttons_layout.addWidget(close_button)
+
+        layout.addWidget(hint)
+        layout.addWidget(self.table, 1)
+        layout.addLayout(buttons_layout)
+        self.refresh()
+
+    def refresh(self):
+        operations = self.instrumentation.summary()
+        self.table.setSortingEnabled(False)
+        self.table.setRowCount(len(operations))
+        for row, op in enumerate(operations):
+            values = (self.CATEGORY_NAMES.get(op['category'], op['category']), op['name'], op['calls'], op['errors'],
+                      op['mean_ms'], op['p50_ms'], op['p95_ms'], op['max_ms'], op['total_ms'], op['rows'],
+                      round(op['bytes'] / 1024, 1))
+            for column, value in enumerate(values):
+                item = QTableWidgetItem()
+                item.setData(Qt.ItemDataRole.DisplayRole, value)
+                self.table.setItem(row, column, item)
+        self.table.setSortingEnabled(True)
+        self.table.resizeColumnsToContents()
+
+    def reset(self):
+        self.instrumentation.reset()
+        self.refresh()
+
+    def export(self, trace):
+        if trace:
+            file_path, _ = QFileDialog.getSaveFileName(self, "Экспорт Chrome trace", "trace.json", "JSON (*.json)")
+        else:
+            file_path, _ = QFileDialog.getSaveFileName(self, "Экспорт диагностики", "diagnostics.json", "JSON (*.json)")
+        if not file_path:
+            return
+        try:
+            if trace:
+                self.instrumentation.export_chrome_trace(file_path)
+            else:
+                self.instrumentation.export_json(file_path)
+        except OSError as e:
+            QMessageBox.critical(self, "Ошибка", f"Не удалось сохранить файл.\nОшибка: {e}")
 
 class ReportDialog(QDialog):
     def __init__(self, parent=None):
@@ -385,11 +467,15 @@ class ReportDialog(QDialog):
         self.sort_combo.addItem("Сортировать по дате создания", "creation_date")
         self.sort_combo.addItem("Сортировать по алфавиту", "alphabetical")
 
+        self.summary_only_check = QCheckBox("Только сводная статистика (без списка задач)")
+        self.summary_only_check.toggled.connect(lambda checked: self.sort_combo.setEnabled(not checked))
+
         form_layout.addRow("Включить в отчет:", self.filter_combo)
         form_layout.addRow(self.date_range_check)
         form_layout.addRow(self.start_date_label, self.start_date_edit)
         form_layout.addRow(self.end_date_label, self.end_date_edit)
         form_layout.addRow("Отсортировать по:", self.sort_combo)
+        form_layout.addRow(self.summary_only_check)
         
         self.layout.addLayout(form_layout)
         
@@ -413,84 +499,555 @@ class ReportDialog(QDialog):
             "use_date_range": self.date_range_check.isChecked(),
             "sort_by": self.sort_combo.currentData(),
             "start_date": self.start_date_edit.date().toPyDate().isoformat(),
-            "end_date": self.end_date_edit.date().toPyDate().isoformat()
+            "end_date": self.end_date_edit.date().toPyDate().isoformat(),
+            "summary_only": self.summary_only_check.isChecked()
         }
 
-class TaskWidget(QWidget):
-    edit_requested = pyqtSignal(int)
-    
-    def __init__(self, task_data):
-        super().__init__()
-        self.task_id = task_data['id']
-        self.setObjectName("TaskWidget")
-        self.setWindowOpacity(0.0)
-        self.setMaximumHeight(0)
-
-        layout = QHBoxLayout(self)
-        layout.setContentsMargins(5, 10, 10, 10)
-        layout.setSpacing(10)
-
-        self.priority_indicator = QFrame()
-        self.priority_indicator.setObjectName("PriorityIndicator")
-        self.priority_indicator.setFixedWidth(5)
-        self.priority_indicator.setProperty("priority", task_data.get('priority', 0))
-        
-        text_layout = QVBoxLayout()
-        text_layout.setSpacing(2)
-        title_label = QLabel(task_data['title'])
-        title_label.setObjectName("TaskTitle")
-        title_label.setWordWrap(True)
+class TaskListModel(QAbstractListModel):
+    """
+    Модель списка задач: страницы загружаются в фоне по мере прокрутки.
+    Новый результат того же источника сверяется с показанным по id и updated_at
+    (reconcile): меняются только добавленные, перемещенные, измененные и удаленные строки.
+    """
+    TaskRole = Qt.ItemDataRole.UserRole
+    TaskIdRole = Qt.ItemDataRole.UserRole + 1
+    FETCH_BATCH_SIZE = 100
+
+    details_loaded = pyqtSignal(int)
 
+    def __init__(self, executor, parent=None):
+        super().__init__(parent)
+        self._executor = executor
+        self._fetch_page = None
+        self._fetch_rows = None
+        self._sort_key = None
+        self._tasks = []
+        self._details = {}
+        self._exhausted = True
+        self._loading = False
+        self._generation = 0
+        self.source_key = None
+
+    def set_source(self, fetch_page, rows=None, exhausted=False, fetch_rows=None, sort_key=None, source_key=None,
+                   reset=False):
+        """
+        fetch_page(after, limit) возвращает строки, следующие за строкой after. Вызывается в фоновом потоке.
+        rows — уже загруженные первые строки; exhausted означает, что других строк нет.
+        fetch_rows(ids) и sort_key (см. database.TASK_SORT_KEYS) позволяют обновлять
+        отдельные строки через refresh_rows; без них источник можно только загрузить заново.
+        Если source_key совпадает с ключом текущего источника и не задан reset, модель
+        не сбрасывается: rows (или заново загруженные строки) сверяются с показанными.
+        """
+        same_source = not reset and source_key is not None and source_key == self.source_key
+        self._executor.cancel(("task_page", id(self)))
+        self._fetch_page = fetch_page
+        self._fetch_rows = fetch_rows
+        self._sort_key = sort_key
+        if same_source:
+            self._generation += 1
+            self._loading = False
+            if rows is not None:
+                self._reconcile(self._generation, rows, exhausted)
+            else:
+                self.reload()
+            return
+        self.beginResetModel()
+        self._generation += 1
+        self.source_key = source_key
+        self._tasks = list(rows or ())
+        self._details = {}
+        self._exhausted = exhausted
+        self._loading = False
+        self.endResetModel()
+
+    def reload(self):
+        """Заново загружает уже показанные строки и сверяет их с текущими."""
+        generation = self._generation
+        limit = max(len(self._tasks), self.FETCH_BATCH_SIZE)
+        self._loading = True
+        self._executor.submit(
+            self._fetch_page, None, limit, key=("task_page", id(self)),
+            on_result=lambda rows: self._reconcile(generation, rows, len(rows) < limit),
+            on_error=lambda error: self._on_page_failed(generation, error))
+
+    def _reconcile(self, generation, rows, exhausted):
+        if generation != self._generation: return
+        self._loading = False
+        self._exhausted = exhausted
+        fresh_index = {task['id']: i for i, task in enumerate(rows)}
+        for i in reversed(range(len(self._tasks))):
+            if self._tasks[i]['id'] not in fresh_index:
+                self._details.pop(self._tasks[i]['id'], None)
+                self.beginRemoveRows(QModelIndex(), i, i)
+                del self._tasks[i]
+                self.endRemoveRows()
+        # Строки наибольшей возрастающей подпоследовательности остаются на месте,
+        # перемещаются только остальные: так перемещений меньше всего
+        stable = self._longest_increasing([fresh_index[task['id']] for task in self._tasks])
+        ids = [task['id'] for task in self._tasks]
+        shown = set(ids)
+        for i, task in enumerate(rows):
+            if i in stable:
+                continue
+            # Новая или перемещаемая строка ставится сразу за предыдущей строкой результата
+            target = ids.index(rows[i - 1]['id']) + 1 if i else 0
+            if task['id'] not in shown:
+                self.beginInsertRows(QModelIndex(), target, target)
+                self._tasks.insert(target, task)
+                ids.insert(target, task['id'])
+                self.endInsertRows()
+                continue
+            current = ids.index(task['id'])
+            if current < target:
+                target -= 1
+            if current == target:
+                continue
+            self.beginMoveRows(QModelIndex(), current, current, QModelIndex(), target + 1 if target > current else target)
+            self._tasks.insert(target, self._tasks.pop(current))
+            ids.insert(target, ids.pop(current))
+            self.endMoveRows()
+        for i, task in enumerate(rows):
+            self._update_row(i, task)
+
+    @staticmethod
+    def _longest_increasing(sequence):
+        """Значения наибольшей возрастающей подпоследовательности sequence (значения различны)."""
+        tails, previous = [], {}
+        for value in sequence:
+            k = bisect.bisect_left(tails, value)
+            previous[value] = tails[k - 1] if k else None
+            if k == len(tails):
+                tails.append(value)
+            else:
+                tails[k] = value
+        result = set()
+        value = tails[-1] if tails else None
+        while value is not None:
+            result.add(value)
+            value = previous[value]
+        return result
+
+    @staticmethod
+    def _same_version(a, b):
+        if 'updated_at' in a and 'updated_at' in b:
+            return a['updated_at'] == b['updated_at']
+        return a == b
+
+    def _update_row(self, i, task):
+        if self._same_version(self._tasks[i], task):
+            return
+        self._details.pop(task['id'], None)
+        self._tasks[i] = task
+        index = self.index(i)
+        self.dataChanged.emit(index, index)
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self._tasks)
+
+    def canFetchMore(self, parent):
+        return not parent.isValid() and not self._exhausted and not self._loading
+
+    def fetchMore(self, parent):
+        if parent.isValid() or self._exhausted or self._loading: return
+        self._loading = True
+        generation = self._generation
+        after = self._tasks[-1] if self._tasks else None
+        self._executor.submit(
+            self._fetch_page, after, self.FETCH_BATCH_SIZE, key=("task_page", id(self)),
+            on_result=lambda batch: self._append_page(generation, batch),
+            on_error=lambda error: self._on_page_failed(generation, error))
+
+    def _append_page(self, generation, batch):
+        if generation != self._generation: return
+        self._loading = False
+        self._exhausted = len(batch) < self.FETCH_BATCH_SIZE
+        # Строка могла попасть в список через refresh_rows, пока страница загружалась
+        loaded_ids = {task['id'] for task in self._tasks}
+        batch = [task for task in batch if task['id'] not in loaded_ids]
+        if not batch: return
+        start = len(self._tasks)
+        self.beginInsertRows(QModelIndex(), start, start + len(batch) - 1)
+        self._tasks.extend(batch)
+        self.endInsertRows()
+
+    def _on_page_failed(self, generation, error):
+        if generation != self._generation: return
+        self._loading = False
+        self._exhausted = True
+        print(f"Ошибка загрузки списка задач: {error}")
+
+    def refresh_rows(self, task_ids):
+        """
+        Перечитывает задачи task_ids и обновляет, перемещает, добавляет или удаляет
+        только их строки. Возвращает False, если источник этого не поддерживает.
+        """
+        if self._fetch_rows is None:
+            return False
+        generation = self._generation
+        task_ids = set(task_ids)
+        self._executor.submit(self._fetch_rows, task_ids,
+                              on_result=lambda rows: self._apply_rows(generation, task_ids, rows))
+        return True
+
+    def _precedes(self, a, b):
+        for column, direction, nullable in self._sort_key:
+            x, y = a[column], b[column]
+            if x == y:
+                continue
+            # NULL идут последними (NULLS LAST)
+            if x is None or y is None:
+                return y is None
+            return x > y if direction == 'DESC' else x < y
+        return False
+
+    def _insert_position(self, task):
+        low, high = 0, len(self._tasks)
+        while low < high:
+            middle = (low + high) // 2
+            if self._precedes(self._tasks[middle], task):
+                low = middle + 1
+            else:
+                high = middle
+        return low
+
+    def _apply_rows(self, generation, task_ids, rows):
+        if generation != self._generation: return
+        # Текст база упорядочивает по своим правилам сортировки (регистр, ё), а не по кодам
+        # символов, как _precedes: позицию строки не вычислить, список сверяется заново
+        if rows and any(isinstance(rows[0][column], str) for column, _, _ in self._sort_key):
+            self.reload()
+            return
+        fresh = {task['id']: task for task in rows}
+        for i in reversed(range(len(self._tasks))):
+            task_id = self._tasks[i]['id']
+            if task_id in task_ids:
+                if task_id not in fresh:
+                    self._details.pop(task_id, None)
+                    self.beginRemoveRows(QModelIndex(), i, i)
+                    del self._tasks[i]
+                    self.endRemoveRows()
+        for task in fresh.values():
+            i = next((i for i, loaded in enumerate(self._tasks) if loaded['id'] == task['id']), None)
+            if i is not None:
+                old = self._tasks.pop(i)
+                position = self._insert_position(task)
+                self._tasks.insert(i, old)
+            else:
+                position = self._insert_position(task)
+            # Строка за последней загруженной появится со следующей страницей; последняя
+            # строка не должна сдвигаться вперед, иначе keyset пропустит строки между ними
+            beyond_loaded = not self._exhausted and position == len(self._tasks) - (i is not None)
+            if i is None:
+                if beyond_loaded: continue
+                self.beginInsertRows(QModelIndex(), position, position)
+                self._tasks.insert(position, task)
+                self.endInsertRows()
+            elif beyond_loaded:
+                self.beginRemoveRows(QModelIndex(), i, i)
+                del self._tasks[i]
+                self.endRemoveRows()
+            else:
+                if position != i:
+                    self.beginMoveRows(QModelIndex(), i, i, QModelIndex(), position + 1 if position > i else position)
+                    self._tasks.insert(position, self._tasks.pop(i))
+                    self.endMoveRows()
+                self._update_row(position, task)
+
+    def _task_details(self, task_id):
+        if task_id not in self._details:
+            # Детали загружаются в фоне; подсказка покажется, когда они придут
+            self._details[task_id] = None
+            self._executor.submit(self._executor.db.get_task_details, task_id,
+                                  on_result=lambda details: self._on_details_loaded(task_id, details))
+        return self._details.get(task_id)
+
+    def _on_details_loaded(self, task_id, details):
+        self._details[task_id] = details
+        if details:
+            self.details_loaded.emit(task_id)
+
+    def data(self, index, role=Qt.ItemDataRole.DisplayRole):
+        if not index.isValid() or not (0 <= index.row() < len(self._tasks)):
+            return None
+        task = self._tasks[index.row()]
+        if role == Qt.ItemDataRole.DisplayRole:
+            return task['title']
+        if role == Qt.ItemDataRole.ToolTipRole:
+            details = self._task_details(task['id'])
+            return f"<b>Детали:</b><br>{details}" if details else None
+        if role == self.TaskRole:
+            return task
+        if role == self.TaskIdRole:
+            return task['id']
+        return None
+
+class TransferProgress(QObject):
+    """
+    Функция progress для фоновых импорта и экспорта: передает число обработанных
+    строк в поток интерфейса и прерывает операцию после cancel().
+    """
+    progressed = pyqtSignal(int)
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.cancelled = False
+
+    def cancel(self):
+        self.cancelled = True
+
+    def __call__(self, count):
+        if self.cancelled:
+            raise TransferCancelled()
+        self.progressed.emit(count)
+
+class TaskSearchPipeline(QObject):
+    """
+    Поиск задач по мере набора. Ввод откладывается на DEBOUNCE_MS, устаревшие
+    запросы отменяются. Вместе с результатом сервер возвращает префиксы лексем
+    каждого слова запроса (со стеммингом, как в полнотекстовом поиске). Если
+    результат загружен целиком, а новый запрос лишь дописывает его слова, строки
+    фильтруются на клиенте по лексемам строк без обращения к серверу.
+    """
+    DEBOUNCE_MS = 250
+    LOCAL_RESULT_LIMIT = 500
+
+    # запрос, строки, загружены ли все строки результата
+    results_ready = pyqtSignal(str, list, bool)
+
+    def __init__(self, executor, parent=None):
+        super().__init__(parent)
+        self._executor = executor
+        self._pending_query = ""
+        # [(слово запроса, префиксы его лексем на сервере)]
+        self._cached_terms = None
+        self._cached_rows = []
+        self._debounce_timer = QTimer(self)
+        self._debounce_timer.setSingleShot(True)
+        self._debounce_timer.setInterval(self.DEBOUNCE_MS)
+        self._debounce_timer.timeout.connect(lambda: self.search_now(self._pending_query))
+
+    def set_query(self, query):
+        self._pending_query = query
+        self._debounce_timer.start()
+
+    def reset(self):
+        self._debounce_timer.stop()
+        self._executor.cancel("task_search")
+        self.invalidate()
+
+    def invalidate(self):
+        self._cached_terms = None
+        self._cached_rows = []
+
+    def search_now(self, query):
+        self._debounce_timer.stop()
+        terms = search_terms(query)
+        if self._cached_terms is not None and self._refines(self._cached_terms, terms):
+            rows = [row for row, words in self._cached_rows if self._matches(words, self._cached_terms, terms)]
+            # Пустой результат проверяется на сервере: там сработает поиск опечаток
+            if rows:
+                self._executor.cancel("task_search")
+                self.results_ready.emit(query, rows, True)
+                return
+        db = self._executor.db
+
+        def search():
+            return (db.search_query_lexemes(query),
+                    db.search_tasks_page(query, limit=self.LOCAL_RESULT_LIMIT, with_lexemes=True))
+
+        self._executor.submit(search, key="task_search",
+                              on_result=lambda result: self._on_results(query, terms, *result))
+
+    def _on_results(self, query, terms, lexemes, rows):
+        complete = len(rows) < self.LOCAL_RESULT_LIMIT
+        # Триграммные и локальные результаты не проверить по лексемам, поэтому они не кэшируются
+        if (complete and lexemes is not None and len(lexemes) == len(terms) and any(lexemes)
+                and all(row['search_mode'] == 'fts' for row in rows)):
+            self._cached_terms = list(zip(terms, lexemes))
+            self._cached_rows = [(row, row['lexemes']) for row in rows]
+        else:
+            self.invalidate()
+        self.results_ready.emit(query, rows, complete)
+
+    @staticmethod
+    def _refines(cached_terms, new_terms):
+        """
+        Новый запрос из тех же слов, некоторые дописаны. Новое слово сервер мог бы разобрать
+        иначе (стоп-слово), поэтому запрос с другим числом слов выполняется на сервере.
+        """
+        return len(new_terms) == len(cached_terms) and all(
+            new == old or (prefixes and new.startswith(old)) for (old, prefixes), new in zip(cached_terms, new_terms))
+
+    @staticmethod
+    def _matches(words, cached_terms, new_terms):
+        """
+        Для каждого слова есть лексема строки с префиксом этого слова на сервере. Основа
+        дописанного слова на клиенте неизвестна: ею считается лексема, с которой оно
+        начинается (например, «отчет» для «отчеты»).
+        """
+        for (old, prefixes), new in zip(cached_terms, new_terms):
+            if not prefixes:
+                continue
+            if not any(word.startswith(prefix) and (new == old or word.startswith(new) or new.startswith(word))
+                       for word in words for prefix in prefixes):
+                return False
+        return True
+
+# Цвета строк списка задач для каждой темы. Фон и разделитель строк задаются
+# правилами #TaskList в .qss, остальное делегат рисует сам.
+TASK_ROW_PALETTES = {
+    "style.qss": {
+        "priority": {1: "#77A6F7", 2: "#FFB800", 3: "#F76255"},
+        "meta": "#888888", "completed": "#888888",
+        "status_text": "#888888", "status_background": "#F0F0F0",
+    },
+    "dark_style.qss": {
+        "priority": {1: "#5892F5", 2: "#FFC74D", 3: "#F7776D"},
+        "meta": "#888888", "completed": "#888888",
+        "status_text": "#AAAAAA", "status_background": "#454545",
+    },
+}
+
+class TaskItemDelegate(QStyledItemDelegate):
+    """Рисует строку задачи: полоса приоритета, заголовок, теги и срок, статус."""
+    MARGINS = (5, 10, 10, 10) # слева, сверху, справа, снизу
+    SPACING = 10
+    INDICATOR_WIDTH = 5
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        # RowAnimationScheduler, задающий прозрачность и сдвиг строк при появлении
+        self.animations = None
+        self.set_theme(load_theme_setting())
+
+    def set_theme(self, theme_file):
+        # Цвета и шрифты строятся один раз на тему и шрифт, а не при отрисовке каждой строки
+        palette = TASK_ROW_PALETTES.get(theme_file, TASK_ROW_PALETTES["style.qss"])
+        self.colors = {name: {key: QColor(color) for key, color in value.items()} if isinstance(value, dict) else QColor(value)
+                       for name, value in palette.items()}
+        self._fonts_by_key = {}
+
+    def _fonts(self, option):
+        """Шрифты строки и их метрики (title, completed_title, meta, status) для шрифта option.font."""
+        fonts = self._fonts_by_key.get(option.font.key())
+        if fonts is None:
+            title_font = QFont(option.font)
+            title_font.setPixelSize(14)
+            title_font.setWeight(QFont.Weight.Medium)
+            completed_title_font = QFont(title_font)
+            completed_title_font.setStrikeOut(True)
+            meta_font = QFont(option.font)
+            meta_font.setPixelSize(12)
+            status_font = QFont(option.font)
+            status_font.setPixelSize(11)
+            status_font.setBold(True)
+            fonts = {name: (font, QFontMetrics(font)) for name, font in (
+                ("title", title_font), ("completed_title", completed_title_font),
+                ("meta", meta_font), ("status", status_font))}
+            self._fonts_by_key[option.font.key()] = fonts
+        return fonts
+
+    @staticmethod
+    def _meta_text(task):
         meta_text = []
-        if task_data['tags']:
-            meta_text.append(f"🏷️ {task_data['tags']}")
-        if task_data['due_date']:
-            try:
-                meta_text.append(f"🗓️ {datetime.date.fromisoformat(task_data['due_date']).strftime('%d %b')}")
-            except (ValueError, TypeError): pass
-        
-        meta_label = QLabel("  ".join(meta_text))
-        meta_label.setObjectName("TaskMeta")
-        text_layout.addWidget(title_label)
-        if meta_text: text_layout.addWidget(meta_label)
-        
-        layout.addWidget(self.priority_indicator)
-        layout.addLayout(text_layout, 1)
-        
-        self.status_label = QLabel(task_data['status'])
-        self.status_label.setObjectName("StatusLabel")
-        if task_data['status'] == 'К выполнению' or task_data['status'] == 'Завершено':
-            self.status_label.hide()
-        layout.addWidget(self.status_label)
-
-        if task_data['details']:
-            self.setToolTip(f"<b>Детали:</b><br>{task_data['details']}")
-            
-        self.update_visual_state(task_data['status'])
+        if task['tags']:
+            meta_text.append(f"🏷️ {task['tags']}")
+        if task['due_date']:
+            meta_text.append(f"🗓️ {task['due_date'].strftime('%d %b')}")
+        return "  ".join(meta_text)
+
+    def sizeHint(self, option, index):
+        task = index.data(TaskListModel.TaskRole)
+        fonts = self._fonts(option)
+        left, top, right, bottom = self.MARGINS
+        height = top + fonts["title"][1].height() + bottom
+        if self._meta_text(task):
+            height += 2 + fonts["meta"][1].height()
+        # Ширину строки задает представление (по ширине области просмотра)
+        return QSize(0, height)
+
+    def paint(self, painter, option, index):
+        task = index.data(TaskListModel.TaskRole)
+        widget = option.widget
+        style = widget.style() if widget else QApplication.style()
+        # Фон, наведение и разделитель берутся из правил #TaskList::item в .qss
+        style.drawPrimitive(QStyle.PrimitiveElement.PE_PanelItemViewItem, option, painter, widget)
+
+        fonts = self._fonts(option)
+        left, top, right, bottom = self.MARGINS
+        content = option.rect.adjusted(left, top, -right, -bottom)
+        is_completed = task['status'] == 'Завершено'
+
+        painter.save()
+        painter.setRenderHint(QPainter.RenderHint.Antialiasing)
+        if self.animations is not None:
+            opacity, offset = self.animations.state(index)
+            painter.setOpacity(opacity)
+            painter.translate(offset, 0)
+
+        if priority_color := self.colors["priority"].get(task.get('priority', 0)):
+            indicator = QRectF(content.left(), content.top(), self.INDICATOR_WIDTH, content.height())
+            painter.setPen(Qt.PenStyle.NoPen)
+            painter.setBrush(priority_color)
+            painter.drawRoundedRect(indicator, 2.5, 2.5)
+
+        text_left = content.left() + self.INDICATOR_WIDTH + self.SPACING
+        text_right = content.right()
+        if task['status'] not in ('К выполнению', 'Завершено'):
+            status_font, status_metrics = fonts["status"]
+            badge_width = status_metrics.horizontalAdvance(task['status']) + 16
+            badge = QRectF(content.right() - badge_width, content.top(), badge_width, content.height())
+            painter.setPen(Qt.PenStyle.NoPen)
+            painter.setBrush(self.colors["status_background"])
+            painter.drawRoundedRect(badge, 4, 4)
+            painter.setFont(status_font)
+            painter.setPen(self.colors["status_text"])
+            painter.drawText(badge, Qt.AlignmentFlag.AlignCenter, task['status'])
+            text_right = int(badge.left()) - self.SPACING
+
+        text_width = max(0, text_right - text_left)
+        if is_completed:
+            title_font, title_metrics = fonts["completed_title"]
+            painter.setPen(self.colors["completed"])
+        else:
+            title_font, title_metrics = fonts["title"]
+            painter.setPen(option.palette.color(QPalette.ColorRole.Text))
+        painter.setFont(title_font)
+        title_rect = QRect(text_left, content.top(), text_width, title_metrics.height())
+        painter.drawText(title_rect, Qt.AlignmentFlag.AlignLeft | Qt.AlignmentFlag.AlignVCenter,
+                         title_metrics.elidedText(task['title'], Qt.TextElideMode.ElideRight, text_width))
+
+        if meta_text := self._meta_text(task):
+            meta_font, meta_metrics = fonts["meta"]
+            painter.setFont(meta_font)
+            painter.setPen(self.colors["meta"])
+            meta_rect = QRect(text_left, title_rect.bottom() + 1 + 2, text_width, meta_metrics.height())
+            painter.drawText(meta_rect, Qt.AlignmentFlag.AlignLeft | Qt.AlignmentFlag.AlignVCenter,
+                             meta_metrics.elidedText(meta_text, Qt.TextElideMode.ElideRight, text_width))
+        painter.restore()
 
-    def update_visual_state(self, status):
-        is_completed = (status == 'Завершено')
-        self.setProperty("completed", is_completed)
-        self.style().unpolish(self)
-        self.style().polish(self)
-    
-    def mouseDoubleClickEvent(self, event):
-        self.edit_requested.emit(self.task_id)
-        super().mouseDoubleClickEvent(event)
-    
 class MainWindow(QMainWindow):
     def __init__(self):
         super().__init__()
-        self.db = DatabaseManager()
+        # Обработчики оборачиваются до подключения к сигналам
+        self.instrumentation = Instrumentation()
+        self.instrumentation.instrument(self, 'ui', INSTRUMENTED_HANDLERS, drop_extra_args=True)
+        self.db = open_database()
+        self.instrumentation.instrument(self.db, 'db')
+        self.db_executor = DatabaseExecutor(self.db, self)
+        self.search_pipeline = TaskSearchPipeline(self.db_executor, self)
+        self.search_pipeline.results_ready.connect(self.show_search_results)
+        self.note_repository = NoteRepository(self.db_executor, self)
         self.current_task_filter = 'active'
         self.current_task_filter_value = None
         self.current_sort_by = 'priority'
         self.current_title = "Активные задачи"
-        self.active_animations = []
+        self.current_search_query = ""
         
         self.setWindowTitle("Denkwürfel")
         self.setGeometry(100, 100, 1280, 800)
         
+        self.icon_cache = IconCache()
         self.update_icons()
         
         main_widget = QWidget()
@@ -503,22 +1060,25 @@ class MainWindow(QMainWindow):
         self.refresh_all_views()
         self.on_main_nav_clicked(self.main_nav_list.item(0))
 
-        self.reminder_timer = QTimer(self)
-        self.reminder_timer.timeout.connect(self.check_for_reminders)
-        self.reminder_timer.start(30000)
+        self.reminder_box = None
+        self.shown_reminders = []
+        self.reminder_scheduler = ReminderScheduler(self.db_executor, self)
+        self.reminder_scheduler.reminders_due.connect(self.show_due_reminders)
+        self.reminder_scheduler.load_failed.connect(self.show_db_error)
+        self.reminder_scheduler.start()
+
+        self.change_feed = ChangeFeed(self.db, self)
+        self.change_feed.changes_received.connect(self.apply_database_changes)
+        self.change_feed.reconnected.connect(self.refresh_all_views)
+        # Пока не было связи, напоминания могли измениться или наступить
+        self.change_feed.reconnected.connect(self.reminder_scheduler.invalidate)
+        self.change_feed.start()
 
     def update_icons(self):
         text_color = self.palette().color(QPalette.ColorRole.Text)
-        raw_icons = {
-            "tasks": load_icon("icons/completed.svg"), 
-            "notes": load_icon("icons/personal.svg"), 
-            "important": load_icon("icons/important.svg"), 
-            "all": load_icon("icons/tag.svg"), 
-            "completed": load_icon("icons/completed.svg"), 
-            "tag": load_icon("icons/tag.svg"),
-            "settings": load_icon("icons/settings.svg")
-        }
-        self.icons = {name: colorize_icon(icon, text_color) for name, icon in raw_icons.items()}
+        theme = load_theme_setting()
+        self.icons = self.icon_cache.icons(text_color, theme)
+        self.tag_pixmap = self.icon_cache.pixmap("tag", 16, text_color, theme)
 
     def init_ui(self, main_layout):
         left_panel = self.create_left_panel()
@@ -586,9 +1146,14 @@ class MainWindow(QMainWindow):
         notes_nav_widget = QWidget()
         notes_nav_layout = QVBoxLayout(notes_nav_widget)
         notes_nav_layout.setContentsMargins(0,0,0,0)
+        self.notes_search_bar = QLineEdit(placeholderText="🔍 Поиск по заметкам")
+        self.notes_search_bar.setObjectName("SearchBar")
+        self.notes_search_bar.textChanged.connect(self.refresh_notes_list)
         self.notes_list_widget = QListWidget()
         self.notes_list_widget.setObjectName("NavList")
         self.notes_list_widget.itemDoubleClicked.connect(self.open_note_in_editor)
+        self.notes_list_widget.currentRowChanged.connect(self.prefetch_notes_around)
+        notes_nav_layout.addWidget(self.notes_search_bar)
         notes_nav_layout.addWidget(QLabel("Ваши заметки"))
         notes_nav_layout.addWidget(self.notes_list_widget, 1)
         
@@ -631,6 +1196,39 @@ class MainWindow(QMainWindow):
         self.view_widget = QWidget()
         self.view_layout = QVBoxLayout(self.view_widget)
         self.view_layout.setContentsMargins(0,0,0,0)
+
+        self.task_list_model = TaskListModel(self.db_executor, self)
+        self.task_list_model.details_loaded.connect(self.show_task_details_tooltip)
+        self.task_delegate = TaskItemDelegate(self)
+        self.task_list_view = QListView()
+        self.task_list_view.setObjectName("TaskList")
+        self.task_list_view.setModel(self.task_list_model)
+        self.task_list_view.setItemDelegate(self.task_delegate)
+        # Несколько задач выделяются с Ctrl/Shift и меняются пакетом из контекстного меню
+        self.task_list_view.setSelectionMode(QListView.SelectionMode.ExtendedSelection)
+        self.task_list_view.setContextMenuPolicy(Qt.ContextMenuPolicy.CustomContextMenu)
+        self.task_list_view.customContextMenuRequested.connect(self.show_task_context_menu)
+        delete_shortcut = QShortcut(QKeySequence(QKeySequence.StandardKey.Delete), self.task_list_view)
+        delete_shortcut.setContext(Qt.ShortcutContext.WidgetShortcut)
+        delete_shortcut.activated.connect(lambda: self.delete_tasks(self.selected_task_ids()))
+        self.task_list_view.setEditTriggers(QListView.EditTrigger.NoEditTriggers)
+        self.task_list_view.setVerticalScrollMode(QListView.ScrollMode.ScrollPerPixel)
+        self.task_list_view.setHorizontalScrollBarPolicy(Qt.ScrollBarPolicy.ScrollBarAlwaysOff)
+        self.task_list_view.setMouseTracking(True)
+        self.task_list_view.doubleClicked.connect(
+            lambda index: self.show_edit_task_dialog(index.data(TaskListModel.TaskIdRole)))
+
+        self.task_animations = RowAnimationScheduler(self.task_list_view, TaskListModel.TaskIdRole,
+                                                     **read_animation_config(), parent=self)
+        self.task_delegate.animations = self.task_animations
+        self.instrumentation.instrument(self.task_list_model, 'ui', ("_append_page", "_reconcile"))
+
+        self.notes_welcome_label = QLabel("Выберите заметку слева или создайте новую.\n\nДвойной клик по заметке откроет редактор.")
+        self.notes_welcome_label.setAlignment(Qt.AlignmentFlag.AlignCenter)
+        self.notes_welcome_label.setObjectName("WelcomeLabel")
+
+        self.view_layout.addWidget(self.task_list_view)
+        self.view_layout.addWidget(self.notes_welcome_label)
         self.editor_widget = self.create_note_editor_view()
         self.center_stack.addWidget(self.view_widget)
         self.center_stack.addWidget(self.editor_widget)
@@ -726,6 +1324,13 @@ class MainWindow(QMainWindow):
         self.markdown_preview.setOpenExternalLinks(True)
         notes_right_layout.addWidget(preview_label)
         notes_right_layout.addWidget(self.markdown_preview)
+        self.preview_engine = MarkdownPreview(self.note_content_edit, self.markdown_preview, self)
+        if self.preview_engine.renderer is not None:
+            self.instrumentation.instrument(self.preview_engine.renderer, 'markdown', ("render",))
+        self.note_editor = NoteEditor(self.note_title_edit, self.note_content_edit, self.preview_engine,
+                                      self.db_executor, self.note_repository, self)
+        self.note_editor.saved.connect(self.on_note_saved)
+        self.note_editor.save_failed.connect(self.on_note_save_failed)
 
         self.right_stack.addWidget(tasks_right_panel)
         self.right_stack.addWidget(notes_right_panel)
@@ -735,45 +1340,17 @@ class MainWindow(QMainWindow):
         return right_panel
 
     def switch_to_tasks_view(self):
-        clear_layout(self.view_layout)
-        scroll_area = QScrollArea()
-        scroll_area.setWidgetResizable(True)
-        scroll_area.setObjectName("ScrollArea")
-        tasks_container = QWidget()
-        self.tasks_layout = QVBoxLayout(tasks_container)
-        self.tasks_layout.setSpacing(0)
-        self.tasks_layout.setAlignment(Qt.AlignmentFlag.AlignTop)
-        scroll_area.setWidget(tasks_container)
-        self.view_layout.addWidget(scroll_area)
+        self.notes_welcome_label.hide()
+        self.task_list_view.show()
         self.center_stack.setCurrentWidget(self.view_widget)
         self.sort_combo.show()
         self.refresh_task_list(animated=True)
 
     def switch_to_notes_view(self):
-        clear_layout(self.view_layout)
-        welcome_label = QLabel("Выберите заметку слева или создайте новую.\n\nДвойной клик по заметке откроет редактор.")
-        welcome_label.setAlignment(Qt.AlignmentFlag.AlignCenter)
-        welcome_label.setObjectName("WelcomeLabel")
-        self.view_layout.addWidget(welcome_label)
+        self.task_list_view.hide()
+        self.notes_welcome_label.show()
         self.center_stack.setCurrentWidget(self.view_widget)
         self.sort_combo.hide()
-    
-    def animate_show_item(self, widget, duration):
-        group = QParallelAnimationGroup(self)
-        opacity_anim = QPropertyAnimation(widget, b"windowOpacity")
-        opacity_anim.setDuration(duration)
-        opacity_anim.setStartValue(0.0)
-        opacity_anim.setEndValue(1.0)
-        size_anim = QPropertyAnimation(widget, b"maximumHeight")
-        size_anim.setDuration(duration)
-        size_anim.setStartValue(0)
-        size_anim.setEndValue(widget.sizeHint().height())
-        size_anim.setEasingCurve(QEasingCurve.Type.OutCubic)
-        group.addAnimation(opacity_anim)
-        group.addAnimation(size_anim)
-        group.finished.connect(lambda: self.active_animations.remove(group) if group in self.active_animations else None)
-        self.active_animations.append(group)
-        group.start(QAbstractAnimation.DeletionPolicy.DeleteWhenStopped)
 
     def on_sort_changed(self, index):
         self.current_sort_by = self.sort_combo.itemData(index)
@@ -782,30 +1359,82 @@ class MainWindow(QMainWindow):
     def refresh_all_views(self):
         self.refresh_task_filters_list()
         self.refresh_tags_list()
-        if hasattr(self, 'tasks_layout'):
-            self.refresh_task_list()
+        self.refresh_task_list()
         self.refresh_completed_list()
         self.refresh_notes_list()
 
-    def refresh_main_views(self, animated=False):
-        self.refresh_tags_list()
-        if hasattr(self, 'tasks_layout'):
-            self.refresh_task_list(animated=animated)
-        self.refresh_completed_list()
+    def refresh_changed_task(self, task_id, old, new):
+        """
+        После добавления (old=None) или изменения одной задачи: обновляется ее строка, а
+        теги и завершенные задачи запрашиваются, только если изменение их касается.
+        """
+        def active_tags(task):
+            if not task or task['status'] == 'Завершено':
+                return set()
+            return {tag.strip() for tag in (task.get('tags') or "").split(',') if tag.strip()}
+        if active_tags(old) != active_tags(new):
+            self.refresh_tags_list()
+        if 'Завершено' in (old and old['status'], new['status']):
+            self.refresh_completed_list()
+        if not self.task_list_model.refresh_rows([task_id]):
+            self.refresh_task_list()
 
-    def refresh_task_list(self, animated=False, tasks_list=None):
-        if not hasattr(self, 'tasks_layout'): return
-        clear_layout(self.tasks_layout)
-        tasks = tasks_list if tasks_list is not None else self.db.get_tasks(
-            filter_by=self.current_task_filter, 
-            value=self.current_task_filter_value,
-            sort_by=self.current_sort_by
-        )
-        for i, task_data in enumerate(tasks):
-            task_widget = TaskWidget(task_data)
-            task_widget.edit_requested.connect(self.show_edit_task_dialog)
-            self.tasks_layout.addWidget(task_widget)
-            if animated: self.animate_show_item(task_widget, 250 + i * 25)
+    def refresh_task_list(self, animated=False):
+        if self.current_search_query:
+            # Данные могли измениться, поэтому результат поиска запрашивается заново
+            self.search_pipeline.invalidate()
+            self.search_pipeline.search_now(self.current_search_query)
+            return
+        filter_by, value, sort_by = self.current_task_filter, self.current_task_filter_value, self.current_sort_by
+        fetch_page = lambda after, limit: self.db.get_tasks_page(
+            filter_by=filter_by, value=value, sort_by=sort_by, after=after, limit=limit)
+        fetch_rows = lambda task_ids: self.db.get_tasks_by_ids(task_ids, filter_by=filter_by, value=value)
+        # Анимированное обновление (смена фильтра или сортировки) загружает список заново
+        if animated:
+            self.task_animations.reveal_next_rows()
+        self.task_list_model.set_source(fetch_page, fetch_rows=fetch_rows,
+                                        sort_key=TASK_SORT_KEYS.get(sort_by, TASK_SORT_KEYS['priority']),
+                                        source_key=(filter_by, value, sort_by), reset=animated)
+
+    def apply_database_changes(self, changes):
+        """Изменения других клиентов: обновляются только затронутые строки."""
+        if any(change['op'] == 'RESYNC' for change in changes):
+            self.reminder_scheduler.invalidate()
+            self.refresh_all_views()
+            return
+        for change in changes:
+            # Заметка, созданная в локальном кэше, получила id на сервере
+            if change['table'] == 'notes' and change.get('new_id') and self.note_editor.note_id == change['id']:
+                self.note_editor.note_id = change['new_id']
+        if conflicts := [change for change in changes if change['op'] == 'CONFLICT']:
+            self.show_sync_conflicts(conflicts)
+        task_ids = {change['id'] for change in changes if change['table'] == 'tasks'}
+        note_ids = {change['id'] for change in changes if change['table'] == 'notes'}
+        if task_ids or any(change['table'] == 'reminders' for change in changes):
+            self.reminder_scheduler.invalidate()
+        if task_ids:
+            self.refresh_tags_list()
+            self.refresh_completed_list()
+            if not self.task_list_model.refresh_rows(task_ids):
+                self.refresh_task_list()
+        if note_ids:
+            self.refresh_notes_rows(note_ids)
+
+    def show_sync_conflicts(self, conflicts):
+        msg_box = QMessageBox(self)
+        msg_box.setIcon(QMessageBox.Icon.Warning)
+        msg_box.setWindowTitle("Конфликт синхронизации")
+        msg_box.setText(f"Не удалось отправить изменения ({len(conflicts)}): записи изменены на другом клиенте.")
+        msg_box.setInformativeText("Показана версия с сервера. Ваши изменения сохранены в таблице conflicts локального кэша.")
+        msg_box.setModal(False)
+        msg_box.setAttribute(Qt.WidgetAttribute.WA_DeleteOnClose)
+        msg_box.show()
+
+    def show_task_details_tooltip(self, task_id):
+        viewport = self.task_list_view.viewport()
+        index = self.task_list_view.indexAt(viewport.mapFromGlobal(QCursor.pos()))
+        if index.isValid() and index.data(TaskListModel.TaskIdRole) == task_id:
+            QToolTip.showText(QCursor.pos(), index.data(Qt.ItemDataRole.ToolTipRole), viewport)
 
     def refresh_task_filters_list(self):
         self.task_filters_list.clear()
@@ -814,43 +1443,134 @@ class MainWindow(QMainWindow):
         self.task_filters_list.addItem(QListWidgetItem(self.icons.get("completed"), "Завершенные"))
     
     def refresh_tags_list(self):
-        self.tags_list.clear()
-        for tag, count in sorted(self.db.get_tags_with_counts().items()):
-            item = QListWidgetItem(self.tags_list)
-            row_widget = QWidget()
-            row_layout = QHBoxLayout(row_widget)
-            row_layout.setContentsMargins(5, 3, 8, 3)
-            row_layout.setSpacing(6)
-            icon_label = QLabel()
-            icon_label.setPixmap(self.icons.get("tag").pixmap(QSize(16, 16)))
-            count_label = QLabel(str(count))
-            count_label.setObjectName("TagCount")
-            count_label.setAlignment(Qt.AlignmentFlag.AlignRight | Qt.AlignmentFlag.AlignVCenter)
-            row_layout.addWidget(icon_label)
-            row_layout.addWidget(QLabel(tag), 1)
-            row_layout.addWidget(count_label)
-            item.setData(Qt.ItemDataRole.UserRole, tag)
-            self.tags_list.setItemWidget(item, row_widget)
-            
+        self.db_executor.submit(self.db.get_tags_with_counts, key="tags", on_result=self.populate_tags_list)
+
+    def populate_tags_list(self, tag_counts):
+        """Сверяет список тегов с tag_counts: строки создаются и удаляются только для изменившихся тегов."""
+        tags = sorted(tag_counts)
+        for row in reversed(range(self.tags_list.count())):
+            if self.tags_list.item(row).data(Qt.ItemDataRole.UserRole) not in tag_counts:
+                self.tags_list.takeItem(row)
+        for row, tag in enumerate(tags):
+            item = self.tags_list.item(row)
+            if item is not None and item.data(Qt.ItemDataRole.UserRole) == tag:
+                count_label = self.tags_list.itemWidget(item).findChild(QLabel, "TagCount")
+                if count_label.text() != str(tag_counts[tag]):
+                    count_label.setText(str(tag_counts[tag]))
+                continue
+            self.insert_tag_row(row, tag, tag_counts[tag])
+
+    def insert_tag_row(self, row, tag, count):
+        item = QListWidgetItem()
+        self.tags_list.insertItem(row, item)
+        row_widget = QWidget()
+        row_layout = QHBoxLayout(row_widget)
+        row_layout.setContentsMargins(5, 3, 8, 3)
+        row_layout.setSpacing(6)
+        icon_label = QLabel()
+        icon_label.setObjectName("TagIcon")
+        icon_label.setPixmap(self.tag_pixmap)
+        count_label = QLabel(str(count))
+        count_label.setObjectName("TagCount")
+        count_label.setAlignment(Qt.AlignmentFlag.AlignRight | Qt.AlignmentFlag.AlignVCenter)
+        row_layout.addWidget(icon_label)
+        row_layout.addWidget(QLabel(tag), 1)
+        row_layout.addWidget(count_label)
+        item.setData(Qt.ItemDataRole.UserRole, tag)
+        self.tags_list.setItemWidget(item, row_widget)
+
     def refresh_completed_list(self):
-        self.completed_list_widget.clear()
-        for task in self.db.get_tasks(filter_by='completed')[:5]:
-            item = QListWidgetItem(f"✔ {task['title']}")
-            item.setFlags(item.flags() & ~Qt.ItemFlag.ItemIsSelectable)
-            self.completed_list_widget.addItem(item)
+        self.db_executor.submit(self.db.get_tasks_page, filter_by='completed', limit=5,
+                                key="completed", on_result=self.populate_completed_list)
+
+    def populate_completed_list(self, tasks):
+        for row, task in enumerate(tasks):
+            item = self.completed_list_widget.item(row)
+            if item is None:
+                item = QListWidgetItem()
+                item.setFlags(item.flags() & ~Qt.ItemFlag.ItemIsSelectable)
+                self.completed_list_widget.addItem(item)
+            if item.text() != f"✔ {task['title']}":
+                item.setText(f"✔ {task['title']}")
+        while self.completed_list_widget.count() > len(tasks):
+            self.completed_list_widget.takeItem(len(tasks))
     
     def refresh_notes_list(self):
-        self.db._ensure_welcome_note_exists()
+        if query := self.notes_search_bar.text().strip():
+            self.db_executor.submit(self.db.search_notes, query, key="notes", on_result=self.populate_notes_list)
+            return
+        # Заново запрашиваются только заметки, у которых изменился updated_at
+        known = {}
+        for row in range(self.notes_list_widget.count()):
+            item = self.notes_list_widget.item(row)
+            known[item.data(Qt.ItemDataRole.UserRole)] = item.data(Qt.ItemDataRole.UserRole + 1)
+        def load_changed_notes():
+            versions = self.db.get_note_versions()
+            changed = [note_id for note_id, updated_at in versions.items() if known.get(note_id) != updated_at]
+            return versions, self.db.get_notes_by_ids(changed) if changed else []
+        self.db_executor.submit(load_changed_notes, key="notes", on_result=self.apply_note_versions)
+
+    def apply_note_versions(self, result):
+        versions, notes = result
+        if self.notes_list_widget.count() == 0:
+            self.populate_notes_list(sorted(notes, key=lambda note: note['updated_at'], reverse=True))
+            return
+        listed = {self.notes_list_widget.item(row).data(Qt.ItemDataRole.UserRole)
+                  for row in range(self.notes_list_widget.count())}
+        stale_ids = {note['id'] for note in notes} | (listed - versions.keys())
+        if stale_ids:
+            self.patch_notes_list(stale_ids, notes)
+
+    def populate_notes_list(self, notes):
         current_selection = self.notes_list_widget.currentItem()
         current_id = current_selection.data(Qt.ItemDataRole.UserRole) if current_selection else None
         self.notes_list_widget.clear()
         item_to_reselect = None
-        for note in self.db.get_all_notes():
+        for note in notes:
             item = QListWidgetItem(note['title'])
             item.setData(Qt.ItemDataRole.UserRole, note['id'])
+            item.setData(Qt.ItemDataRole.UserRole + 1, note['updated_at'])
             self.notes_list_widget.addItem(item)
             if note['id'] == current_id: item_to_reselect = item
         if item_to_reselect: self.notes_list_widget.setCurrentItem(item_to_reselect)
+        self.note_repository.sync_versions(notes)
+
+    def refresh_notes_rows(self, note_ids):
+        if self.notes_search_bar.text().strip():
+            # Порядок результатов поиска зависит от релевантности, поэтому поиск повторяется
+            self.refresh_notes_list()
+            return
+        for note_id in note_ids:
+            self.note_repository.discard(note_id)
+        self.db_executor.submit(self.db.get_notes_by_ids, note_ids,
+                                on_result=lambda notes: self.patch_notes_list(note_ids, notes))
+
+    def patch_notes_list(self, note_ids, notes):
+        """Обновляет строки заметок note_ids в списке, упорядоченном по updated_at."""
+        current_selection = self.notes_list_widget.currentItem()
+        current_id = current_selection.data(Qt.ItemDataRole.UserRole) if current_selection else None
+        for row in reversed(range(self.notes_list_widget.count())):
+            if self.notes_list_widget.item(row).data(Qt.ItemDataRole.UserRole) in note_ids:
+                self.notes_list_widget.takeItem(row)
+        for note in notes:
+            row = 0
+            while (row < self.notes_list_widget.count() and
+                   self.notes_list_widget.item(row).data(Qt.ItemDataRole.UserRole + 1) >= note['updated_at']):
+                row += 1
+            item = QListWidgetItem(note['title'])
+            item.setData(Qt.ItemDataRole.UserRole, note['id'])
+            item.setData(Qt.ItemDataRole.UserRole + 1, note['updated_at'])
+            self.notes_list_widget.insertItem(row, item)
+            if note['id'] == current_id:
+                self.notes_list_widget.setCurrentItem(item)
+        self.note_repository.sync_versions(notes, note_ids)
+
+    def prefetch_notes_around(self, row):
+        if row < 0:
+            return
+        radius = self.note_repository.PREFETCH_RADIUS
+        rows = range(max(0, row - radius), min(self.notes_list_widget.count(), row + radius + 1))
+        self.note_repository.prefetch([self.notes_list_widget.item(r).data(Qt.ItemDataRole.UserRole) for r in rows])
 
     def on_main_nav_clicked(self, item):
         if item.text() == "Задачи":
@@ -900,13 +1620,23 @@ class MainWindow(QMainWindow):
 
     def on_search_text_changed(self, text):
         query = text.strip()
+        if query == self.current_search_query:
+            return
+        self.current_search_query = query
         if query:
             self.center_title_label.setText(f'Результаты поиска: "{query}"')
-            self.refresh_task_list(animated=True, tasks_list=self.db.search_tasks(query))
+            self.search_pipeline.set_query(query)
         else:
             self.center_title_label.setText(self.current_title)
+            self.search_pipeline.reset()
             self.refresh_task_list(animated=True)
 
+    def show_search_results(self, query, rows, complete):
+        if query != self.current_search_query:
+            return
+        fetch_page = lambda after, limit: self.db.search_tasks_page(query, after=after, limit=limit)
+        self.task_list_model.set_source(fetch_page, rows, exhausted=complete, source_key=('search', query))
+
     def on_new_item_button_clicked(self):
         if self.main_nav_list.currentItem().text() == "Задачи":
             menu = QMenu(self)
@@ -920,8 +1650,67 @@ class MainWindow(QMainWindow):
         menu = QMenu(self)
         menu.addAction("О приложении", self.show_about_dialog)
         menu.addAction("Настройки интерфейса", self.show_settings_dialog)
+        menu.addAction("Диагностика", self.show_diagnostics_dialog)
+        menu.addSeparator()
+        transfer_menu = menu.addMenu("Импорт и экспорт")
+        transfer_menu.addAction("Импорт задач...", lambda: self.import_data('tasks'))
+        transfer_menu.addAction("Импорт заметок...", lambda: self.import_data('notes'))
+        transfer_menu.addSeparator()
+        transfer_menu.addAction("Экспорт задач...", lambda: self.export_data('tasks'))
+        transfer_menu.addAction("Экспорт заметок...", lambda: self.export_data('notes'))
         menu.exec(self.settings_button.mapToGlobal(QPoint(0, self.settings_button.height())))
 
+    def import_data(self, kind):
+        title = "Импорт задач" if kind == 'tasks' else "Импорт заметок"
+        file_path, _ = QFileDialog.getOpenFileName(self, title, "", FILE_FILTER)
+        if file_path:
+            self.run_transfer(title, import_file, self.db, file_path, kind, on_result=self.on_import_finished)
+
+    def export_data(self, kind):
+        title, default_filename = ("Экспорт задач", "Задачи.xlsx") if kind == 'tasks' else ("Экспорт заметок", "Заметки.xlsx")
+        file_path, _ = QFileDialog.getSaveFileName(self, title, default_filename, FILE_FILTER)
+        if file_path:
+            self.run_transfer(title, export_file, self.db, file_path, kind,
+                              on_result=lambda count: QMessageBox.information(
+                                  self, "Успех", f"Выгружено записей: {count}\nФайл: {file_path}"))
+
+    def run_transfer(self, title, fn, *args, on_result):
+        """Выполняет импорт или экспорт в фоне; окно прогресса позволяет его прервать."""
+        progress = TransferProgress(self)
+        dialog = QProgressDialog(title, "Отмена", 0, 0, self)
+        dialog.setWindowTitle(title)
+        dialog.setWindowModality(Qt.WindowModality.WindowModal)
+        dialog.setMinimumDuration(300)
+        progress.progressed.connect(lambda count: dialog.setLabelText(f"{title}\nОбработано записей: {count}"))
+        # Операция проверяет флаг между пачками строк и откатывает транзакцию
+        dialog.canceled.connect(progress.cancel)
+
+        def finish(callback, value):
+            dialog.reset()
+            dialog.deleteLater()
+            progress.deleteLater()
+            callback(value)
+
+        def failed(error):
+            if isinstance(error, TransferCancelled):
+                return
+            QMessageBox.critical(self, "Ошибка", f"{title}: операция не выполнена.\nОшибка: {error}")
+
+        self.db_executor.submit(fn, *args, progress=progress, key="transfer",
+                                on_result=lambda result: finish(on_result, result),
+                                on_error=lambda error: finish(failed, error))
+
+    def on_import_finished(self, result):
+        text = f"Добавлено записей: {result['imported']}"
+        if result['skipped']:
+            text += f"\nПропущено строк с ошибками: {result['skipped']}"
+        msg_box = QMessageBox(QMessageBox.Icon.Information, "Импорт завершен", text, parent=self)
+        if result['errors']:
+            msg_box.setDetailedText("\n".join(f"Строка {line}: {message}" for line, message in result['errors']))
+        msg_box.exec()
+        if result['imported']:
+            self.refresh_all_views()
+
     def show_about_dialog(self):
         dialog = AboutDialog(self)
         dialog.exec()
@@ -929,11 +1718,19 @@ class MainWindow(QMainWindow):
     def show_settings_dialog(self):
         dialog = SettingsDialog(self)
         dialog.exec()
+
+    def show_diagnostics_dialog(self):
+        dialog = DiagnosticsDialog(self.instrumentation, self)
+        dialog.exec()
     
     def theme_has_changed(self):
         self.update_icons()
         self.settings_button.setIcon(self.icons.get("settings"))
-        self.refresh_all_views()
+        self.task_delegate.set_theme(load_theme_setting())
+        for row in range(self.tags_list.count()):
+            self.tags_list.itemWidget(self.tags_list.item(row)).findChild(QLabel, "TagIcon").setPixmap(self.tag_pixmap)
+        # Данные не меняются: строки задач достаточно перерисовать в цветах новой темы
+        self.task_list_view.viewport().update()
         
     def show_add_task_dialog(self, high_priority=False):
         dialog = AddTaskDialog(self)
@@ -942,128 +1739,184 @@ class MainWindow(QMainWindow):
         if dialog.exec():
             task_data = dialog.get_task_data()
             if task_data['title']:
-                self.db.add_task(**task_data)
-                self.refresh_main_views(animated=True)
+                self.db_executor.submit(self.db.add_task, **task_data,
+                                        on_result=lambda task_id: self.refresh_changed_task(task_id, None, task_data),
+                                        on_error=self.show_db_error)
                 
     def show_edit_task_dialog(self, task_id):
-        task_data = self.db.get_task_by_id(task_id)
+        def load_task():
+            return self.db.get_task_by_id(task_id), self.db.get_reminders_for_task(task_id)
+        self.db_executor.submit(load_task, key="edit_task", on_result=lambda result: self.open_edit_task_dialog(task_id, *result))
+
+    def open_edit_task_dialog(self, task_id, task_data, reminders):
         if not task_data: return
-        reminders = self.db.get_reminders_for_task(task_id)
         dialog = EditTaskDialog(task_data, reminders, self)
         if dialog.exec():
             new_data = dialog.get_task_data()
             if new_data['title']:
-                self.db.update_task(task_id, new_data)
-                self.db.replace_all_reminders_for_task(task_id, dialog.get_reminders_data())
-                self.refresh_main_views(animated=True)
+                reminders_data = dialog.get_reminders_data()
+                def save_task():
+                    with self.db.transaction():
+                        self.db.update_task(task_id, new_data)
+                        return self.db.replace_all_reminders_for_task(task_id, reminders_data)
+                def on_saved(reminders):
+                    self.reminder_scheduler.set_task_reminders(task_id, new_data['title'], reminders,
+                                                               active=new_data['status'] != 'Завершено')
+                    self.refresh_changed_task(task_id, task_data, new_data)
+                self.db_executor.submit(save_task, on_result=on_saved, on_error=self.show_db_error)
+
+    def selected_task_ids(self):
+        return [index.data(TaskListModel.TaskIdRole) for index in self.task_list_view.selectionModel().selectedRows()]
+
+    def show_task_context_menu(self, pos):
+        index = self.task_list_view.indexAt(pos)
+        if not index.isValid():
+            return
+        selection = self.task_list_view.selectionModel()
+        if not selection.isSelected(index):
+            selection.select(index, QItemSelectionModel.SelectionFlag.ClearAndSelect)
+        task_ids = self.selected_task_ids()
+
+        menu = QMenu(self)
+        if len(task_ids) == 1:
+            menu.addAction("Редактировать...", lambda: self.show_edit_task_dialog(task_ids[0]))
+            menu.addSeparator()
+        status_menu = menu.addMenu("Статус")
+        for status in STATUSES:
+            status_menu.addAction(status, lambda status=status: self.apply_task_batch(TaskBatch().update(task_ids, status=status)))
+        priority_menu = menu.addMenu("Приоритет")
+        for priority, name in sorted(PRIORITIES.items(), reverse=True):
+            priority_menu.addAction(name, lambda priority=priority: self.apply_task_batch(TaskBatch().update(task_ids, priority=priority)))
+        menu.addAction("Срок выполнения...", lambda: self.edit_tasks_due_date(task_ids))
+        menu.addAction("Добавить теги...", lambda: self.edit_tasks_tags(task_ids, add=True))
+        menu.addAction("Убрать теги...", lambda: self.edit_tasks_tags(task_ids, add=False))
+        menu.addSeparator()
+        menu.addAction("Удалить" if len(task_ids) == 1 else f"Удалить ({len(task_ids)})", lambda: self.delete_tasks(task_ids))
+        menu.exec(self.task_list_view.viewport().mapToGlobal(pos))
+
+    def edit_tasks_due_date(self, task_ids):
+        dialog = DueDateDialog(len(task_ids), self)
+        if dialog.exec():
+            self.apply_task_batch(TaskBatch().update(task_ids, due_date=dialog.get_due_date()))
+
+    def edit_tasks_tags(self, task_ids, add):
+        title = "Добавить теги" if add else "Убрать теги"
+        tags, accepted = QInputDialog.getText(self, title, "Теги (через запятую):")
+        if accepted and tags.strip():
+            batch = TaskBatch()
+            self.apply_task_batch(batch.add_tags(task_ids, tags) if add else batch.remove_tags(task_ids, tags))
+
+    def delete_tasks(self, task_ids):
+        if not task_ids:
+            return
+        answer = QMessageBox.question(self, "Удаление задач", f"Удалить выбранные задачи ({len(task_ids)}) вместе с напоминаниями?")
+        if answer == QMessageBox.StandardButton.Yes:
+            self.apply_task_batch(TaskBatch().delete(task_ids))
+
+    def apply_task_batch(self, batch):
+        """Изменения выбранных задач одной транзакцией; в списке обновляются только их строки."""
+        task_ids = batch.task_ids()
+        def on_applied(_):
+            self.reminder_scheduler.invalidate()
+            self.refresh_tags_list()
+            self.refresh_completed_list()
+            if not self.task_list_model.refresh_rows(task_ids):
+                self.refresh_task_list()
+        self.db_executor.submit(self.db.apply_task_batch, batch, on_result=on_applied, on_error=self.show_db_error)
+
+    def show_db_error(self, error):
+        QMessageBox.critical(self, "Ошибка", f"Не удалось выполнить запрос к базе данных.\nОшибка: {error}")
     
     def open_note_in_editor(self, item):
-        self.current_note_id = item.data(Qt.ItemDataRole.UserRole) if item else None
-        
-        self.note_title_edit.setReadOnly(False)
-        self.note_content_edit.setReadOnly(False)
-        self.save_note_button.show()
-        self.markdown_toolbar.show()
-
-        if self.current_note_id:
-            note_data = self.db.get_note_by_id(self.current_note_id)
-            if note_data:
-                self.note_title_edit.setText(note_data.get('title', ''))
-                self.note_content_edit.setPlainText(note_data.get('content', ''))
-                
-                is_welcome_note = note_data.get('title') == WELCOME_NOTE_TITLE
-                self.note_title_edit.setReadOnly(is_welcome_note)
-                self.note_content_edit.setReadOnly(is_welcome_note)
-                self.save_note_button.setVisible(not is_welcome_note)
-                self.markdown_toolbar.setVisible(not is_welcome_note)
-                
-                self.delete_note_button.setDisabled(is_welcome_note)
-                self.delete_note_button.setToolTip("Эту заметку нельзя удалить" if is_welcome_note else "")
-                self.delete_note_button.setVisible(True)
-                
-                self.note_content_edit.textChanged.connect(self.update_markdown_preview)
-                self.update_markdown_preview()
-            else:
-                QMessageBox.warning(self, "Ошибка", "Заметка не найдена. Возможно, она была удалена.")
-                self.close_note_editor()
-                self.refresh_notes_list()
+        note_id = item.data(Qt.ItemDataRole.UserRole) if item else None
+        if note_id:
+            self.note_repository.get(note_id, lambda note_data: self.show_note_in_editor(note_id, note_data))
+        else:
+            self.show_note_in_editor(None, None)
+
+    def show_note_in_editor(self, note_id, note_data):
+        if note_id and not note_data:
+            QMessageBox.warning(self, "Ошибка", "Заметка не найдена. Возможно, она была удалена.")
+            self.close_note_editor()
+            self.refresh_notes_list()
+            return
+        is_welcome_note = bool(note_data) and note_data.get('title') == WELCOME_NOTE_TITLE
+        self.note_editor.open(note_id, note_data, read_only=is_welcome_note)
+
+        self.note_title_edit.setReadOnly(is_welcome_note)
+        self.note_content_edit.setReadOnly(is_welcome_note)
+        self.save_note_button.setVisible(not is_welcome_note)
+        self.markdown_toolbar.setVisible(not is_welcome_note)
+        if note_id:
+            self.delete_note_button.setDisabled(is_welcome_note)
+            self.delete_note_button.setToolTip("Эту заметку нельзя удалить" if is_welcome_note else "")
+            self.delete_note_button.setVisible(True)
         else:
-            self.note_title_edit.clear()
-            self.note_content_edit.clear()
             self.note_title_edit.setPlaceholderText("Новая заметка...")
             self.delete_note_button.hide()
-            self.note_content_edit.textChanged.connect(self.update_markdown_preview)
-            self.update_markdown_preview()
         
         self.center_stack.setCurrentWidget(self.editor_widget)
         self.right_stack.setCurrentIndex(1)
 
     def save_current_note(self):
-        title = self.note_title_edit.text().strip()
-        if not title:
+        if not self.note_title_edit.text().strip():
             QMessageBox.warning(self, "Ошибка", "Заголовок заметки не может быть пустым.")
             return
-        
-        content = self.note_content_edit.toPlainText()
-        
-        if self.current_note_id:
-            self.db.update_note(self.current_note_id, title, content)
-        else:
-            self.current_note_id = self.db.add_note(title, content)
-        
-        self.refresh_notes_list()
+        if self.note_editor.save():
+            self.save_note_button.setEnabled(False)
+
+    def on_note_saved(self, note_id, created):
+        self.save_note_button.setEnabled(True)
+        self.refresh_notes_rows([note_id])
+
+    def on_note_save_failed(self, error):
+        self.save_note_button.setEnabled(True)
+        self.show_db_error(error)
 
     def close_note_editor(self):
-        try:
-            self.note_content_edit.textChanged.disconnect(self.update_markdown_preview)
-        except TypeError:
-            pass
-        self.markdown_preview.clear()
+        self.note_editor.close()
         self.center_stack.setCurrentWidget(self.view_widget)
-        self.current_note_id = None
         self.right_stack.setCurrentIndex(0)
 
     def delete_current_note(self):
-        if not self.current_note_id: return
+        note_id = self.note_editor.note_id
+        if not note_id: return
         reply = QMessageBox.question(self, "Подтверждение", "Вы уверены, что хотите удалить эту заметку?", QMessageBox.StandardButton.Yes | QMessageBox.StandardButton.No, QMessageBox.StandardButton.No)
         if reply == QMessageBox.StandardButton.Yes:
-            self.db.delete_note(self.current_note_id)
-            self.refresh_notes_list()
+            self.note_editor.close(save=False)
             self.close_note_editor()
-
-    def check_for_reminders(self):
-        now_iso = datetime.datetime.now().isoformat()
-        due_reminders = self.db.get_due_reminders(now_iso)
-        for reminder in due_reminders:
-            msg_box = QMessageBox(self)
-            msg_box.setIcon(QMessageBox.Icon.Information)
-            msg_box.setWindowTitle("Напоминание о задаче")
-            dt = QDateTime.fromString(reminder['reminder_datetime'], Qt.DateFormat.ISODate)
-            msg_box.setText(f"<b>{reminder['title']}</b>")
-            msg_box.setInformativeText(f"Время выполнить задачу! (Напоминание на {dt.toString('HH:mm')})")
-            msg_box.setStandardButtons(QMessageBox.StandardButton.Ok)
-            msg_box.exec()
-            self.db.delete_reminder(reminder['reminder_id'])
-
-    def _generate_report_summary(self, tasks):
-        total_tasks = len(tasks)
-        if total_tasks == 0:
-            return {"stats": {}}
-
-        completed_tasks = sum(1 for task in tasks if task['status'] == 'Завершено')
-        completion_percentage = (completed_tasks / total_tasks * 100) if total_tasks > 0 else 0
-        priority_counts = Counter(task['priority'] for task in tasks)
-        tag_counts = Counter(tag.strip() for task in tasks if task.get('tags') for tag in task['tags'].split(',') if tag.strip())
-
-        stats = {
-            "total": total_tasks,
-            "completed": completed_tasks,
-            "percentage": completion_percentage,
-            "priorities": priority_counts,
-            "tags": tag_counts
-        }
-        
-        return {"stats": stats}
+            self.note_repository.discard(note_id)
+            self.db_executor.submit(self.db.delete_note, note_id,
+                                    on_result=lambda _: self.refresh_notes_rows([note_id]), on_error=self.show_db_error)
+
+    def show_due_reminders(self, due_reminders):
+        # Одно немодальное окно на все сработавшие напоминания; новые дописываются в него
+        self.shown_reminders += due_reminders
+        if self.reminder_box is None:
+            self.reminder_box = QMessageBox(self)
+            self.reminder_box.setIcon(QMessageBox.Icon.Information)
+            self.reminder_box.setStandardButtons(QMessageBox.StandardButton.Ok)
+            self.reminder_box.setModal(False)
+            self.reminder_box.finished.connect(self.on_reminders_dismissed)
+        if len(self.shown_reminders) == 1:
+            reminder = self.shown_reminders[0]
+            reminder_time = reminder['reminder_datetime'].astimezone().strftime('%H:%M')
+            self.reminder_box.setWindowTitle("Напоминание о задаче")
+            self.reminder_box.setText(f"<b>{reminder['title']}</b>")
+            self.reminder_box.setInformativeText(f"Время выполнить задачу! (Напоминание на {reminder_time})")
+        else:
+            lines = [f"{reminder['reminder_datetime'].astimezone().strftime('%H:%M')} — {reminder['title']}"
+                     for reminder in self.shown_reminders]
+            self.reminder_box.setWindowTitle("Напоминания о задачах")
+            self.reminder_box.setText(f"<b>Время выполнить задачи ({len(self.shown_reminders)})</b>")
+            self.reminder_box.setInformativeText("\n".join(lines))
+        self.reminder_box.show()
+
+    def on_reminders_dismissed(self):
+        self.reminder_scheduler.acknowledge(reminder['reminder_id'] for reminder in self.shown_reminders)
+        self.shown_reminders = []
+        self.reminder_box.deleteLater()
+        self.reminder_box = None
 
     def show_report_dialog(self):
         dialog = ReportDialog(self)
@@ -1073,117 +1926,47 @@ class MainWindow(QMainWindow):
             start_date = settings["start_date"] if settings["use_date_range"] else None
             end_date = settings["end_date"] if settings["use_date_range"] else None
 
-            report_tasks = self.db.get_tasks(
+            query_args = dict(
                 filter_by=settings["filter_by"],
-                sort_by=settings["sort_by"],
                 start_date=start_date,
                 end_date=end_date
             )
-            
-            if not report_tasks:
-                QMessageBox.information(self, "Нет данных", "Задачи для отчета не найдены по выбранным критериям.")
-                return
-
-            summary = self._generate_report_summary(report_tasks)
-            
-            filter_name = dialog.filter_combo.currentText()
-            default_filename = f"Отчет - {filter_name}"
+            default_filename = f"Отчет - {dialog.filter_combo.currentText()}"
             if settings["use_date_range"]:
                 default_filename += f" ({settings['start_date']} - {settings['end_date']})"
-
-            filters = "Excel Files (*.xlsx)"
-            filePath, _ = QFileDialog.getSaveFileName(self, "Сохранить отчет", default_filename, filters)
-            
-            if filePath:
-                self.save_report_as_excel(report_tasks, summary["stats"], filePath)
-            
-    def save_report_as_excel(self, tasks, summary_stats, file_path):
-        if not OPENPYXL_AVAILABLE:
-            QMessageBox.critical(self, "Ошибка", "Для экспорта в Excel необходимо установить библиотеку openpyxl.\nВыполните: pip install openpyxl")
+            # Сводку считает сервер, строки задач для нее не загружаются
+            self.db_executor.submit(self.db.get_report_summary, **query_args, key="report_summary",
+                                    on_result=lambda stats: self.save_report(settings, query_args, stats, default_filename),
+                                    on_error=self.show_db_error)
+
+    def save_report(self, settings, query_args, summary_stats, default_filename):
+        if not summary_stats:
+            QMessageBox.information(self, "Нет данных", "Задачи для отчета не найдены по выбранным критериям.")
             return
-            
-        workbook = openpyxl.Workbook()
-        sheet = workbook.active
-        sheet.title = f"Отчет по задачам"
-        
-        bold_font = Font(bold=True)
-        
-        start_row = 1
-        sheet.cell(row=start_row, column=1, value="Сводная статистика").font = bold_font
-        sheet.merge_cells(start_row=start_row, start_column=1, end_row=start_row, end_column=4)
-        start_row += 1
-        
-        sheet.cell(row=start_row, column=1, value="Всего задач:")
-        sheet.cell(row=start_row, column=2, value=summary_stats.get('total'))
-        start_row += 1
-        
-        sheet.cell(row=start_row, column=1, value="Завершено:")
-        sheet.cell(row=start_row, column=2, value=f"{summary_stats.get('completed')} ({summary_stats.get('percentage', 0):.1f}%)")
-        start_row += 1
-        
-        sheet.cell(row=start_row, column=1, value="По приоритетам:").font = bold_font
-        start_row +=1
-        for prio_id, count in sorted(summary_stats.get('priorities', {}).items(), key=lambda item: item[0], reverse=True):
-            sheet.cell(row=start_row, column=2, value=f"{PRIORITIES.get(prio_id, 'Н/Д')}: {count}")
-            start_row += 1
-            
-        sheet.cell(row=start_row, column=1, value="По тегам:").font = bold_font
-        start_row += 1
-        tag_counts = summary_stats.get('tags')
-        if tag_counts:
-            for tag, count in tag_counts.most_common():
-                sheet.cell(row=start_row, column=2, value=f"{tag}: {count}")
-                start_row += 1
-        else:
-             sheet.cell(row=start_row, column=2, value="Нет")
-             start_row += 1
-
-        start_row += 1 
-        headers = ["Задача", "Статус", "Приоритет", "Срок выполнения", "Детали", "Теги"]
-        for col_num, header_title in enumerate(headers, 1):
-            cell = sheet.cell(row=start_row, column=col_num, value=header_title)
-            cell.font = bold_font
-            cell.alignment = Alignment(horizontal='center', vertical='center')
-        
-        for task in tasks:
-            start_row += 1
-            priority_text = PRIORITIES.get(task.get('priority', 0), "Нет")
-            due_date = QDate.fromString(task['due_date'], 'yyyy-MM-dd').toString('dd.MM.yyyy') if task.get('due_date') else ""
-            sheet.cell(row=start_row, column=1, value=task.get('title', ''))
-            sheet.cell(row=start_row, column=2, value=task.get('status', ''))
-            sheet.cell(row=start_row, column=3, value=priority_text)
-            sheet.cell(row=start_row, column=4, value=due_date)
-            sheet.cell(row=start_row, column=5, value=task.get('details', ''))
-            sheet.cell(row=start_row, column=6, value=task.get('tags', ''))
-            
-        for col_num in range(1, len(headers) + 1):
-            column_letter = get_column_letter(col_num)
-            max_length = 0
-            for cell in sheet[column_letter]:
-                try:
-                    if len(str(cell.value)) > max_length:
-                        max_length = len(str(cell.value))
-                except:
-                    pass
-            adjusted_width = (max_length + 2) * 1.2
-            sheet.column_dimensions[column_letter].width = min(adjusted_width, 70)
 
-        try:
-            workbook.save(file_path)
-            QMessageBox.information(self, "Успех", f"Отчет успешно сохранен в файл:\n{file_path}")
-        except Exception as e:
-            QMessageBox.critical(self, "Ошибка", f"Не удалось сохранить файл отчета.\nОшибка: {e}")
-
-    def update_markdown_preview(self):
-        if not MARKDOWN_AVAILABLE:
-            self.markdown_preview.setText("<b>Ошибка:</b> Библиотека <code>markdown</code> не найдена.<br>Установите ее командой: <code>pip install markdown</code>")
-            return
-        
-        markdown_text = self.note_content_edit.toPlainText()
-        html = markdown.markdown(markdown_text, extensions=['fenced_code', 'tables', 'sane_lists'])
-        self.markdown_preview.setHtml(html)
+        filters = "Excel Files (*.xlsx)"
+        filePath, _ = QFileDialog.getSaveFileName(self, "Сохранить отчет", default_filename, filters)
+
+        if filePath:
+            self.save_report_as_excel(None if settings["summary_only"] else dict(query_args, sort_by=settings["sort_by"]),
+                                      summary_stats, filePath)
+
+    def save_report_as_excel(self, query_args, summary_stats, file_path):
+        """query_args - выборка задач для таблицы отчета; None - только сводка."""
+        # Задачи читаются из серверного курсора и пишутся в файл в фоновом потоке
+        def write_report(progress):
+            tasks = self.db.stream_tasks(**query_args, columns=REPORT_COLUMNS) if query_args is not None else None
+            return write_task_report(file_path, summary_stats, tasks, progress=progress)
+        self.run_transfer("Сохранение отчета", write_report,
+                          on_result=lambda count: QMessageBox.information(
+                              self, "Успех", f"Отчет успешно сохранен в файл:\n{file_path}"))
 
     def closeEvent(self, event):
+        self.reminder_scheduler.stop()
+        self.change_feed.stop()
+        self.note_editor.close()
+        self.preview_engine.shutdown()
+        self.db_executor.shutdown()
         self.db.close()
         super().closeEvent(event)
 
@@ -0,0 +1,175 @@
+# markdown_preview.py
+"""
+Предпросмотр Markdown для редактора заметок.
+
+Текст делится на блоки (абзацы, списки, блоки кода), и HTML каждого блока
+хранится в кэше, поэтому после правки заново преобразуется только
+измененный блок. Правки, сделанные подряд, объединяются в одну отрисовку,
+а сама отрисовка идет в отдельном потоке.
+"""
+
+import re
+from collections import OrderedDict
+from PyQt6.QtCore import QObject, QThreadPool, QTimer, pyqtSignal
+
+try:
+    import markdown
+    MARKDOWN_AVAILABLE = True
+except ImportError:
+    MARKDOWN_AVAILABLE = False
+
+MARKDOWN_EXTENSIONS = ['fenced_code', 'tables', 'sane_lists']
+MISSING_MARKDOWN_HTML = ("<b>Ошибка:</b> Библиотека <code>markdown</code> не найдена.<br>"
+                         "Установите ее командой: <code>pip install markdown</code>")
+
+_FENCE = re.compile(r'^ {0,3}(`{3,}|~{3,})')
+_LIST_ITEM = re.compile(r'^ {0,3}([*+-]|\d+[.)])\s')
+_QUOTE = re.compile(r'^ {0,3}>')
+# Определения ссылок вида [id]: url действуют во всем документе
+_REFERENCE = re.compile(r'^ {0,3}\[[^\]]+\]:\s*\S')
+
+
+def split_blocks(text):
+    """
+    Делит текст Markdown на блоки, которые можно преобразовать в HTML независимо друг
+    от друга. Граница блока - пустая строка; блок кода в ``` не делится, а строки с
+    отступом и пункты списка после пустой строки остаются в блоке списка. Строки
+    цитаты после пустой строки продолжают цитату блока: markdown объединяет их в одну.
+    Возвращает (блоки, определения ссылок).
+    """
+    blocks, references = [], []
+    current, fence, after_blank, quoted = [], None, False, False
+    for line in text.split('\n'):
+        if fence:
+            current.append(line)
+            if line.strip().startswith(fence) and not line.strip().strip(fence[0]):
+                fence = None
+            continue
+        if not line.strip():
+            after_blank = bool(current)
+            continue
+        if _REFERENCE.match(line):
+            references.append(line)
+            continue
+        continues_block = (line[0] in ' \t' or
+                           (_LIST_ITEM.match(line) and current and _LIST_ITEM.match(current[0])) or
+                           (_QUOTE.match(line) and quoted))
+        if after_blank and not continues_block:
+            blocks.append('\n'.join(current))
+            current, quoted = [], False
+        elif after_blank:
+            current.append('')
+        current.append(line)
+        quoted = quoted or bool(_QUOTE.match(line))
+        after_blank = False
+        if match := _FENCE.match(line):
+            fence = match.group(1)
+    if current:
+        blocks.append('\n'.join(current))
+    return blocks, '\n'.join(references)
+
+
+class MarkdownRenderer:
+    """Преобразует Markdown в HTML по блокам с LRU-кэшем HTML блоков. Не потокобезопасен."""
+    MAX_CACHED_BLOCKS = 2000
+
+    def __init__(self):
+        self._markdown = markdown.Markdown(extensions=MARKDOWN_EXTENSIONS)
+        self._blocks = OrderedDict()
+        self.rendered_blocks = 0
+
+    def render(self, text):
+        blocks, references = split_blocks(text)
+        return '\n'.join(self._render_block(f"{block}\n\n{references}" if references else block)
+                         for block in blocks)
+
+    def _render_block(self, source):
+        html = self._blocks.get(source)
+        if html is not None:
+            self._blocks.move_to_end(source)
+            return html
+        html = self._markdown.reset().convert(source)
+        self.rendered_blocks += 1
+        self._blocks[source] = html
+        if len(self._blocks) > self.MAX_CACHED_BLOCKS:
+            self._blocks.popitem(last=False)
+        return html
+
+
+class MarkdownPreview(QObject):
+    """
+    Показывает текст редактора text_edit как HTML в browser. schedule() вызывается
+    при каждой правке: отрисовка начнется через RENDER_DELAY_MS после последней из них.
+    В потоке отрисовки одновременно не больше одного задания; текст, измененный во
+    время отрисовки, отрисовывается следующим. Положение прокрутки сохраняется.
+    """
+    RENDER_DELAY_MS = 120
+    rendered = pyqtSignal(int, str)
+
+    def __init__(self, text_edit, browser, parent=None):
+        super().__init__(parent)
+        self.text_edit = text_edit
+        self.browser = browser
+        self.renderer = MarkdownRenderer() if MARKDOWN_AVAILABLE else None
+        self.thread_pool = QThreadPool(self)
+        self.thread_pool.setMaxThreadCount(1)
+        self.timer = QTimer(self)
+        self.timer.setSingleShot(True)
+        self.timer.setInterval(self.RENDER_DELAY_MS)
+        self.timer.timeout.connect(self.render_now)
+        # Номер текста растет с каждым запросом отрисовки; устаревший HTML не показывается
+        self._generation = 0
+        self._busy = False
+        self._pending = None
+        self._html = None
+        self.rendered.connect(self._on_rendered)
+
+    def schedule(self):
+        self.timer.start()
+
+    def render_now(self):
+        self.timer.stop()
+        if self.renderer is None:
+            self.browser.setHtml(MISSING_MARKDOWN_HTML)
+            return
+        self._generation += 1
+        self._pending = (self._generation, self.text_edit.toPlainText())
+        if not self._busy:
+            self._start_pending()
+
+    def clear(self):
+        self.timer.stop()
+        self._generation += 1
+        self._pending = None
+        self._html = None
+        self.browser.clear()
+
+    def shutdown(self, timeout_ms=3000):
+        self.clear()
+        self.thread_pool.waitForDone(timeout_ms)
+
+    def _start_pending(self):
+        generation, text = self._pending
+        self._pending = None
+        self._busy = True
+        self.thread_pool.start(lambda: self._render(generation, text))
+
+    def _render(self, generation, text):
+        try:
+            html = self.renderer.render(text)
+        except Exception as e:
+            html = f"<b>Ошибка предпросмотра:</b> {e}"
+        self.rendered.emit(generation, html)
+
+    def _on_rendered(self, generation, html):
+        self._busy = False
+        if self._pending is not None:
+            self._start_pending()
+            return
+        if generation != self._generation or html == self._html:
+            return
+        self._html = html
+        scroll_bar = self.browser.verticalScrollBar()
+        position = scroll_bar.value()
+        self.browser.setHtml(html)
+        scroll_bar.setValue(min(position, scroll_bar.maximum()))
@@ -0,0 +1,384 @@
+# migrations.py
+
+import datetime
+import psycopg2
+
+# Произвольный ключ advisory-блокировки: два клиента, запущенные одновременно,
+# применяют миграции по очереди.
+MIGRATIONS_LOCK_KEY = 0x44656E6B
+# Канал LISTEN/NOTIFY, в который триггеры сообщают об изменении строк
+CHANGES_CHANNEL = "denkwurfel_changes"
+# Параметр транзакции: при значении 'on' триггеры не уведомляют о каждой строке
+# (массовые изменения, см. DatabaseManager.bulk_changes)
+BULK_CHANGES_SETTING = "denkwurfel.bulk_changes"
+
+
+def _create_base_tables(cursor):
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS tasks (
+            id SERIAL PRIMARY KEY,
+            title TEXT NOT NULL,
+            details TEXT,
+            tags TEXT,
+            due_date TEXT,
+            status VARCHAR(20) DEFAULT 'К выполнению' NOT NULL,
+            priority INTEGER DEFAULT 0 NOT NULL,
+            created_at TEXT NOT NULL
+        )
+    ''')
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS reminders (
+            id SERIAL PRIMARY KEY,
+            task_id INTEGER NOT NULL,
+            reminder_datetime TEXT NOT NULL,
+            FOREIGN KEY (task_id) REFERENCES tasks(id) ON DELETE CASCADE
+        )
+    ''')
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS notes (
+            id SERIAL PRIMARY KEY,
+            title TEXT NOT NULL,
+            content TEXT,
+            created_at TEXT NOT NULL,
+            updated_at TEXT NOT NULL
+        )
+    ''')
+
+
+def _create_tag_tables(cursor):
+    """
+    Нормализованное хранение тегов: tags + task_tags. Поле tasks.tags остается
+    строкой для отображения, а tags.active_count (число незавершенных задач
+    с тегом) поддерживается триггерами.
+    """
+    cursor.execute("SELECT to_regclass('task_tags') IS NULL AS is_new")
+    is_new = cursor.fetchone()['is_new']
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS tags (
+            id SERIAL PRIMARY KEY,
+            name TEXT NOT NULL UNIQUE,
+            active_count INTEGER DEFAULT 0 NOT NULL
+        )
+    ''')
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS task_tags (
+            task_id INTEGER NOT NULL REFERENCES tasks(id) ON DELETE CASCADE,
+            tag_id INTEGER NOT NULL REFERENCES tags(id) ON DELETE CASCADE,
+            PRIMARY KEY (task_id, tag_id)
+        )
+    ''')
+    cursor.execute("CREATE INDEX IF NOT EXISTS task_tags_tag_id_idx ON task_tags (tag_id, task_id)")
+    cursor.execute('''
+        CREATE OR REPLACE FUNCTION task_tags_update_count() RETURNS trigger AS $$
+        BEGIN
+            IF TG_OP = 'INSERT' THEN
+                UPDATE tags SET active_count = active_count + 1
+                WHERE id = NEW.tag_id
+                  AND EXISTS (SELECT 1 FROM tasks WHERE id = NEW.task_id AND status != 'Завершено');
+                RETURN NEW;
+            END IF;
+            UPDATE tags SET active_count = active_count - 1
+            WHERE id = OLD.tag_id
+              AND EXISTS (SELECT 1 FROM tasks WHERE id = OLD.task_id AND status != 'Завершено');
+            RETURN OLD;
+        END
+        $$ LANGUAGE plpgsql
+    ''')
+    cursor.execute('''
+        CREATE OR REPLACE FUNCTION tasks_update_tag_counts() RETURNS trigger AS $$
+        BEGIN
+            IF TG_OP = 'DELETE' THEN
+                -- Связи удаляются до самой задачи, пока триггер task_tags еще видит ее статус
+                DELETE FROM task_tags WHERE task_id = OLD.id;
+                RETURN OLD;
+            END IF;
+            IF (OLD.status = 'Завершено') != (NEW.status = 'Завершено') THEN
+                UPDATE tags SET active_count = active_count + CASE WHEN NEW.status = 'Завершено' THEN -1 ELSE 1 END
+                WHERE id IN (SELECT tag_id FROM task_tags WHERE task_id = NEW.id);
+            END IF;
+            RETURN NEW;
+        END
+        $$ LANGUAGE plpgsql
+    ''')
+    cursor.execute("DROP TRIGGER IF EXISTS task_tags_count_trigger ON task_tags")
+    cursor.execute('''
+        CREATE TRIGGER task_tags_count_trigger AFTER INSERT OR DELETE ON task_tags
+        FOR EACH ROW EXECUTE FUNCTION task_tags_update_count()
+    ''')
+    cursor.execute("DROP TRIGGER IF EXISTS tasks_tag_counts_delete_trigger ON tasks")
+    cursor.execute('''
+        CREATE TRIGGER tasks_tag_counts_delete_trigger BEFORE DELETE ON tasks
+        FOR EACH ROW EXECUTE FUNCTION tasks_update_tag_counts()
+    ''')
+    cursor.execute("DROP TRIGGER IF EXISTS tasks_tag_counts_status_trigger ON tasks")
+    cursor.execute('''
+        CREATE TRIGGER tasks_tag_counts_status_trigger AFTER UPDATE OF status ON tasks
+        FOR EACH ROW EXECUTE FUNCTION tasks_update_tag_counts()
+    ''')
+    if is_new:
+        # Перенос тегов из строкового поля tasks.tags; счетчики заполнит триггер
+        cursor.execute('''
+            INSERT INTO tags (name)
+            SELECT DISTINCT btrim(tag) FROM tasks, unnest(string_to_array(tasks.tags, ',')) AS tag
+            WHERE btrim(tag) != ''
+            ON CONFLICT (name) DO NOTHING
+        ''')
+        cursor.execute('''
+            INSERT INTO task_tags (task_id, tag_id)
+            SELECT DISTINCT tasks.id, tags.id
+            FROM tasks, unnest(string_to_array(tasks.tags, ',')) AS tag
+            JOIN tags ON tags.name = btrim(tag)
+            ON CONFLICT DO NOTHING
+        ''')
+
+
+def _create_search_indexes(cursor):
+    """Полнотекстовый поиск по задачам и заметкам (tsvector + GIN)."""
+    cursor.execute('''
+        ALTER TABLE tasks ADD COLUMN IF NOT EXISTS search_vector tsvector GENERATED ALWAYS AS (
+            setweight(to_tsvector('russian', coalesce(title, '')), 'A') ||
+            setweight(to_tsvector('simple', coalesce(tags, '')), 'B') ||
+            setweight(to_tsvector('russian', coalesce(details, '')), 'C')
+        ) STORED
+    ''')
+    cursor.execute('''
+        ALTER TABLE notes ADD COLUMN IF NOT EXISTS search_vector tsvector GENERATED ALWAYS AS (
+            setweight(to_tsvector('russian', coalesce(title, '')), 'A') ||
+            setweight(to_tsvector('russian', coalesce(content, '')), 'C')
+        ) STORED
+    ''')
+    cursor.execute("CREATE INDEX IF NOT EXISTS tasks_search_idx ON tasks USING GIN (search_vector)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS notes_search_idx ON notes USING GIN (search_vector)")
+
+
+def _typed_dates_and_sort_indexes(cursor):
+    """
+    Даты хранятся как date/timestamptz вместо ISO-строк. Индексы повторяют ключи
+    сортировки database.TASK_SORT_KEYS, частичные - для фильтров по статусу.
+    """
+    # ISO-строки без пояса записывались по местному времени клиента
+    utc_offset = datetime.datetime.now().astimezone().strftime('%z')
+    cursor.execute("SET LOCAL TIME ZONE INTERVAL %s HOUR TO MINUTE", (f"{utc_offset[:3]}:{utc_offset[3:]}",))
+    cursor.execute('''
+        ALTER TABLE tasks
+            ALTER COLUMN due_date TYPE date USING NULLIF(btrim(due_date), '')::date,
+            ALTER COLUMN created_at TYPE timestamptz USING created_at::timestamptz,
+            ALTER COLUMN created_at SET DEFAULT now()
+    ''')
+    cursor.execute('''
+        ALTER TABLE reminders
+            ALTER COLUMN reminder_datetime TYPE timestamptz USING reminder_datetime::timestamptz
+    ''')
+    cursor.execute('''
+        ALTER TABLE notes
+            ALTER COLUMN created_at TYPE timestamptz USING created_at::timestamptz,
+            ALTER COLUMN created_at SET DEFAULT now(),
+            ALTER COLUMN updated_at TYPE timestamptz USING updated_at::timestamptz,
+            ALTER COLUMN updated_at SET DEFAULT now()
+    ''')
+    indexes = {
+        # Сортировка "priority"; фильтр "important" (priority = 3) использует тот же индекс
+        'tasks_active_priority_idx':
+            "tasks (priority DESC, due_date ASC NULLS LAST, created_at DESC, id DESC) WHERE status != 'Завершено'",
+        'tasks_completed_priority_idx':
+            "tasks (priority DESC, due_date ASC NULLS LAST, created_at DESC, id DESC) WHERE status = 'Завершено'",
+        'tasks_active_due_date_idx':
+            "tasks (due_date ASC NULLS LAST, priority DESC, created_at DESC, id DESC) WHERE status != 'Завершено'",
+        'tasks_completed_due_date_idx':
+            "tasks (due_date ASC NULLS LAST, priority DESC, created_at DESC, id DESC) WHERE status = 'Завершено'",
+        'tasks_created_at_idx': "tasks (created_at DESC, id DESC)",
+        'tasks_title_idx': "tasks (title ASC, id ASC)",
+        # Фильтр по дате календаря и диапазон отчета
+        'tasks_due_date_idx': "tasks (due_date)",
+        'reminders_datetime_idx': "reminders (reminder_datetime)",
+        'reminders_task_id_idx': "reminders (task_id)",
+        'notes_updated_at_idx': "notes (updated_at DESC)",
+    }
+    for name, definition in indexes.items():
+        cursor.execute(f"CREATE INDEX IF NOT EXISTS {name} ON {definition}")
+    cursor.execute("ANALYZE tasks")
+    cursor.execute("ANALYZE reminders")
+
+
+def _change_notifications(cursor):
+    """
+    Триггеры уведомляют канал CHANGES_CHANNEL об изменении строк tasks, notes
+    и reminders. Полезная нагрузка - только идентификаторы: клиенты сами
+    перечитывают нужные строки. pid позволяет клиенту пропускать свои изменения.
+    """
+    cursor.execute(f'''
+        CREATE OR REPLACE FUNCTION notify_row_change() RETURNS trigger AS $$
+        DECLARE
+            rec RECORD;
+            payload jsonb;
+        BEGIN
+            IF TG_OP = 'DELETE' THEN rec := OLD; ELSE rec := NEW; END IF;
+            payload := jsonb_build_object('table', TG_TABLE_NAME, 'op', TG_OP, 'id', rec.id, 'pid', pg_backend_pid());
+            -- Дополнительная колонка строки (например, task_id у напоминаний)
+            IF TG_NARGS > 0 THEN
+                payload := payload || jsonb_build_object(TG_ARGV[0], to_jsonb(rec) -> TG_ARGV[0]);
+            END IF;
+            PERFORM pg_notify('{CHANGES_CHANNEL}', payload::text);
+            RETURN NULL;
+        END
+        $$ LANGUAGE plpgsql
+    ''')
+    for table, argument in (('tasks', ''), ('notes', ''), ('reminders', "'task_id'")):
+        cursor.execute(f"DROP TRIGGER IF EXISTS {table}_notify_trigger ON {table}")
+        cursor.execute(f'''
+            CREATE TRIGGER {table}_notify_trigger AFTER INSERT OR UPDATE OR DELETE ON {table}
+            FOR EACH ROW EXECUTE FUNCTION notify_row_change({argument})
+        ''')
+
+
+def _row_versions(cursor):
+    """
+    Версии строк для синхронизации локального кэша (local_cache.py).
+    version растет при каждом изменении строки и служит для обнаружения конфликтов,
+    sync_xid - транзакция последнего изменения, по ней выбираются изменения
+    после курсора клиента. Удаленные строки записываются в deleted_rows.
+    Тип xid8 требует PostgreSQL 13 или новее.
+    """
+    cursor.execute("ALTER TABLE tasks ADD COLUMN IF NOT EXISTS updated_at TIMESTAMPTZ DEFAULT now() NOT NULL")
+    for table in ('tasks', 'notes', 'reminders'):
+        cursor.execute(f'''
+            ALTER TABLE {table}
+                ADD COLUMN IF NOT EXISTS version INTEGER DEFAULT 1 NOT NULL,
+                ADD COLUMN IF NOT EXISTS sync_xid xid8 DEFAULT pg_current_xact_id() NOT NULL
+        ''')
+        cursor.execute(f"CREATE INDEX IF NOT EXISTS {table}_sync_xid_idx ON {table} (sync_xid)")
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS deleted_rows (
+            table_name TEXT NOT NULL,
+            row_id INTEGER NOT NULL,
+            sync_xid xid8 DEFAULT pg_current_xact_id() NOT NULL
+        )
+    ''')
+    cursor.execute("CREATE INDEX IF NOT EXISTS deleted_rows_sync_xid_idx ON deleted_rows (sync_xid)")
+    cursor.execute('''
+        CREATE OR REPLACE FUNCTION track_row_version() RETURNS trigger AS $$
+        BEGIN
+            NEW.sync_xid := pg_current_xact_id();
+            IF TG_OP = 'UPDATE' THEN
+                NEW.version := OLD.version + 1;
+                IF TG_TABLE_NAME = 'tasks' THEN
+                    NEW.updated_at := now();
+                END IF;
+            END IF;
+            RETURN NEW;
+        END
+        $$ LANGUAGE plpgsql
+    ''')
+    cursor.execute('''
+        CREATE OR REPLACE FUNCTION record_deleted_row() RETURNS trigger AS $$
+        BEGIN
+            INSERT INTO deleted_rows (table_name, row_id) VALUES (TG_TABLE_NAME, OLD.id);
+            RETURN NULL;
+        END
+        $$ LANGUAGE plpgsql
+    ''')
+    for table in ('tasks', 'notes', 'reminders'):
+        cursor.execute(f"DROP TRIGGER IF EXISTS {table}_version_trigger ON {table}")
+        cursor.execute(f'''
+            CREATE TRIGGER {table}_version_trigger BEFORE INSERT OR UPDATE ON {table}
+            FOR EACH ROW EXECUTE FUNCTION track_row_version()
+        ''')
+        cursor.execute(f"DROP TRIGGER IF EXISTS {table}_deleted_trigger ON {table}")
+        cursor.execute(f'''
+            CREATE TRIGGER {table}_deleted_trigger AFTER DELETE ON {table}
+            FOR EACH ROW EXECUTE FUNCTION record_deleted_row()
+        ''')
+
+
+def _bulk_change_notifications(cursor):
+    """
+    Уведомления о строках не отправляются в транзакциях с BULK_CHANGES_SETTING = 'on':
+    при импорте тысяч строк клиенты получают одно уведомление RESYNC вместо
+    уведомления на каждую строку.
+    """
+    cursor.execute(f'''
+        CREATE OR REPLACE FUNCTION notify_row_change() RETURNS trigger AS $$
+        DECLARE
+            rec RECORD;
+            payload jsonb;
+        BEGIN
+            IF current_setting('{BULK_CHANGES_SETTING}', true) = 'on' THEN
+                RETURN NULL;
+            END IF;
+            IF TG_OP = 'DELETE' THEN rec := OLD; ELSE rec := NEW; END IF;
+            payload := jsonb_build_object('table', TG_TABLE_NAME, 'op', TG_OP, 'id', rec.id, 'pid', pg_backend_pid());
+            -- Дополнительная колонка строки (например, task_id у напоминаний)
+            IF TG_NARGS > 0 THEN
+                payload := payload || jsonb_build_object(TG_ARGV[0], to_jsonb(rec) -> TG_ARGV[0]);
+            END IF;
+            PERFORM pg_notify('{CHANGES_CHANNEL}', payload::text);
+            RETURN NULL;
+        END
+        $$ LANGUAGE plpgsql
+    ''')
+
+
+def _deleted_rows_retention(cursor):
+    """
+    Записи deleted_rows хранятся ограниченное время (см. DatabaseManager.prune_deleted_rows).
+    sync_horizon.pruned_xid - наибольший sync_xid удаленных записей: клиент с курсором
+    не новее него мог пропустить удаление и загружает все строки заново.
+    """
+    cursor.execute("ALTER TABLE deleted_rows ADD COLUMN IF NOT EXISTS deleted_at TIMESTAMPTZ DEFAULT now() NOT NULL")
+    cursor.execute("CREATE INDEX IF NOT EXISTS deleted_rows_deleted_at_idx ON deleted_rows (deleted_at)")
+    cursor.execute("CREATE TABLE IF NOT EXISTS sync_horizon (pruned_xid xid8 NOT NULL)")
+    cursor.execute("INSERT INTO sync_horizon (pruned_xid) SELECT '0'::xid8 WHERE NOT EXISTS (SELECT 1 FROM sync_horizon)")
+
+
+# (версия, описание, функция). Примененные миграции не изменяются - новые
+# изменения схемы добавляются в конец списка со следующим номером версии.
+# Миграции 1-3 идемпотентны: базы, созданные до появления schema_migrations,
+# проходят их без изменений.
+MIGRATIONS = [
+    (1, "Таблицы задач, напоминаний и заметок", _create_base_tables),
+    (2, "Нормализованные теги", _create_tag_tables),
+    (3, "Полнотекстовый поиск", _create_search_indexes),
+    (4, "Типизированные даты и индексы сортировки", _typed_dates_and_sort_indexes),
+    (5, "Уведомления об изменениях строк", _change_notifications),
+    (6, "Версии строк для синхронизации", _row_versions),
+    (7, "Общее уведомление о массовых изменениях", _bulk_change_notifications),
+    (8, "Срок хранения записей об удаленных строках", _deleted_rows_retention),
+]
+
+
+def schema_version(cursor):
+    cursor.execute("SELECT coalesce(max(version), 0) AS version FROM schema_migrations")
+    return cursor.fetchone()['version']
+
+
+def apply_migrations(transaction):
+    """
+    Применяет недостающие миграции. transaction() - контекстный менеджер, который
+    возвращает курсор и фиксирует транзакцию при выходе; каждая миграция
+    выполняется в своей транзакции вместе с записью в schema_migrations.
+    Возвращает номер версии схемы после применения.
+    """
+    with transaction() as cursor:
+        cursor.execute("SELECT pg_advisory_xact_lock(%s)", (MIGRATIONS_LOCK_KEY,))
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS schema_migrations (
+                version INTEGER PRIMARY KEY,
+                description TEXT NOT NULL,
+                applied_at TIMESTAMPTZ DEFAULT now() NOT NULL
+            )
+        ''')
+    version = 0
+    for version, description, migrate in MIGRATIONS:
+        with transaction() as cursor:
+            cursor.execute("SELECT pg_advisory_xact_lock(%s)", (MIGRATIONS_LOCK_KEY,))
+            if schema_version(cursor) >= version:
+                continue
+            try:
+                migrate(cursor)
+            except psycopg2.Error as e:
+                raise RuntimeError(f"Не удалось применить миграцию {version} ({description}): {e}") from e
+            cursor.execute(
+                "INSERT INTO schema_migrations (version, description) VALUES (%s, %s)",
+                (version, description)
+            )
+    return version
@@ -0,0 +1,123 @@
+# note_editor.py
+
+import hashlib
+from PyQt6.QtCore import QObject, QTimer, pyqtSignal
+
+
+def content_hash(title, content):
+    return hashlib.sha1(f"{title}\0{content}".encode()).digest()
+
+
+class NoteEditor(QObject):
+    """
+    Состояние заметки, открытой в редакторе: id, признак несохраненных правок (dirty)
+    и хэш последней сохраненной версии. Сигналы полей ввода подключаются один раз
+    в конструкторе; open() и close() только меняют состояние.
+
+    Правки существующей заметки сохраняются автоматически через AUTOSAVE_DELAY_MS
+    после последней из них. Запись в базу выполняется, только если хэш заголовка
+    и текста отличается от сохраненного.
+    """
+    AUTOSAVE_DELAY_MS = 2000
+    saved = pyqtSignal(object, bool)
+    save_failed = pyqtSignal(object)
+    dirty_changed = pyqtSignal(bool)
+
+    def __init__(self, title_edit, content_edit, preview, executor, repository, parent=None):
+        super().__init__(parent)
+        self.title_edit = title_edit
+        self.content_edit = content_edit
+        self.preview = preview
+        self.executor = executor
+        self.db = executor.db
+        self.repository = repository
+        self.note_id = None
+        self.is_open = False
+        self.read_only = False
+        self.dirty = False
+        self._saved_hash = None
+        self._loading = False
+        # Растет при каждом открытии и закрытии: ответы на сохранение прежней заметки не меняют новую
+        self._session = 0
+        self.autosave_timer = QTimer(self)
+        self.autosave_timer.setSingleShot(True)
+        self.autosave_timer.setInterval(self.AUTOSAVE_DELAY_MS)
+        self.autosave_timer.timeout.connect(self.autosave)
+        self.title_edit.textEdited.connect(self._on_edited)
+        self.content_edit.textChanged.connect(self._on_edited)
+
+    def open(self, note_id, note=None, read_only=False):
+        self.close()
+        self.is_open = True
+        self.note_id = note_id
+        self.read_only = read_only
+        title, content = (note['title'], note['content'] or "") if note else ("", "")
+        self._loading = True
+        try:
+            self.title_edit.setText(title)
+            self.content_edit.setPlainText(content)
+        finally:
+            self._loading = False
+        self._saved_hash = content_hash(title.strip(), content)
+        self.preview.clear()
+        self.preview.render_now()
+
+    def close(self, save=True):
+        """Закрывает заметку; несохраненные правки существующей заметки сохраняются, если save."""
+        if save and self.is_open and self.note_id and self.dirty:
+            self.save()
+        self.autosave_timer.stop()
+        self._session += 1
+        self.is_open = False
+        self.note_id = None
+        self._set_dirty(False)
+        self.preview.clear()
+
+    def save(self):
+        """Сохраняет заметку; False, если заголовок пуст или правок нет."""
+        self.autosave_timer.stop()
+        title = self.title_edit.text().strip()
+        if not self.is_open or self.read_only or not title:
+            return False
+        content = self.content_edit.toPlainText()
+        saved_hash = content_hash(title, content)
+        if self.note_id and saved_hash == self._saved_hash:
+            self._set_dirty(False)
+            return False
+        session = self._session
+        if note_id := self.note_id:
+            self.repository.discard(note_id)
+            self.executor.submit(self.db.update_note, note_id, title, content,
+                                 on_result=lambda _: self._on_saved(session, note_id, saved_hash, False),
+                                 on_error=self.save_failed.emit)
+        else:
+            self.executor.submit(self.db.add_note, title, content,
+                                 on_result=lambda new_id: self._on_saved(session, new_id, saved_hash, True),
+                                 on_error=self.save_failed.emit)
+        return True
+
+    def autosave(self):
+        if self.note_id and self.dirty:
+            self.save()
+
+    def _on_edited(self):
+        if self._loading or not self.is_open:
+            return
+        self.preview.schedule()
+        self._set_dirty(True)
+        if self.note_id and not self.read_only:
+            self.autosave_timer.start()
+
+    def _on_saved(self, session, note_id, saved_hash, created):
+        if session == self._session:
+            if created:
+                self.note_id = note_id
+            self._saved_hash = saved_hash
+            if content_hash(self.title_edit.text().strip(), self.content_edit.toPlainText()) == saved_hash:
+                self._set_dirty(False)
+        self.saved.emit(note_id, created)
+
+    def _set_dirty(self, dirty):
+        if dirty != self.dirty:
+            self.dirty = dirty
+            self.dirty_changed.emit(dirty)
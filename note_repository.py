@@ -0,0 +1,90 @@
+# note_repository.py
+
+from collections import OrderedDict
+from PyQt6.QtCore import QObject
+
+
+class NoteRepository(QObject):
+    """
+    Содержимое заметок для редактора. Тексты хранятся в LRU-кэше, ограниченном
+    суммарным размером (MAX_CACHE_BYTES). Запись кэша действительна, пока
+    updated_at заметки не изменился: список заметок сообщает новые версии через
+    sync_versions(). Соседние заметки списка загружаются заранее (prefetch)
+    одним запросом, поэтому переход к ним не ждет базу данных.
+    """
+    MAX_CACHE_BYTES = 8 * 1024 * 1024
+    # Сколько заметок выше и ниже выбранной загружается заранее
+    PREFETCH_RADIUS = 2
+    NOTE_COLUMNS = ("id", "title", "content", "updated_at")
+
+    def __init__(self, executor, parent=None):
+        super().__init__(parent)
+        self.executor = executor
+        self.db = executor.db
+        self._notes = OrderedDict()
+        self._size = 0
+        # Растет при каждой инвалидации: результаты запросов, начатых раньше, могут быть устаревшими
+        self._generation = 0
+
+    def get(self, note_id, on_result):
+        """Вызывает on_result(заметка или None) сразу, если заметка в кэше, иначе после запроса к базе."""
+        if note_id in self._notes:
+            # Ответ на предыдущий запрос не должен открыть в редакторе другую заметку
+            self.executor.cancel("open_note")
+            self._notes.move_to_end(note_id)
+            on_result(self._notes[note_id][0])
+            return
+        generation = self._generation
+
+        def on_loaded(note):
+            if note and generation == self._generation:
+                self._store(note)
+            on_result(note)
+        self.executor.submit(self.db.get_note_by_id, note_id, key="open_note", on_result=on_loaded)
+
+    def prefetch(self, note_ids):
+        note_ids = [note_id for note_id in note_ids if note_id is not None and note_id not in self._notes]
+        if not note_ids:
+            return
+        generation = self._generation
+
+        def on_loaded(notes):
+            if generation == self._generation:
+                for note in notes:
+                    self._store(note)
+        self.executor.submit(self.db.get_notes_by_ids, note_ids, columns=self.NOTE_COLUMNS,
+                             key="note_prefetch", on_result=on_loaded)
+
+    def discard(self, note_id):
+        self._generation += 1
+        self._remove(note_id)
+
+    def sync_versions(self, notes, note_ids=()):
+        """
+        Удаляет из кэша заметки, у которых updated_at в notes отличается от сохраненного,
+        и заметки из note_ids, которых нет в notes (удаленные).
+        """
+        found = set()
+        for note in notes:
+            found.add(note['id'])
+            entry = self._notes.get(note['id'])
+            if entry is not None and entry[0]['updated_at'] != note['updated_at']:
+                self.discard(note['id'])
+        for note_id in set(note_ids) - found:
+            self.discard(note_id)
+
+    def _store(self, note):
+        size = len(note['title'].encode()) + len((note['content'] or "").encode())
+        if size > self.MAX_CACHE_BYTES:
+            return
+        self._remove(note['id'])
+        self._notes[note['id']] = (note, size)
+        self._size += size
+        while self._size > self.MAX_CACHE_BYTES:
+            _, (_, evicted_size) = self._notes.popitem(last=False)
+            self._size -= evicted_size
+
+    def _remove(self, note_id):
+        entry = self._notes.pop(note_id, None)
+        if entry is not None:
+            self._size -= entry[1]
@@ -0,0 +1,127 @@
+# reminders.py
+
+import datetime
+import heapq
+from PyQt6.QtCore import QObject, QTimer, pyqtSignal
+
+
+class ReminderScheduler(QObject):
+    """
+    Планировщик напоминаний. Держит в памяти min-кучу напоминаний, которые
+    наступят в ближайшее окно (LOAD_WINDOW), и один таймер до ближайшего из них.
+    База данных опрашивается только при смене окна и после invalidate().
+
+    reminders_due получает список сработавших напоминаний (словари как у
+    DatabaseManager.get_due_reminders). Они остаются в базе, пока не вызван
+    acknowledge(), и до этого не выдаются повторно.
+
+    load_failed получает ошибку загрузки окна (первую из подряд идущих);
+    загрузка повторяется по таймеру, пока не удастся.
+    """
+    reminders_due = pyqtSignal(list)
+    load_failed = pyqtSignal(object)
+
+    LOAD_WINDOW = datetime.timedelta(hours=6)
+    # Таймер не ставится дольше этого интервала, чтобы переход системных часов
+    # или сон компьютера не откладывали напоминание надолго
+    MAX_TIMER_MS = 5 * 60 * 1000
+
+    def __init__(self, executor, parent=None):
+        super().__init__(parent)
+        self.executor = executor
+        self.db = executor.db
+        self._heap = []
+        self._window_end = None
+        self._delivered = set()
+        self._loading = False
+        self._needs_reload = False
+        self._timer = QTimer(self)
+        self._timer.setSingleShot(True)
+        self._timer.timeout.connect(self._on_timeout)
+
+    @staticmethod
+    def _now():
+        return datetime.datetime.now().astimezone()
+
+    def start(self):
+        self.invalidate()
+
+    def stop(self):
+        self._timer.stop()
+        self.executor.cancel("reminder_window")
+
+    def invalidate(self):
+        """Перезагружает окно напоминаний из базы (например, после массовых изменений задач)."""
+        window_end = self._now() + self.LOAD_WINDOW
+        self._loading = True
+        self.executor.submit(self.db.get_due_reminders, window_end, key="reminder_window",
+                             on_result=lambda rows: self._load_window(rows, window_end),
+                             on_error=self._on_load_error)
+
+    def _on_load_error(self, error):
+        # Например, нет связи с сервером: до повторной загрузки срабатывают напоминания прежнего окна
+        self._loading = False
+        if not self._needs_reload:
+            self._needs_reload = True
+            self.load_failed.emit(error)
+        delay_ms = self.MAX_TIMER_MS
+        if self._heap:
+            delay_ms = min(delay_ms, max((self._heap[0][0] - self._now()).total_seconds() * 1000, 0))
+        self._timer.start(int(delay_ms))
+
+    def _load_window(self, rows, window_end):
+        self._loading = False
+        self._needs_reload = False
+        self._window_end = window_end
+        self._heap = [(row['reminder_datetime'], row['reminder_id'], row['task_id'], row['title'])
+                      for row in rows if row['reminder_id'] not in self._delivered]
+        heapq.heapify(self._heap)
+        self._arm()
+
+    def set_task_reminders(self, task_id, title, reminders, active=True):
+        """
+        Заменяет напоминания задачи в куче без обращения к базе.
+        reminders - строки (id, reminder_datetime) из replace_all_reminders_for_task.
+        """
+        if self._loading:
+            # Загружаемое окно могло быть прочитано до изменения
+            self.invalidate()
+            return
+        self._heap = [entry for entry in self._heap if entry[2] != task_id]
+        if active and self._window_end is not None:
+            self._heap += [(row['reminder_datetime'], row['id'], task_id, title)
+                           for row in reminders if row['reminder_datetime'] <= self._window_end]
+        heapq.heapify(self._heap)
+        self._arm()
+
+    def acknowledge(self, reminder_ids):
+        """Удаляет показанные напоминания из базы одним запросом."""
+        reminder_ids = list(reminder_ids)
+        if not reminder_ids:
+            return
+        self.executor.submit(self.db.delete_reminders, reminder_ids,
+                             on_result=lambda _: self._delivered.difference_update(reminder_ids))
+
+    def _arm(self):
+        if self._window_end is None:
+            return
+        target = self._heap[0][0] if self._heap and self._heap[0][0] < self._window_end else self._window_end
+        delay_ms = (target - self._now()).total_seconds() * 1000
+        self._timer.start(int(min(max(delay_ms, 0), self.MAX_TIMER_MS)))
+
+    def _on_timeout(self):
+        now = self._now()
+        due = []
+        while self._heap and self._heap[0][0] <= now:
+            remind_at, reminder_id, task_id, title = heapq.heappop(self._heap)
+            if reminder_id in self._delivered:
+                continue
+            self._delivered.add(reminder_id)
+            due.append({'reminder_id': reminder_id, 'reminder_datetime': remind_at,
+                        'task_id': task_id, 'title': title})
+        if due:
+            self.reminders_due.emit(due)
+        if self._needs_reload or now >= self._window_end:
+            self.invalidate()
+        else:
+            self._arm()
@@ -0,0 +1,193 @@
+# report_writer.py
+"""
+Потоковая запись отчета по задачам в файл Excel (.xlsx).
+
+Строки листа сразу пишутся во временный файл, а ширина колонок считается по
+мере записи, поэтому память не зависит от числа задач и второго прохода по
+ячейкам не нужно. Книга собирается в zip-архив при close(): элемент <cols>
+с ширинами должен стоять в XML листа перед данными, а они к этому моменту
+уже записаны.
+"""
+
+import os
+import re
+import tempfile
+import zipfile
+from xml.sax.saxutils import escape
+from database import PRIORITIES
+from transfer import PROGRESS_STEP
+
+REPORT_HEADERS = ["Задача", "Статус", "Приоритет", "Срок выполнения", "Детали", "Теги"]
+MAX_COLUMN_WIDTH = 70
+
+# Символы, запрещенные в XML 1.0
+_INVALID_XML_CHARS = re.compile('[\x00-\x08\x0b\x0c\x0e-\x1f]')
+
+_CONTENT_TYPES = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+    '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+    '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+    '<Default Extension="xml" ContentType="application/xml"/>'
+    '<Override PartName="/xl/workbook.xml" ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>'
+    '<Override PartName="/xl/worksheets/sheet1.xml" ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>'
+    '<Override PartName="/xl/styles.xml" ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.styles+xml"/>'
+    '</Types>'
+)
+_ROOT_RELS = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+    '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+    '<Relationship Id="rId1" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument" Target="xl/workbook.xml"/>'
+    '</Relationships>'
+)
+_WORKBOOK_RELS = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+    '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+    '<Relationship Id="rId1" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/worksheet" Target="worksheets/sheet1.xml"/>'
+    '<Relationship Id="rId2" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/styles" Target="styles.xml"/>'
+    '</Relationships>'
+)
+# Стили ячеек: 0 - обычный, 1 - жирный, 2 - жирный по центру (заголовки таблицы)
+_STYLES = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+    '<styleSheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main">'
+    '<fonts count="2"><font><sz val="11"/><name val="Calibri"/></font>'
+    '<font><b/><sz val="11"/><name val="Calibri"/></font></fonts>'
+    '<fills count="2"><fill><patternFill patternType="none"/></fill><fill><patternFill patternType="gray125"/></fill></fills>'
+    '<borders count="1"><border><left/><right/><top/><bottom/><diagonal/></border></borders>'
+    '<cellStyleXfs count="1"><xf numFmtId="0" fontId="0" fillId="0" borderId="0"/></cellStyleXfs>'
+    '<cellXfs count="3"><xf numFmtId="0" fontId="0" fillId="0" borderId="0" xfId="0"/>'
+    '<xf numFmtId="0" fontId="1" fillId="0" borderId="0" xfId="0" applyFont="1"/>'
+    '<xf numFmtId="0" fontId="1" fillId="0" borderId="0" xfId="0" applyFont="1" applyAlignment="1">'
+    '<alignment horizontal="center" vertical="center"/></xf></cellXfs>'
+    '<cellStyles count="1"><cellStyle name="Normal" xfId="0" builtinId="0"/></cellStyles>'
+    '</styleSheet>'
+)
+NORMAL, BOLD, HEADER = 0, 1, 2
+
+
+def column_letter(number):
+    letters = ""
+    while number:
+        number, remainder = divmod(number - 1, 26)
+        letters = chr(65 + remainder) + letters
+    return letters
+
+
+class XlsxStreamWriter:
+    """Книга Excel с одним листом, строки которого добавляются по одной (append)."""
+
+    def __init__(self, path, sheet_title):
+        self.path = path
+        self.sheet_title = sheet_title
+        self.widths = {}
+        self.merged = []
+        self.row_count = 0
+        self._rows = tempfile.TemporaryFile('w+', encoding='utf-8')
+
+    def append(self, values, style=NORMAL, start_column=1):
+        self.row_count += 1
+        cells = []
+        for column, value in enumerate(values, start_column):
+            if value is None or value == "":
+                continue
+            ref = f"{column_letter(column)}{self.row_count}"
+            style_attr = f' s="{style}"' if style else ""
+            if isinstance(value, (int, float)) and not isinstance(value, bool):
+                cells.append(f'<c r="{ref}"{style_attr}><v>{value}</v></c>')
+            else:
+                value = _INVALID_XML_CHARS.sub("", str(value))
+                cells.append(f'<c r="{ref}"{style_attr} t="inlineStr"><is><t xml:space="preserve">{escape(value)}</t></is></c>')
+            self.widths[column] = max(self.widths.get(column, 0), len(str(value)))
+        self._rows.write(f'<row r="{self.row_count}">{"".join(cells)}</row>')
+
+    def merge(self, first_column, last_column):
+        """Объединяет ячейки последней добавленной строки."""
+        self.merged.append(f"{column_letter(first_column)}{self.row_count}:{column_letter(last_column)}{self.row_count}")
+
+    def close(self):
+        try:
+            with zipfile.ZipFile(self.path, 'w', zipfile.ZIP_DEFLATED) as archive:
+                archive.writestr("[Content_Types].xml", _CONTENT_TYPES)
+                archive.writestr("_rels/.rels", _ROOT_RELS)
+                archive.writestr("xl/_rels/workbook.xml.rels", _WORKBOOK_RELS)
+                archive.writestr("xl/styles.xml", _STYLES)
+                archive.writestr("xl/workbook.xml", (
+                    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+                    '<workbook xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main" '
+                    'xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships">'
+                    f'<sheets><sheet name="{escape(self.sheet_title[:31], {chr(34): "&quot;"})}" sheetId="1" r:id="rId1"/></sheets>'
+                    '</workbook>'
+                ))
+                with archive.open("xl/worksheets/sheet1.xml", 'w', force_zip64=True) as sheet:
+                    sheet.write(self._sheet_head().encode('utf-8'))
+                    self._rows.seek(0)
+                    while chunk := self._rows.read(1 << 16):
+                        sheet.write(chunk.encode('utf-8'))
+                    sheet.write(self._sheet_tail().encode('utf-8'))
+        finally:
+            self._rows.close()
+
+    def discard(self):
+        self._rows.close()
+        if os.path.exists(self.path):
+            os.remove(self.path)
+
+    def _sheet_head(self):
+        cols = "".join(
+            f'<col min="{column}" max="{column}" width="{min((width + 2) * 1.2, MAX_COLUMN_WIDTH):.2f}" customWidth="1"/>'
+            for column, width in sorted(self.widths.items())
+        )
+        return ('<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+                '<worksheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main">'
+                + (f"<cols>{cols}</cols>" if cols else "") + "<sheetData>")
+
+    def _sheet_tail(self):
+        merged = "".join(f'<mergeCell ref="{ref}"/>' for ref in self.merged)
+        return "</sheetData>" + (f'<mergeCells count="{len(self.merged)}">{merged}</mergeCells>' if merged else "") + "</worksheet>"
+
+
+def write_task_report(path, summary_stats, tasks, progress=None):
+    """
+    Записывает сводку summary_stats и строки задач tasks (итератор, например
+    DatabaseManager.stream_tasks; None - только сводка) в файл path.
+    progress(число задач) вызывается каждые PROGRESS_STEP строк; при ошибке
+    или прерывании файл удаляется.
+    Возвращает число записанных задач.
+    """
+    writer = XlsxStreamWriter(path, "Отчет по задачам")
+    count = 0
+    try:
+        writer.append(["Сводная статистика"], BOLD)
+        writer.merge(1, 4)
+        writer.append(["Всего задач:", summary_stats.get('total')])
+        writer.append(["Завершено:", f"{summary_stats.get('completed')} ({summary_stats.get('percentage', 0):.1f}%)"])
+
+        writer.append(["По приоритетам:"], BOLD)
+        for prio_id, prio_count in sorted(summary_stats.get('priorities', {}).items(), key=lambda item: item[0], reverse=True):
+            writer.append([f"{PRIORITIES.get(prio_id, 'Н/Д')}: {prio_count}"], start_column=2)
+
+        writer.append(["По тегам:"], BOLD)
+        tag_counts = summary_stats.get('tags')
+        if tag_counts:
+            for tag, tag_count in tag_counts.most_common():
+                writer.append([f"{tag}: {tag_count}"], start_column=2)
+        else:
+            writer.append(["Нет"], start_column=2)
+
+        if tasks is not None:
+            writer.append([])
+            writer.append(REPORT_HEADERS, HEADER)
+            for count, task in enumerate(tasks, 1):
+                due_date = task['due_date'].strftime('%d.%m.%Y') if task.get('due_date') else ""
+                writer.append([task.get('title', ''), task.get('status', ''),
+                               PRIORITIES.get(task.get('priority', 0), "Нет"), due_date,
+                               task.get('details', ''), task.get('tags', '')])
+                if progress and count % PROGRESS_STEP == 0:
+                    progress(count)
+        writer.close()
+    except BaseException:
+        if hasattr(tasks, 'close'):
+            tasks.close()
+        writer.discard()
+        raise
+    return count
@@ -0,0 +1,132 @@
+# row_animations.py
+
+import configparser
+from collections import deque
+from PyQt6.QtCore import QEasingCurve, QElapsedTimer, QObject, QTimer
+
+INTERFACE_SECTION = 'interface'
+
+
+class RowAnimationScheduler(QObject):
+    """
+    Появление строк списка (прозрачность и сдвиг) после его загрузки. Анимируются
+    только строки, видимые в области просмотра, одновременно не больше max_concurrent;
+    если строк в модели больше max_rows, список показывается без анимации.
+    Все строки ведет один общий таймер кадров, делегат узнает состояние строки
+    через state(index).
+    """
+    FRAME_INTERVAL_MS = 16
+    DURATION_MS = 250
+    # Задержка начала анимации каждой следующей строки
+    STAGGER_MS = 25
+    SLIDE_OFFSET = 16
+    MAX_ROWS = 1000
+    MAX_CONCURRENT = 30
+
+    def __init__(self, view, key_role, max_rows=MAX_ROWS, max_concurrent=MAX_CONCURRENT, parent=None):
+        super().__init__(parent)
+        self.view = view
+        self.key_role = key_role
+        self.max_rows = max_rows
+        self.max_concurrent = max_concurrent
+        self.easing = QEasingCurve(QEasingCurve.Type.OutCubic)
+        self.clock = QElapsedTimer()
+        self.clock.start()
+        self.timer = QTimer(self)
+        self.timer.setInterval(self.FRAME_INTERVAL_MS)
+        self.timer.timeout.connect(self._tick)
+        self._armed = False
+        self._reveal_pending = False
+        # Ключ строки -> время начала анимации (по self.clock)
+        self._running = {}
+        # Строки, ожидающие начала: (ключ, самое раннее время начала)
+        self._queued = deque()
+        self._hidden = set()
+
+    def reveal_next_rows(self):
+        """Анимирует видимые строки, которые модель добавит следующими (после сброса модели)."""
+        self.stop()
+        self._armed = True
+        self.view.model().rowsInserted.connect(self._on_rows_inserted)
+
+    def stop(self):
+        if self._armed:
+            self._armed = False
+            self.view.model().rowsInserted.disconnect(self._on_rows_inserted)
+        had_rows = bool(self._running or self._queued or self._hidden)
+        self._reveal_pending = False
+        self.timer.stop()
+        self._running.clear()
+        self._queued.clear()
+        self._hidden.clear()
+        if had_rows:
+            self.view.viewport().update()
+
+    def is_active(self):
+        return bool(self._running or self._queued)
+
+    def state(self, index):
+        """(прозрачность, сдвиг вправо в пикселях) строки index."""
+        if not self._hidden:
+            return 1.0, 0
+        key = index.data(self.key_role)
+        if key not in self._hidden:
+            return 1.0, 0
+        started = self._running.get(key)
+        if started is None:
+            return 0.0, self.SLIDE_OFFSET
+        progress = self.easing.valueForProgress(min(1.0, max(0, self.clock.elapsed() - started) / self.DURATION_MS))
+        return progress, round(self.SLIDE_OFFSET * (1 - progress))
+
+    def _on_rows_inserted(self, parent, first, last):
+        self.stop()
+        model = self.view.model()
+        if model.rowCount() > self.max_rows:
+            return
+        # Строки попадают в раскладку представления после обработки сигнала; до этого они скрыты
+        self._hidden = {model.index(row, 0).data(self.key_role) for row in range(first, last + 1)}
+        self._reveal_pending = True
+        QTimer.singleShot(0, self._queue_visible_rows)
+
+    def _queue_visible_rows(self):
+        if not self._reveal_pending:
+            return
+        self._reveal_pending = False
+        self._hidden.clear()
+        viewport = self.view.viewport()
+        index = self.view.indexAt(viewport.rect().topLeft())
+        start = self.clock.elapsed()
+        while index.isValid() and self.view.visualRect(index).top() < viewport.height():
+            key = index.data(self.key_role)
+            self._queued.append((key, start + len(self._queued) * self.STAGGER_MS))
+            self._hidden.add(key)
+            index = index.siblingAtRow(index.row() + 1)
+        if self._queued:
+            self._tick()
+            self.timer.start()
+        else:
+            viewport.update()
+
+    def _tick(self):
+        now = self.clock.elapsed()
+        for key, started in list(self._running.items()):
+            if now - started >= self.DURATION_MS:
+                del self._running[key]
+                self._hidden.discard(key)
+        while self._queued and len(self._running) < self.max_concurrent and self._queued[0][1] <= now:
+            key, _ = self._queued.popleft()
+            self._running[key] = now
+        if not self._running and not self._queued:
+            self.timer.stop()
+        self.view.viewport().update()
+
+
+def read_animation_config(filename='config.ini'):
+    """Ограничения анимации из раздела [interface] файла конфигурации (animation_max_rows, animation_max_concurrent)."""
+    parser = configparser.ConfigParser()
+    parser.read(filename)
+    return {
+        'max_rows': parser.getint(INTERFACE_SECTION, 'animation_max_rows', fallback=RowAnimationScheduler.MAX_ROWS),
+        'max_concurrent': parser.getint(INTERFACE_SECTION, 'animation_max_concurrent',
+                                        fallback=RowAnimationScheduler.MAX_CONCURRENT),
+    }
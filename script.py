@@ -1,8 +1,9 @@
 # seed_database.py
 
+import argparse
 import random
 import datetime
-from database import DatabaseManager
+from database import DatabaseManager, STATUSES
 
 # --- Наборы данных для генерации правдоподобных задач ---
 
@@ -34,74 +35,101 @@ TAGS = [
     "Срочно", "Покупки", "Семья", "Обучение", "Автомобиль"
 ]
 
+NOTE_TOPICS = [
+    "Идеи для проекта", "Список покупок", "Заметки со встречи", "Планы на отпуск",
+    "Книги к прочтению", "Рецепт", "Конспект лекции", "Цели на квартал"
+]
+
+# --- Распределения ---
+# Большинство задач без приоритета, высокий - у каждой десятой
+PRIORITY_WEIGHTS = {0: 50, 1: 25, 2: 15, 3: 10}
+STATUS_WEIGHTS = {STATUSES[0]: 45, STATUSES[1]: 15, STATUSES[2]: 10, STATUSES[3]: 30}
+# Популярность дополнительных тегов убывает по закону Ципфа
+TAG_WEIGHTS = [1 / rank for rank in range(1, len(TAGS) + 1)]
+
+# --- Генерация данных ---
+
+def generate_task(rng=random, today=None):
+    """Случайная задача - словарь в формате DatabaseManager.import_tasks."""
+    today = today or datetime.date.today()
+    # Выбираем тип задачи (рабочая, личная, звонок)
+    task_type = rng.choice(['work', 'home', 'call'])
+
+    if task_type == 'work':
+        title = f"{rng.choice(VERBS)} {rng.choice(NOUNS_WORK)}"
+        details = f"Нужно {title.lower()}. Обратить внимание на сроки и бюджет. Согласовать с отделом маркетинга."
+        base_tags = ["Работа"]
+    elif task_type == 'home':
+        title = f"{rng.choice(VERBS)} {rng.choice(NOUNS_HOME)}"
+        details = f"Не забыть {title.lower()}. Сравнить цены в нескольких магазинах."
+        base_tags = ["Дом", "Покупки"]
+    else: # call
+        title = f"Позвонить {rng.choice(PEOPLE)}"
+        details = f"Обсудить {rng.choice(['проект', 'документы', 'планы на выходные', 'встречу'])}."
+        base_tags = ["Личное", "Звонки"]
+
+    # Генерируем случайные теги (дубликаты убираются при сохранении)
+    extra_tags = rng.choices(TAGS, weights=TAG_WEIGHTS, k=rng.choices([0, 1, 2], weights=[5, 3, 2])[0])
+    tags_str = ", ".join(base_tags + extra_tags)
+
+    # Срок: от -15 до +45 дней от сегодня, у каждой седьмой задачи срока нет
+    due_date = None
+    if rng.random() > 0.15:
+        due_date = today + datetime.timedelta(days=rng.randint(-15, 45))
+    created_at = datetime.datetime.now().astimezone() - datetime.timedelta(seconds=rng.randint(0, 365 * 24 * 3600))
+
+    return {
+        'title': title,
+        'details': details,
+        'tags': tags_str,
+        'due_date': due_date,
+        'status': rng.choices(list(STATUS_WEIGHTS), weights=list(STATUS_WEIGHTS.values()))[0],
+        'priority': rng.choices(list(PRIORITY_WEIGHTS), weights=list(PRIORITY_WEIGHTS.values()))[0],
+        'created_at': created_at,
+    }
+
+def generate_note(rng=random):
+    """Случайная заметка - словарь в формате DatabaseManager.import_notes."""
+    topic = rng.choice(NOTE_TOPICS)
+    items = "\n".join(f"- {rng.choice(VERBS)} {rng.choice(NOUNS_WORK + NOUNS_HOME)}" for _ in range(rng.randint(2, 12)))
+    created_at = datetime.datetime.now().astimezone() - datetime.timedelta(seconds=rng.randint(0, 365 * 24 * 3600))
+    return {
+        'title': f"{topic} #{rng.randint(1, 9999)}",
+        'content': f"# {topic}\n\n{items}\n",
+        'created_at': created_at,
+        'updated_at': created_at + datetime.timedelta(seconds=rng.randint(0, 30 * 24 * 3600)),
+    }
+
 # --- Основная функция для наполнения базы данных ---
 
-def seed_database():
+def seed_database(count=99):
     """
-    Генерирует и добавляет 100 случайных задач в базу данных.
+    Генерирует и добавляет count случайных задач в базу данных одной массовой вставкой.
     """
     db = DatabaseManager()
-
-    # Добавляем одну стартовую, осмысленную задачу
-    
-
-    print("Создание 99 случайных задач для наполнения базы...")
-
-    for i in range(99):
-        # Выбираем тип задачи (рабочая, личная, звонок)
-        task_type = random.choice(['work', 'home', 'call'])
-        
-        if task_type == 'work':
-            title = f"{random.choice(VERBS)} {random.choice(NOUNS_WORK)}"
-            details = f"Нужно {title.lower()}. Обратить внимание на сроки и бюджет. Согласовать с отделом маркетинга."
-            base_tags = ["Работа"]
-        elif task_type == 'home':
-            title = f"{random.choice(VERBS)} {random.choice(NOUNS_HOME)}"
-            details = f"Не забыть {title.lower()}. Сравнить цены в нескольких магазинах."
-            base_tags = ["Дом", "Покупки"]
-        else: # call
-            title = f"Позвонить {random.choice(PEOPLE)}"
-            details = f"Обсудить {random.choice(['проект', 'документы', 'планы на выходные', 'встречу'])}."
-            base_tags = ["Личное", "Звонки"]
-
-        # Генерируем случайные теги
-        num_extra_tags = random.randint(0, 2)
-        extra_tags = random.sample(TAGS, num_extra_tags)
-        all_tags = list(set(base_tags + extra_tags)) # Убираем дубликаты
-        tags_str = ", ".join(all_tags)
-        
-        # Генерируем случайную дату выполнения (от -15 до +45 дней от сегодня)
-        days_offset = random.randint(-15, 45)
-        due_date = (datetime.date.today() + datetime.timedelta(days=days_offset)).isoformat()
-        
-        # Случайным образом определяем, важна ли задача (вероятность 20%)
-        is_important = random.random() < 0.20
-
-        # Добавляем задачу в базу данных
-        db.add_task(
-            title=title,
-            details=details,
-            tags=tags_str,
-            due_date=due_date,
-            is_important=is_important
-        )
-        print(f"Добавлена задача {i+1}/99: {title[:50]}...")
-
-    db.close()
-    print("\nГотово! База данных успешно наполнена 100 задачами.")
+    print(f"Создание {count} случайных задач для наполнения базы...")
+    try:
+        db.import_tasks((generate_task() for _ in range(count)),
+                        progress=lambda done: print(f"Добавлено задач: {done}/{count}"))
+    finally:
+        db.close()
+    print(f"\nГотово! База данных успешно наполнена {count} задачами.")
     print("Теперь вы можете запустить основной файл main.py")
 
 
 if __name__ == "__main__":
-    # Перед запуском убедитесь, что база данных `tasks.db` не заблокирована
-    # другим процессом (например, закройте основное приложение).
-    
+    # Перед запуском убедитесь, что в config.ini указана нужная база данных
+    parser = argparse.ArgumentParser(description="Наполняет базу данных случайными задачами.")
+    parser.add_argument("--count", type=int, default=99, help="число задач (по умолчанию 99)")
+    parser.add_argument("--yes", action="store_true", help="не спрашивать подтверждение")
+    args = parser.parse_args()
+
     # Спросим подтверждение у пользователя
-    confirm = input(
-        "Этот скрипт добавит 100 тестовых задач в вашу базу данных `tasks.db`.\n"
+    confirm = "y" if args.yes else input(
+        f"Этот скрипт добавит {args.count} тестовых задач в базу данных из config.ini.\n"
         "Продолжить? (y/n): "
     )
     if confirm.lower() == 'y':
-        seed_database()
+        seed_database(args.count)
     else:
-        print("Операция отменена.")
\ No newline at end of file
+        print("Операция отменена.")
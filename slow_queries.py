@@ -0,0 +1,185 @@
+# slow_queries.py
+"""
+Журнал медленных запросов DatabaseManager (включается в разделе [slow_queries]
+файла config.ini).
+
+Запрос дольше threshold_ms записывается в файл JSON Lines вместе с параметрами.
+Запросы группируются по отпечатку (fingerprint) - тексту SQL, в котором значения
+и списки значений заменены на ?. Для каждого нового отпечатка один раз снимается
+план EXPLAIN (ANALYZE, BUFFERS): он выполняется в той же транзакции внутри
+точки сохранения, которая затем откатывается, поэтому изменяющие запросы
+(например, UPDATE из update_task) не применяются повторно.
+
+Сводка по отпечаткам: python slow_queries.py [файл журнала]
+"""
+
+import configparser
+import datetime
+import hashlib
+import json
+import re
+import sys
+import threading
+import time
+import psycopg2
+import psycopg2.extras
+
+SLOW_QUERIES_SECTION = 'slow_queries'
+DEFAULT_THRESHOLD_MS = 200
+DEFAULT_LOG_PATH = 'slow_queries.jsonl'
+MAX_PARAMS_LENGTH = 500
+# План снимается только для запросов, которые поддерживает EXPLAIN
+_EXPLAINABLE = re.compile(r'^\s*(SELECT|INSERT|UPDATE|DELETE|WITH)\b', re.IGNORECASE)
+
+_STRING = re.compile(r"'(?:[^']|'')*'")
+_NUMBER = re.compile(r"\b\d+(?:\.\d+)?\b")
+_PLACEHOLDER = re.compile(r"%\(\w+\)s|%s|\$\d+")
+_ARRAY = re.compile(r"ARRAY\[[^\]]*\]", re.IGNORECASE)
+# Несколько строк VALUES (...), (...) или список IN (?, ?, ?) - один элемент
+_VALUE_LISTS = re.compile(r"\((?:\s*\?\s*,)*\s*\?\s*\)(?:\s*,\s*\((?:\s*\?\s*,)*\s*\?\s*\))*")
+_SPACE = re.compile(r"\s+")
+_PREPARE = re.compile(r"^PREPARE (\w+) AS (.*)$", re.DOTALL)
+_EXECUTE = re.compile(r"^\s*EXECUTE (\w+)")
+
+
+def normalize_sql(query):
+    """Текст запроса без значений: одинаковые по форме запросы получают одинаковый текст."""
+    if isinstance(query, bytes):
+        query = query.decode('utf-8', errors='replace')
+    query = _STRING.sub("?", query)
+    query = _PLACEHOLDER.sub("?", query)
+    query = _ARRAY.sub("ARRAY[?]", query)
+    query = _NUMBER.sub("?", query)
+    query = _VALUE_LISTS.sub("(...)", query)
+    return _SPACE.sub(" ", query).strip()
+
+
+def fingerprint(normalized_query):
+    return hashlib.sha1(normalized_query.encode()).hexdigest()[:16]
+
+
+class SlowQueryLog:
+    """Журнал медленных запросов; cursor_factory передается в connection.cursor()."""
+
+    def __init__(self, path=DEFAULT_LOG_PATH, threshold_ms=DEFAULT_THRESHOLD_MS, explain=True):
+        self.path = path
+        self.threshold_ms = threshold_ms
+        self.explain = explain
+        self._lock = threading.Lock()
+        # Отпечаток -> сводка: запрос, число медленных выполнений, суммарное и наибольшее время
+        self._shapes = {}
+        # Имя подготовленного оператора -> его запрос: EXECUTE группируется по тексту запроса
+        self._statements = {}
+        self.cursor_factory = type('SlowQueryCursor', (SlowQueryCursor,), {'slow_query_log': self})
+
+    def remember_statement(self, query):
+        if match := _PREPARE.match(query):
+            self._statements[match.group(1)] = match.group(2)
+
+    def record(self, cursor, query, params, duration_ms):
+        text = query.decode('utf-8', errors='replace') if isinstance(query, bytes) else query
+        if (match := _EXECUTE.match(text)) and match.group(1) in self._statements:
+            text = self._statements[match.group(1)]
+        normalized = normalize_sql(text)
+        key = fingerprint(normalized)
+        with self._lock:
+            shape = self._shapes.get(key)
+            is_new = shape is None
+            if is_new:
+                shape = self._shapes[key] = {'fingerprint': key, 'query': normalized, 'count': 0,
+                                             'total_ms': 0.0, 'max_ms': 0.0, 'plan': None}
+            shape['count'] += 1
+            shape['total_ms'] += duration_ms
+            shape['max_ms'] = max(shape['max_ms'], duration_ms)
+        entry = {
+            'time': datetime.datetime.now().astimezone().isoformat(),
+            'fingerprint': key,
+            'duration_ms': round(duration_ms, 3),
+            'rows': cursor.rowcount,
+            'params': repr(params)[:MAX_PARAMS_LENGTH] if params is not None else None,
+        }
+        if is_new:
+            entry['query'] = normalized
+            if self.explain and (_EXPLAINABLE.match(normalized) or _EXECUTE.match(normalized)):
+                shape['plan'] = entry['plan'] = self._explain(cursor.connection, query, params)
+        self._write(entry)
+
+    def shapes(self):
+        """Сводка по отпечаткам, начиная с самых долгих по суммарному времени."""
+        with self._lock:
+            shapes = [dict(shape) for shape in self._shapes.values()]
+        return sorted(shapes, key=lambda shape: shape['total_ms'], reverse=True)
+
+    @staticmethod
+    def _explain(connection, query, params):
+        # Отдельный курсор: результат исходного запроса остается непрочитанным в своем курсоре
+        with connection.cursor() as cursor:
+            cursor.execute("SAVEPOINT slow_query_explain")
+            try:
+                cursor.execute(b"EXPLAIN (ANALYZE, BUFFERS) " + (query if isinstance(query, bytes) else query.encode()),
+                               params)
+                return "\n".join(row[0] for row in cursor.fetchall())
+            except psycopg2.Error as e:
+                return f"Не удалось получить план: {e}"
+            finally:
+                cursor.execute("ROLLBACK TO SAVEPOINT slow_query_explain")
+                cursor.execute("RELEASE SAVEPOINT slow_query_explain")
+
+    def _write(self, entry):
+        line = json.dumps(entry, ensure_ascii=False, default=str)
+        with self._lock:
+            try:
+                with open(self.path, 'a', encoding='utf-8') as f:
+                    f.write(line + "\n")
+            except OSError as e:
+                print(f"Не удалось записать журнал медленных запросов: {e}")
+
+
+class SlowQueryCursor(psycopg2.extras.RealDictCursor):
+    slow_query_log = None
+
+    def execute(self, query, vars=None):
+        if isinstance(query, str) and query.startswith("PREPARE "):
+            # Время подготовки не записывается; медленным может оказаться EXECUTE этого оператора
+            self.slow_query_log.remember_statement(query)
+            return super().execute(query, vars)
+        started = time.perf_counter()
+        result = super().execute(query, vars)
+        duration_ms = (time.perf_counter() - started) * 1000
+        if duration_ms >= self.slow_query_log.threshold_ms:
+            self.slow_query_log.record(self, query, vars, duration_ms)
+        return result
+
+
+def open_slow_query_log(filename='config.ini'):
+    """SlowQueryLog по разделу [slow_queries] файла конфигурации или None, если журнал выключен."""
+    parser = configparser.ConfigParser()
+    parser.read(filename)
+    if not parser.getboolean(SLOW_QUERIES_SECTION, 'enabled', fallback=False):
+        return None
+    return SlowQueryLog(parser.get(SLOW_QUERIES_SECTION, 'path', fallback=DEFAULT_LOG_PATH),
+                        parser.getfloat(SLOW_QUERIES_SECTION, 'threshold_ms', fallback=DEFAULT_THRESHOLD_MS),
+                        parser.getboolean(SLOW_QUERIES_SECTION, 'explain', fallback=True))
+
+
+def summarize(path):
+    """Сводка журнала path по отпечаткам: запрос, число выполнений, время и план."""
+    shapes = {}
+    with open(path, encoding='utf-8') as f:
+        for line in f:
+            entry = json.loads(line)
+            shape = shapes.setdefault(entry['fingerprint'], {'query': None, 'plan': None, 'durations': []})
+            shape['query'] = entry.get('query') or shape['query']
+            shape['plan'] = entry.get('plan') or shape['plan']
+            shape['durations'].append(entry['duration_ms'])
+    return sorted(shapes.items(), key=lambda item: sum(item[1]['durations']), reverse=True)
+
+
+if __name__ == "__main__":
+    for key, shape in summarize(sys.argv[1] if len(sys.argv) > 1 else DEFAULT_LOG_PATH):
+        durations = shape['durations']
+        print(f"[{key}] выполнений: {len(durations)}, всего {sum(durations):.1f} мс, макс. {max(durations):.1f} мс")
+        print(f"    {shape['query']}")
+        if shape['plan']:
+            print("    " + shape['plan'].replace("\n", "\n    "))
+        print()
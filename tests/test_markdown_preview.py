@@ -0,0 +1,41 @@
+# tests/test_markdown_preview.py
+"""Отрисовка по блокам (MarkdownRenderer) должна совпадать с отрисовкой всего документа."""
+
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from markdown_preview import MARKDOWN_AVAILABLE, MARKDOWN_EXTENSIONS, MarkdownRenderer, split_blocks
+
+if MARKDOWN_AVAILABLE:
+    import markdown
+
+DOCUMENTS = {
+    'цитата из нескольких абзацев': "> первый абзац\n\n> второй абзац\n\nтекст",
+    'цитата с ленивым продолжением': "> цитата\nпродолжение\n\n> еще",
+    'цитата после абзаца': "абзац\n> цитата\n\n> еще",
+    'список в цитате': "> - a\n>\n> - b\n\n> - c",
+    'свободный список': "- один\n\n- два\n\n  продолжение\n\n- три\n\nабзац",
+    'нумерованный свободный список': "1. один\n\n2. два\n\n3. три",
+    'вложенный список': "- a\n    - b\n\n    - c\n\n- d",
+    'цитата в пункте списка': "- пункт\n\n    > цитата\n\n- пункт 2",
+}
+
+
+@unittest.skipUnless(MARKDOWN_AVAILABLE, "библиотека markdown не установлена")
+class SplitBlocksTest(unittest.TestCase):
+    def test_block_render_matches_full_render(self):
+        for name, text in DOCUMENTS.items():
+            with self.subTest(name):
+                full = markdown.Markdown(extensions=MARKDOWN_EXTENSIONS).convert(text)
+                self.assertEqual(''.join(MarkdownRenderer().render(text).split()), ''.join(full.split()))
+
+    def test_quote_paragraphs_stay_in_one_block(self):
+        blocks, _ = split_blocks("> первый\n\n> второй\n\nтекст")
+        self.assertEqual(blocks, ["> первый\n\n> второй", "текст"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,257 @@
+# transfer.py
+"""
+Импорт и экспорт задач и заметок в файлы Excel (.xlsx), CSV и NDJSON
+(по одному объекту JSON в строке). Первая строка CSV и листа Excel - имена
+колонок, как в TASK_EXPORT_COLUMNS и NOTE_EXPORT_COLUMNS; лишние колонки
+(например, id) при импорте пропускаются.
+
+Файлы читаются и пишутся потоково: импорт передает строки в
+DatabaseManager.import_tasks/import_notes пачками, экспорт читает их
+из серверного курсора.
+"""
+
+import csv
+import datetime
+import json
+import os
+from database import PRIORITIES, STATUSES
+
+try:
+    import openpyxl
+    OPENPYXL_AVAILABLE = True
+except ImportError:
+    OPENPYXL_AVAILABLE = False
+
+TASK_EXPORT_COLUMNS = ("id", "title", "details", "tags", "due_date", "status", "priority", "created_at", "updated_at")
+NOTE_EXPORT_COLUMNS = ("id", "title", "content", "created_at", "updated_at")
+FILE_FORMATS = {'.xlsx': 'xlsx', '.csv': 'csv', '.ndjson': 'ndjson', '.jsonl': 'ndjson'}
+FILE_FILTER = "Excel (*.xlsx);;CSV (*.csv);;JSON Lines (*.ndjson *.jsonl)"
+# Экспорт сообщает о прогрессе через столько строк
+PROGRESS_STEP = 1000
+# Сколько ошибок проверки строк сохраняется для показа пользователю
+MAX_REPORTED_ERRORS = 100
+
+
+class TransferError(Exception):
+    pass
+
+
+class TransferCancelled(Exception):
+    """Исключение, которым функция progress прерывает импорт или экспорт."""
+
+
+def file_format(path):
+    extension = os.path.splitext(path)[1].lower()
+    if extension not in FILE_FORMATS:
+        raise TransferError(f"Неподдерживаемый формат файла: {extension or path}")
+    if FILE_FORMATS[extension] == 'xlsx' and not OPENPYXL_AVAILABLE:
+        raise TransferError("Для работы с Excel необходимо установить библиотеку openpyxl.\nВыполните: pip install openpyxl")
+    return FILE_FORMATS[extension]
+
+# --- Чтение ---
+
+def read_rows(path):
+    """
+    Строки файла как пары (номер строки, словарь колонка -> значение). Вместо
+    строки, которую не удалось разобрать, возвращается ValueError.
+    """
+    reader = {'xlsx': _read_xlsx, 'csv': _read_csv, 'ndjson': _read_ndjson}[file_format(path)]
+    return reader(path)
+
+def _read_xlsx(path):
+    # read_only читает лист потоково, не загружая всю книгу в память
+    workbook = openpyxl.load_workbook(path, read_only=True, data_only=True)
+    try:
+        rows = workbook.active.iter_rows(values_only=True)
+        header = next(rows, None)
+        if header is None:
+            return
+        columns = [str(name).strip() if name is not None else None for name in header]
+        for line, values in enumerate(rows, 2):
+            if all(value is None for value in values):
+                continue
+            yield line, {column: value for column, value in zip(columns, values) if column}
+    finally:
+        workbook.close()
+
+def _read_csv(path):
+    # utf-8-sig: Excel сохраняет CSV в UTF-8 с BOM
+    with open(path, newline='', encoding='utf-8-sig') as file:
+        reader = csv.DictReader(file)
+        for row in reader:
+            yield reader.line_num, {column.strip(): value for column, value in row.items() if column}
+
+def _read_ndjson(path):
+    with open(path, encoding='utf-8') as file:
+        for line, text in enumerate(file, 1):
+            if not text.strip():
+                continue
+            try:
+                row = json.loads(text)
+            except json.JSONDecodeError as e:
+                yield line, ValueError(f"неверный JSON: {e.msg}")
+                continue
+            yield line, row if isinstance(row, dict) else ValueError("строка не является объектом JSON")
+
+# --- Проверка строк ---
+
+def _text(value):
+    if value is None:
+        return ""
+    return value if isinstance(value, str) else str(value)
+
+def _date(value):
+    if value in (None, ""):
+        return None
+    if isinstance(value, datetime.datetime):
+        return value.date()
+    if isinstance(value, datetime.date):
+        return value
+    value = _text(value).strip()
+    for parse in (datetime.date.fromisoformat, lambda text: datetime.datetime.strptime(text, '%d.%m.%Y').date()):
+        try:
+            return parse(value)
+        except ValueError:
+            pass
+    # Дата со временем в формате ISO
+    return _datetime(value).date()
+
+def _datetime(value):
+    if value in (None, ""):
+        return None
+    if not isinstance(value, datetime.datetime):
+        try:
+            value = datetime.datetime.fromisoformat(_text(value).strip())
+        except ValueError:
+            raise ValueError(f"неверная дата «{value}»") from None
+    # Время без часового пояса считается местным
+    return value.astimezone()
+
+def _priority(value):
+    if value in (None, ""):
+        return 0
+    for priority, name in PRIORITIES.items():
+        if _text(value).strip().lower() == name.lower():
+            return priority
+    try:
+        priority = int(float(value))
+    except (TypeError, ValueError):
+        raise ValueError(f"неверный приоритет «{value}»") from None
+    if priority not in PRIORITIES:
+        raise ValueError(f"приоритет должен быть от 0 до {max(PRIORITIES)}")
+    return priority
+
+def _title(row):
+    title = _text(row.get('title')).strip()
+    if not title:
+        raise ValueError("пустое название (колонка title)")
+    return title
+
+def validate_task(row):
+    title = _title(row)
+    status = _text(row.get('status')).strip() or STATUSES[0]
+    if status not in STATUSES:
+        raise ValueError(f"неизвестный статус «{status}»")
+    return {
+        'title': title,
+        'details': _text(row.get('details')),
+        'tags': _text(row.get('tags')),
+        'due_date': _date(row.get('due_date')),
+        'status': status,
+        'priority': _priority(row.get('priority')),
+        'created_at': _datetime(row.get('created_at')),
+    }
+
+def validate_note(row):
+    return {
+        'title': _title(row),
+        'content': _text(row.get('content')),
+        'created_at': _datetime(row.get('created_at')),
+        'updated_at': _datetime(row.get('updated_at')),
+    }
+
+def import_file(db, path, kind, progress=None):
+    """
+    Импортирует задачи (kind='tasks') или заметки (kind='notes') из файла в одной транзакции.
+    Строки, не прошедшие проверку, пропускаются. Возвращает словарь
+    {'imported': число строк, 'skipped': число строк, 'errors': [(номер строки, сообщение)]}.
+    """
+    validate, import_rows = {'tasks': (validate_task, db.import_tasks),
+                             'notes': (validate_note, db.import_notes)}[kind]
+    result = {'imported': 0, 'skipped': 0, 'errors': []}
+
+    def valid_rows():
+        for line, row in read_rows(path):
+            try:
+                if isinstance(row, ValueError):
+                    raise row
+                row = validate(row)
+            except ValueError as e:
+                result['skipped'] += 1
+                if len(result['errors']) < MAX_REPORTED_ERRORS:
+                    result['errors'].append((line, str(e)))
+                continue
+            yield row
+
+    result['imported'] = import_rows(valid_rows(), progress=progress)
+    return result
+
+# --- Запись ---
+
+def _plain(value):
+    if isinstance(value, (datetime.date, datetime.datetime)):
+        return value.isoformat()
+    return value
+
+def _write_xlsx(path, sheet_title, columns, rows):
+    # write_only пишет строки сразу в файл и не хранит ячейки в памяти
+    workbook = openpyxl.Workbook(write_only=True)
+    sheet = workbook.create_sheet(sheet_title)
+    sheet.append(columns)
+    for row in rows:
+        # Excel не хранит часовой пояс: время записывается местным
+        sheet.append([value.astimezone().replace(tzinfo=None)
+                      if isinstance(value, datetime.datetime) and value.tzinfo else value
+                      for value in (row[column] for column in columns)])
+    workbook.save(path)
+
+def _write_csv(path, sheet_title, columns, rows):
+    with open(path, 'w', newline='', encoding='utf-8-sig') as file:
+        writer = csv.writer(file)
+        writer.writerow(columns)
+        for row in rows:
+            writer.writerow([_plain(row[column]) for column in columns])
+
+def _write_ndjson(path, sheet_title, columns, rows):
+    with open(path, 'w', encoding='utf-8') as file:
+        for row in rows:
+            file.write(json.dumps({column: _plain(row[column]) for column in columns}, ensure_ascii=False) + "\n")
+
+def export_file(db, path, kind, progress=None):
+    """Выгружает все задачи или заметки в файл. Возвращает число строк; при ошибке файл удаляется."""
+    writer = {'xlsx': _write_xlsx, 'csv': _write_csv, 'ndjson': _write_ndjson}[file_format(path)]
+    if kind == 'tasks':
+        sheet_title, columns = "Задачи", TASK_EXPORT_COLUMNS
+        rows = db.stream_tasks(sort_by='creation_date', columns=columns)
+    else:
+        sheet_title, columns = "Заметки", NOTE_EXPORT_COLUMNS
+        rows = db.stream_notes(columns=columns)
+    exported = 0
+
+    def counted():
+        nonlocal exported
+        for exported, row in enumerate(rows, 1):
+            if progress and exported % PROGRESS_STEP == 0:
+                progress(exported)
+            yield row
+
+    try:
+        writer(path, sheet_title, columns, counted())
+    except BaseException:
+        rows.close()
+        if os.path.exists(path):
+            os.remove(path)
+        raise
+    if progress:
+        progress(exported)
+    return exported